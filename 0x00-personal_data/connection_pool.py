@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Connection pooling for database connectors
+"""
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """ Raised when no connection could be checked out in time """
+
+
+def is_alive(cnx: Any) -> bool:
+    """ Returns True if a connection still answers a trivial query """
+    try:
+        is_connected = getattr(cnx, 'is_connected', None)
+        if is_connected is not None:
+            return bool(is_connected())
+        cursor = cnx.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        finally:
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+def _close_quietly(cnx: Any) -> None:
+    """ Closes a connection, ignoring errors from a dead one """
+    try:
+        cnx.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """ Thread-safe pool of connections created by a factory
+
+        Up to size connections are kept idle for reuse; up to
+        max_overflow extra ones may be opened under load and are closed
+        when returned. Idle connections older than idle_timeout seconds
+        are dropped, and every connection is validated on checkout.
+        """
+
+    def __init__(self, factory: Callable[[], Any], size: int = 5,
+                 max_overflow: int = 10, idle_timeout: float = 300.0,
+                 timeout: float = 30.0,
+                 validate: Callable[[Any], bool] = is_alive):
+        self.factory = factory
+        self.size = size
+        self.max_overflow = max_overflow
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.validate = validate
+        self._idle = deque()
+        self._opened = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def opened(self) -> int:
+        """ Number of connections currently open, idle or checked out """
+        return self._opened
+
+    @property
+    def idle(self) -> int:
+        """ Number of idle connections waiting in the pool """
+        return len(self._idle)
+
+    def _discard(self, cnx: Any, discarded: list) -> None:
+        """ Frees the slot of a connection; lock must be held
+
+            The connection is added to discarded, for the caller to
+            close once the lock is released: closing may wait on the
+            network and must not hold up other threads.
+            """
+        self._opened -= 1
+        self._cond.notify()
+        discarded.append(cnx)
+
+    def _forget(self, cnx: Any) -> None:
+        """ Closes a connection held outside the lock and frees its slot """
+        _close_quietly(cnx)
+        with self._cond:
+            self._opened -= 1
+            self._cond.notify()
+
+    def _reserve(self, deadline: float, timeout: float) -> Any:
+        """ Pops an idle connection, or reserves a slot for a new one
+
+            Returns the idle connection, or None once a slot is
+            reserved; waits until the deadline for either. Connections
+            idle for too long are closed after the lock is released.
+            """
+        expired = []
+        try:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout("pool is closed")
+                    if self._idle:
+                        cnx, returned_at = self._idle.pop()
+                        idle_for = time.monotonic() - returned_at
+                        if self.idle_timeout and idle_for > self.idle_timeout:
+                            self._discard(cnx, expired)
+                            continue
+                        return cnx
+                    if self._opened < self.size + self.max_overflow:
+                        self._opened += 1
+                        return None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f"no connection available after {timeout}s")
+                    self._cond.wait(remaining)
+        finally:
+            for cnx in expired:
+                _close_quietly(cnx)
+
+    def checkout(self, timeout: float = None) -> Any:
+        """ Returns a valid connection, waiting up to timeout seconds
+
+            Idle connections are validated outside the lock, so a slow
+            or hanging validation does not hold up other threads.
+            """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            cnx = self._reserve(deadline, timeout)
+            if cnx is None:
+                break
+            try:
+                valid = self.validate(cnx)
+            except BaseException:
+                self._forget(cnx)
+                raise
+            if valid:
+                return cnx
+            self._forget(cnx)
+
+        try:
+            return self.factory()
+        except BaseException:
+            with self._cond:
+                self._opened -= 1
+                self._cond.notify()
+            raise
+
+    def checkin(self, cnx: Any, broken: bool = False) -> None:
+        """ Returns a connection to the pool, closing surplus ones """
+        discarded = []
+        with self._cond:
+            if broken or self._closed or len(self._idle) >= self.size:
+                self._discard(cnx, discarded)
+            else:
+                self._idle.append((cnx, time.monotonic()))
+                self._cond.notify()
+        for cnx in discarded:
+            _close_quietly(cnx)
+
+    @contextmanager
+    def connection(self, timeout: float = None) -> Iterator[Any]:
+        """ Checks out a connection for the duration of a with block
+
+            If the block raises, the transaction is rolled back and the
+            connection is dropped when the rollback itself fails.
+            """
+        cnx = self.checkout(timeout)
+        broken = False
+        try:
+            yield cnx
+        except BaseException:
+            try:
+                cnx.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self.checkin(cnx, broken)
+
+    def close(self) -> None:
+        """ Closes idle connections and refuses further checkouts """
+        discarded = []
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                cnx, _ = self._idle.pop()
+                self._discard(cnx, discarded)
+            self._cond.notify_all()
+        for cnx in discarded:
+            _close_quietly(cnx)
@@ -2,13 +2,82 @@
 """
 Encrypting passwords
 """
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, \
+    ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Tuple
+import os
+import time
 import bcrypt
 
 
+ProgressCallback = Callable[[int, float], None]
+
+DEFAULT_COST = 12
+COST_FILE = os.environ.get("BCRYPT_COST_FILE", ".bcrypt_cost")
+_cost = None
+
+
+def calibrate_cost(target_ms: float = 50.0, min_cost: int = 4,
+                   max_cost: int = 16) -> int:
+    """
+    Returns the highest bcrypt cost whose verification takes at most
+    target_ms on this machine (never less than min_cost)
+
+    Each extra cost unit doubles the work, so the probe stops at the
+    first cost over target and costs about twice the target overall.
+    """
+    cost = min_cost
+    for rounds in range(min_cost, max_cost + 1):
+        hashed = bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+        started = time.perf_counter()
+        bcrypt.checkpw(b"calibration", hashed)
+        if (time.perf_counter() - started) * 1000 > target_ms:
+            break
+        cost = rounds
+    return cost
+
+
+def save_cost(cost: int, path: str = None) -> None:
+    """ Persists the bcrypt cost used by hash_password """
+    global _cost
+    with open(path or COST_FILE, 'w') as f:
+        f.write(f"{cost}\n")
+    _cost = cost
+
+
+def get_cost() -> int:
+    """
+    Returns the configured bcrypt cost: BCRYPT_COST if set, else the
+    persisted calibration, else the bcrypt default
+    """
+    global _cost
+    if _cost is None:
+        cost = os.environ.get("BCRYPT_COST")
+        if cost is None and os.path.exists(COST_FILE):
+            with open(COST_FILE, 'r') as f:
+                cost = f.read().strip()
+        _cost = int(cost) if cost else DEFAULT_COST
+    return _cost
+
+
+def hash_cost(hashed_password: bytes) -> int:
+    """ Returns the cost a bcrypt hash was computed with """
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode()
+    return int(hashed_password.split(b"$")[2])
+
+
+def needs_rehash(hashed_password: bytes) -> bool:
+    """ Tells if a hash was made with another cost than get_cost() """
+    return hash_cost(hashed_password) != get_cost()
+
+
 def hash_password(password: str) -> bytes:
     """ Returns a salted, hashed password, which is a byte string """
     encoded = password.encode()
-    hashed = bcrypt.hashpw(encoded, bcrypt.gensalt())
+    hashed = bcrypt.hashpw(encoded, bcrypt.gensalt(get_cost()))
 
     return hashed
 
@@ -20,3 +89,79 @@ def is_valid(hashed_password: bytes, password: str) -> bool:
     if bcrypt.checkpw(encoded, hashed_password):
         valid = True
     return valid
+
+
+def _hash_chunk(passwords: List[str]) -> List[bytes]:
+    """ Hashes a chunk of passwords inside a pool worker """
+    return [hash_password(p) for p in passwords]
+
+
+def _verify_chunk(pairs: List[Tuple[bytes, str]]) -> List[bool]:
+    """ Checks a chunk of (hashed, password) pairs inside a pool worker """
+    return [is_valid(hashed, password) for hashed, password in pairs]
+
+
+def _get_executor(mode: str, workers: int) -> Executor:
+    """ Returns the pool running the bcrypt work """
+    if mode == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    if mode == "thread":
+        return ThreadPoolExecutor(max_workers=workers)
+    raise ValueError(f"unknown pool mode: {mode}")
+
+
+def _run_chunked(func: Callable[[list], list], items: Iterable,
+                 workers: int, mode: str, chunksize: int,
+                 on_progress: ProgressCallback) -> Iterator:
+    """
+    Fans chunks of items out to a pool and yields results in order
+
+    At most two chunks per worker are in flight, so memory stays
+    bounded however long items is. on_progress, if given, is called
+    with the number of results and the rate per second after each chunk.
+    """
+    workers = workers or os.cpu_count() or 1
+    items = iter(items)
+    started = time.monotonic()
+    done = 0
+    with _get_executor(mode, workers) as executor:
+        pending = deque()
+        while True:
+            while len(pending) < workers * 2:
+                chunk = list(islice(items, chunksize))
+                if not chunk:
+                    break
+                pending.append(executor.submit(func, chunk))
+            if not pending:
+                break
+            results = pending.popleft().result()
+            done += len(results)
+            if on_progress is not None:
+                elapsed = time.monotonic() - started
+                on_progress(done, done / elapsed if elapsed > 0 else 0.0)
+            yield from results
+
+
+def hash_passwords(passwords: Iterable[str], workers: int = None,
+                   mode: str = "process", chunksize: int = 16,
+                   on_progress: ProgressCallback = None) -> Iterator[bytes]:
+    """
+    Hashes many passwords in parallel, yielding hashes in input order
+
+    mode is "process" or "thread" (bcrypt releases the GIL, so threads
+    scale too); workers defaults to the number of CPUs.
+    """
+    return _run_chunked(_hash_chunk, passwords, workers, mode, chunksize,
+                        on_progress)
+
+
+def verify_passwords(pairs: Iterable[Tuple[bytes, str]],
+                     workers: int = None, mode: str = "process",
+                     chunksize: int = 16,
+                     on_progress: ProgressCallback = None) -> Iterator[bool]:
+    """
+    Validates many (hashed_password, password) pairs in parallel,
+    yielding the results in input order
+    """
+    return _run_chunked(_verify_chunk, pairs, workers, mode, chunksize,
+                        on_progress)
@@ -2,34 +2,246 @@
 """
 Module for handling Personal Data
 """
-from typing import List
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterator, List, Optional, Sequence, TextIO
+import argparse
+import atexit
+import copy
+import os
+import queue
 import re
+import sys
+import threading
+import time
 import logging
 from os import environ
 import mysql.connector
+from connection_pool import ConnectionPool
 
 
 PII_FIELDS = ("name", "email", "phone", "ssn", "password")
 
 
+class Redactor:
+    """ Precompiled redaction engine
+
+        All fields are matched by a single alternation pattern so a
+        message is scanned once, whatever the number of fields.
+        Field names and separator are used verbatim in the pattern, as
+        the historical per-field ``re.sub`` did, so the output is the
+        same as applying one substitution per field.
+        """
+
+    def __init__(self, fields: Sequence[str], redaction: str,
+                 separator: str):
+        self.fields = tuple(fields)
+        self.redaction = redaction
+        self.separator = separator
+        self._pattern = re.compile(
+            '({})=.*?(?:{})'.format('|'.join(self.fields), separator))
+        self._template = '={}{}'.format(redaction, separator)
+
+    def _replace(self, match: re.Match) -> str:
+        """ Builds the redacted ``field=***;`` chunk for a match """
+        return match.group(1) + self._template
+
+    def redact(self, message: str) -> str:
+        """ Returns the message with every field value redacted """
+        if not self.fields:
+            return message
+        return self._pattern.sub(self._replace, message)
+
+    def redact_many(self, messages: Sequence[str]) -> List[str]:
+        """ Redacts a batch of single-line messages with one scan
+
+            The pattern never crosses a line break, so joining the batch
+            on newlines and splitting it back gives the same result as
+            redacting each message on its own.
+            """
+        if not self.fields or not messages:
+            return list(messages)
+        joined = '\n'.join(messages)
+        if joined.count('\n') != len(messages) - 1:
+            return [self.redact(m) for m in messages]
+        return self._pattern.sub(self._replace, joined).split('\n')
+
+
+@lru_cache(maxsize=32)
+def _get_redactor(fields: tuple, redaction: str,
+                  separator: str) -> Redactor:
+    """ Returns the cached Redactor for a field set and separator """
+    return Redactor(fields, redaction, separator)
+
+
+def get_redactor(fields: Sequence[str], redaction: str,
+                 separator: str) -> Redactor:
+    """ Returns a shared Redactor, compiling it on first use only """
+    return _get_redactor(tuple(fields), redaction, separator)
+
+
 def filter_datum(fields: List[str], redaction: str,
                  message: str, separator: str) -> str:
     """ Returns a log message obfuscated """
-    for f in fields:
-        message = re.sub(f'{f}=.*?{separator}',
-                         f'{f}={redaction}{separator}', message)
-    return message
+    return get_redactor(fields, redaction, separator).redact(message)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """ QueueHandler enqueueing raw records into a bounded queue
+
+        Only the message arguments are merged on the calling thread;
+        redaction and formatting are left to the listener. When the
+        queue is full, the "block" policy waits (up to timeout seconds
+        if set) and the "drop" policy discards the record; both count
+        discarded records in ``dropped``.
+        """
+
+    POLICIES = ("block", "drop")
+
+    def __init__(self, log_queue: queue.Queue, policy: str = "block",
+                 timeout: float = None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"unknown queue policy: {policy}")
+        super(BoundedQueueHandler, self).__init__(log_queue)
+        self.policy = policy
+        self.timeout = timeout
+        self.dropped = 0
+        self.listener = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """ Returns a copy of record with its arguments merged in """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """ Puts record on the queue according to the full-queue policy """
+        try:
+            if self.policy == "drop":
+                self.queue.put_nowait(record)
+            else:
+                self.queue.put(record, timeout=self.timeout)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """ StreamHandler able to format and write records in one call """
+
+    def handle_batch(self, records: Sequence[logging.LogRecord]) -> None:
+        """ Formats the records and writes them with a single write """
+        records = [r for r in records
+                   if r.levelno >= self.level and self.filter(r)]
+        if not records:
+            return
+        self.acquire()
+        try:
+            self.stream.write(''.join(self.format(r) + self.terminator
+                                      for r in records))
+            self.flush()
+        except Exception:
+            self.handleError(records[-1])
+        finally:
+            self.release()
+
+
+class BatchQueueListener(QueueListener):
+    """ QueueListener draining up to batch_size records per wake-up
+
+        Handlers providing ``handle_batch`` get the whole batch at once,
+        others get the records one by one. stop() waits for the records
+        already queued, so nothing is lost on shutdown.
+        """
+
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler,
+                 batch_size: int = 100, respect_handler_level: bool = True):
+        super(BatchQueueListener, self).__init__(
+            log_queue, *handlers,
+            respect_handler_level=respect_handler_level)
+        self.batch_size = batch_size
+        self._stopping = False
+
+    def dequeue(self, block: bool):
+        """ Returns the sentinel or a list of up to batch_size records """
+        if self._stopping:
+            return self._sentinel
+        record = self.queue.get(block)
+        if record is self._sentinel:
+            return record
+        batch = [record]
+        while len(batch) < self.batch_size:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is self._sentinel:
+                self._stopping = True
+                break
+            batch.append(record)
+            self.queue.task_done()
+        return batch
+
+    def handle(self, records: List[logging.LogRecord]) -> None:
+        """ Hands a batch of records over to every handler """
+        records = [self.prepare(r) for r in records]
+        for handler in self.handlers:
+            if self.respect_handler_level:
+                batch = [r for r in records if r.levelno >= handler.level]
+            else:
+                batch = records
+            if hasattr(handler, 'handle_batch'):
+                handler.handle_batch(batch)
+            else:
+                for record in batch:
+                    handler.handle(record)
+
+    def enqueue_sentinel(self) -> None:
+        """ Queues the stop sentinel, waiting for room if needed """
+        self.queue.put(self._sentinel)
+
+    def stop(self) -> None:
+        """ Flushes the queued records and stops the worker thread """
+        if self._thread is not None:
+            super(BatchQueueListener, self).stop()
+        self._stopping = False
+
+
+_LOGGER_LOCK = threading.Lock()
 
 
 def get_logger() -> logging.Logger:
-    """ Returns a Logger Object """
+    """
+    Returns a Logger Object
+
+    Records are queued by the calling thread and redacted and written
+    by a background listener; repeated calls reuse the same pipeline.
+    The queue is sized by PERSONAL_DATA_LOG_QUEUE_SIZE and its
+    full-queue policy ("block" or "drop") by PERSONAL_DATA_LOG_POLICY.
+    """
     logger = logging.getLogger("user_data")
     logger.setLevel(logging.INFO)
     logger.propagate = False
 
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(RedactingFormatter(list(PII_FIELDS)))
-    logger.addHandler(stream_handler)
+    with _LOGGER_LOCK:
+        if any(isinstance(h, BoundedQueueHandler) for h in logger.handlers):
+            return logger
+
+        log_queue = queue.Queue(
+            int(environ.get("PERSONAL_DATA_LOG_QUEUE_SIZE", 10000)))
+        stream_handler = BatchStreamHandler()
+        stream_handler.setFormatter(RedactingFormatter(list(PII_FIELDS)))
+        listener = BatchQueueListener(
+            log_queue, stream_handler,
+            batch_size=int(environ.get("PERSONAL_DATA_LOG_BATCH_SIZE", 100)))
+
+        queue_handler = BoundedQueueHandler(
+            log_queue, environ.get("PERSONAL_DATA_LOG_POLICY", "block"))
+        queue_handler.listener = listener
+        logger.addHandler(queue_handler)
+
+        listener.start()
+        atexit.register(listener.stop)
 
     return logger
 
@@ -48,12 +260,215 @@ def get_db() -> mysql.connector.connection.MySQLConnection:
     return cnx
 
 
-def main():
+@lru_cache(maxsize=None)
+def get_db_pool() -> ConnectionPool:
+    """
+    Returns the process-wide pool of get_db connections
+
+    Sized through PERSONAL_DATA_DB_POOL_SIZE, _POOL_MAX_OVERFLOW,
+    _POOL_IDLE_TIMEOUT and _POOL_TIMEOUT; use it as
+    ``with get_db_pool().connection() as db:``.
+    """
+    return ConnectionPool(
+        get_db,
+        size=int(environ.get("PERSONAL_DATA_DB_POOL_SIZE", 5)),
+        max_overflow=int(environ.get("PERSONAL_DATA_DB_POOL_MAX_OVERFLOW",
+                                     10)),
+        idle_timeout=float(environ.get("PERSONAL_DATA_DB_POOL_IDLE_TIMEOUT",
+                                       300)),
+        timeout=float(environ.get("PERSONAL_DATA_DB_POOL_TIMEOUT", 30)))
+
+
+def format_row(field_names: Sequence[str], row: Sequence) -> str:
+    """ Returns a users row as a ``field=value;`` log message """
+    return '; '.join(f'{f}={r}' for r, f in zip(row, field_names)) + ';'
+
+
+def iter_batches(cursor, batch_size: int) -> Iterator[list]:
+    """ Yields the remaining rows of a cursor, batch_size at a time """
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+class BufferedSink:
+    """ Buffered line writer used by the streaming export """
+
+    def __init__(self, stream: TextIO, close_stream: bool = False):
+        self.stream = stream
+        self.close_stream = close_stream
+
+    def write_lines(self, lines: Sequence[str]) -> None:
+        """ Writes a batch of lines in a single call """
+        if lines:
+            self.stream.write('\n'.join(lines) + '\n')
+
+    def flush(self) -> None:
+        """ Flushes buffered lines to the underlying stream """
+        self.stream.flush()
+
+    def close(self) -> None:
+        """ Flushes, and closes the stream when the sink owns it """
+        self.flush()
+        if self.close_stream:
+            self.stream.close()
+
+
+class FileSink(BufferedSink):
+    """ Appends export lines to a file through a large write buffer """
+
+    BUFFER_SIZE = 1 << 20
+
+    def __init__(self, path: str):
+        self.path = path
+        super(FileSink, self).__init__(self._open(), close_stream=True)
+
+    def _open(self) -> TextIO:
+        """ Opens the target file for buffered appends """
+        return open(self.path, 'a', buffering=self.BUFFER_SIZE)
+
+
+class RotatingFileSink(FileSink):
+    """ FileSink rolling over to path.1 ... path.N past max_bytes
+
+        Rotation is checked between batches, so a file can exceed
+        max_bytes by at most one batch.
+        """
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int = 5):
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        super(RotatingFileSink, self).__init__(path)
+
+    def write_lines(self, lines: Sequence[str]) -> None:
+        """ Writes a batch of lines, rotating the file when it is full """
+        super(RotatingFileSink, self).write_lines(lines)
+        if self.max_bytes > 0 and self.stream.tell() >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self) -> None:
+        """ Closes the current file and shifts the backups by one """
+        self.stream.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f'{self.path}.{i}'
+            if os.path.exists(src):
+                os.replace(src, f'{self.path}.{i + 1}')
+        if self.backup_count > 0:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+        self.stream = self._open()
+
+
+def get_sink(output: Optional[str] = None, max_bytes: int = 0,
+             backup_count: int = 5) -> BufferedSink:
+    """ Returns the sink for an output path, stdout for None or '-' """
+    if output is None or output == '-':
+        return BufferedSink(sys.stdout)
+    if max_bytes > 0:
+        return RotatingFileSink(output, max_bytes, backup_count)
+    return FileSink(output)
+
+
+class ProgressCounter:
+    """ Reports exported rows and rows/sec at most every interval """
+
+    def __init__(self, stream: TextIO = None, interval: float = 5.0):
+        self.stream = stream if stream is not None else sys.stderr
+        self.interval = interval
+        self.rows = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+
+    @property
+    def rate(self) -> float:
+        """ Average rows per second since the counter started """
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def update(self, rows: int) -> None:
+        """ Counts exported rows, reporting if the interval elapsed """
+        self.rows += rows
+        now = time.monotonic()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def report(self) -> None:
+        """ Writes the current progress line """
+        self.stream.write(f'{self.rows} rows ({self.rate:.0f} rows/s)\n')
+        self.stream.flush()
+
+
+def export_users(db, sink: BufferedSink, batch_size: int = 10000,
+                 progress: ProgressCounter = None) -> int:
+    """
+    Streams the users table to sink in redacted log format
+
+    Rows are fetched batch_size at a time and each batch is redacted
+    and written at once, so memory stays bounded by the batch size.
+    Returns the number of exported rows.
+    """
+    formatter = RedactingFormatter(list(PII_FIELDS))
+    head = formatter.FORMAT.split('%(message)s')[0]
+    cursor = db.cursor()
+    try:
+        cursor.execute("SELECT * FROM users;")
+        field_names = [i[0] for i in cursor.description]
+        total = 0
+        for rows in iter_batches(cursor, batch_size):
+            record = logging.LogRecord("user_data", logging.INFO, None,
+                                       None, "", None, None)
+            prefix = head % {'name': record.name,
+                             'levelname': record.levelname,
+                             'asctime': formatter.formatTime(record)}
+            messages = formatter.redactor.redact_many(
+                [format_row(field_names, row) for row in rows])
+            sink.write_lines([prefix + m for m in messages])
+            total += len(rows)
+            if progress is not None:
+                progress.update(len(rows))
+        sink.flush()
+        return total
+    finally:
+        cursor.close()
+
+
+def main(argv: Sequence[str] = None):
     """
     Obtain a database connection using get_db and retrieves all rows
     in the users table and display each row under a filtered format
+
+    With --stream, rows are exported in batches to a buffered sink
+    instead of going one by one through the logger.
     """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--stream', action='store_true',
+                        help='batched export to a buffered sink')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--output', default='-',
+                        help='output file, - for stdout')
+    parser.add_argument('--max-bytes', type=int, default=0,
+                        help='rotate the output file past this size')
+    parser.add_argument('--backup-count', type=int, default=5)
+    parser.add_argument('--progress-interval', type=float, default=5.0)
+    args = parser.parse_args(argv)
+
     db = get_db()
+
+    if args.stream:
+        sink = get_sink(args.output, args.max_bytes, args.backup_count)
+        progress = ProgressCounter(interval=args.progress_interval)
+        try:
+            export_users(db, sink, args.batch_size, progress)
+        finally:
+            sink.close()
+            db.close()
+        progress.report()
+        return
+
     cursor = db.cursor()
     cursor.execute("SELECT * FROM users;")
     field_names = [i[0] for i in cursor.description]
@@ -61,8 +476,7 @@ def main():
     logger = get_logger()
 
     for row in cursor:
-        str_row = ''.join(f'{f}={str(r)}; ' for r, f in zip(row, field_names))
-        logger.info(str_row.strip())
+        logger.info(format_row(field_names, row))
 
     cursor.close()
     db.close()
@@ -79,11 +493,12 @@ class RedactingFormatter(logging.Formatter):
     def __init__(self, fields: List[str]):
         super(RedactingFormatter, self).__init__(self.FORMAT)
         self.fields = fields
+        self.redactor = get_redactor(fields, self.REDACTION,
+                                     self.SEPARATOR)
 
     def format(self, record: logging.LogRecord) -> str:
-        """ Filters values in incoming log records using filter_datum """
-        record.msg = filter_datum(self.fields, self.REDACTION,
-                                  record.getMessage(), self.SEPARATOR)
+        """ Filters values in incoming log records using the redactor """
+        record.msg = self.redactor.redact(record.getMessage())
         return super(RedactingFormatter, self).format(record)
 
 
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+""" Tests of the connection pool against a local stand-in connector
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from connection_pool import ConnectionPool, PoolTimeout  # noqa: E402
+
+
+class FakeCursor:
+    """ Cursor of a FakeConnection """
+
+    def __init__(self, cnx: "FakeConnection"):
+        self.cnx = cnx
+
+    def execute(self, query: str) -> None:
+        """ Fails once the server side of the connection is gone """
+        if not self.cnx.alive:
+            raise ConnectionError("server has gone away")
+
+    def fetchall(self) -> list:
+        """ Rows of the trivial query """
+        return [(1,)]
+
+    def close(self) -> None:
+        """ Nothing to release """
+
+
+class FakeConnection:
+    """ Connection with the DB-API methods the pool relies on """
+
+    def __init__(self, number: int):
+        self.number = number
+        self.alive = True
+        self.closed = False
+
+    def cursor(self) -> FakeCursor:
+        """ New cursor """
+        return FakeCursor(self)
+
+    def rollback(self) -> None:
+        """ Fails on a dead connection """
+        if not self.alive:
+            raise ConnectionError("server has gone away")
+
+    def close(self) -> None:
+        """ Marks the connection closed """
+        self.closed = True
+
+
+class FakeConnector:
+    """ Factory counting the connections it opens """
+
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self) -> FakeConnection:
+        cnx = FakeConnection(len(self.opened))
+        self.opened.append(cnx)
+        return cnx
+
+
+class TestConnectionPool(unittest.TestCase):
+    """ Reuse, exhaustion and recovery of pooled connections """
+
+    def setUp(self):
+        self.connector = FakeConnector()
+
+    def pool(self, **kwargs) -> ConnectionPool:
+        """ Pool over the stand-in connector """
+        pool = ConnectionPool(self.connector, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_reuse(self):
+        """ A returned connection serves the next checkout """
+        pool = self.pool(size=2, max_overflow=0)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            self.assertIs(second, first)
+        self.assertEqual(len(self.connector.opened), 1)
+        self.assertEqual(pool.idle, 1)
+
+    def test_overflow_closed_on_checkin(self):
+        """ Connections beyond size are closed when returned """
+        pool = self.pool(size=1, max_overflow=1)
+        first, second = pool.checkout(), pool.checkout()
+        pool.checkin(first)
+        pool.checkin(second)
+        self.assertEqual(pool.idle, 1)
+        self.assertEqual(pool.opened, 1)
+        self.assertTrue(second.closed)
+
+    def test_exhaustion_times_out(self):
+        """ Checkout fails after the timeout when every slot is taken """
+        pool = self.pool(size=1, max_overflow=0)
+        pool.checkout()
+        started = time.monotonic()
+        with self.assertRaises(PoolTimeout):
+            pool.checkout(timeout=0.05)
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+
+    def test_waiter_gets_returned_connection(self):
+        """ A blocked checkout is served by a connection checked in """
+        pool = self.pool(size=1, max_overflow=0)
+        cnx = pool.checkout()
+        timer = threading.Timer(0.05, pool.checkin, (cnx,))
+        timer.start()
+        self.assertIs(pool.checkout(timeout=5), cnx)
+        timer.join()
+
+    def test_dead_connection_replaced(self):
+        """ A connection that died while idle is closed and replaced """
+        pool = self.pool(size=1, max_overflow=0)
+        with pool.connection() as cnx:
+            pass
+        cnx.alive = False
+        with pool.connection() as fresh:
+            self.assertIsNot(fresh, cnx)
+            self.assertTrue(fresh.alive)
+        self.assertTrue(cnx.closed)
+        self.assertEqual(pool.opened, 1)
+
+    def test_broken_connection_dropped(self):
+        """ A connection whose rollback fails is not returned to idle """
+        pool = self.pool(size=1, max_overflow=0)
+        with self.assertRaises(RuntimeError):
+            with pool.connection() as cnx:
+                cnx.alive = False
+                raise RuntimeError("query failed")
+        self.assertTrue(cnx.closed)
+        self.assertEqual((pool.opened, pool.idle), (0, 0))
+
+    def test_idle_timeout(self):
+        """ Connections idle for too long are not handed out again """
+        pool = self.pool(size=1, max_overflow=0, idle_timeout=0.01)
+        with pool.connection() as cnx:
+            pass
+        time.sleep(0.02)
+        with pool.connection() as fresh:
+            self.assertIsNot(fresh, cnx)
+        self.assertTrue(cnx.closed)
+
+    def test_validation_runs_outside_lock(self):
+        """ A slow validation does not block other checkouts """
+        entered, release = threading.Event(), threading.Event()
+
+        def slow_validate(cnx):
+            if cnx.number == 0:
+                entered.set()
+                release.wait(5)
+            return True
+
+        pool = self.pool(size=2, max_overflow=0, validate=slow_validate)
+        pool.checkin(pool.checkout())
+        worker = threading.Thread(target=pool.checkout)
+        worker.start()
+        self.assertTrue(entered.wait(5))
+        try:
+            started = time.monotonic()
+            other = pool.checkout(timeout=1)
+            self.assertLess(time.monotonic() - started, 1)
+            self.assertEqual(other.number, 1)
+        finally:
+            release.set()
+            worker.join()
+
+    def slow_close(self, cnx: FakeConnection):
+        """ Makes closing cnx hang until the returned event is set
+
+            Returns (entered, release): entered is set once close starts.
+            """
+        entered, release = threading.Event(), threading.Event()
+
+        def close():
+            entered.set()
+            release.wait(5)
+            cnx.closed = True
+
+        cnx.close = close
+        self.addCleanup(release.set)
+        return entered, release
+
+    def test_surplus_closed_outside_lock(self):
+        """ A slow close on checkin does not block other checkouts """
+        pool = self.pool(size=1, max_overflow=1)
+        first, second = pool.checkout(), pool.checkout()
+        pool.checkin(first)
+        entered, release = self.slow_close(second)
+        worker = threading.Thread(target=pool.checkin, args=(second,))
+        worker.start()
+        self.assertTrue(entered.wait(5))
+        try:
+            started = time.monotonic()
+            self.assertIs(pool.checkout(timeout=1), first)
+            self.assertLess(time.monotonic() - started, 1)
+        finally:
+            release.set()
+            worker.join()
+        self.assertTrue(second.closed)
+        self.assertEqual(pool.opened, 1)
+
+    def test_expired_closed_outside_lock(self):
+        """ A slow close of an expired idle connection blocks no one """
+        pool = self.pool(size=1, max_overflow=1, idle_timeout=0.01)
+        stale = pool.checkout()
+        pool.checkin(stale)
+        time.sleep(0.02)
+        entered, release = self.slow_close(stale)
+        checked_out = []
+        worker = threading.Thread(
+            target=lambda: checked_out.append(pool.checkout()))
+        worker.start()
+        self.assertTrue(entered.wait(5))
+        try:
+            started = time.monotonic()
+            other = pool.checkout(timeout=1)
+            self.assertLess(time.monotonic() - started, 1)
+            self.assertIsNot(other, stale)
+        finally:
+            release.set()
+            worker.join()
+        self.assertTrue(stale.closed)
+        self.assertNotIn(stale, checked_out)
+        self.assertEqual(pool.opened, 2)
+
+    def test_close_pool_closes_idle(self):
+        """ Closing the pool closes every idle connection """
+        pool = self.pool(size=2, max_overflow=0)
+        first, second = pool.checkout(), pool.checkout()
+        pool.checkin(first)
+        pool.checkin(second)
+        pool.close()
+        self.assertTrue(first.closed and second.closed)
+        self.assertEqual((pool.opened, pool.idle), (0, 0))
+
+    def test_closed_pool_refuses_checkout(self):
+        """ Checkout fails once the pool is closed """
+        pool = self.pool()
+        pool.close()
+        with self.assertRaises(PoolTimeout):
+            pool.checkout()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+""" Tests of the batch hashing and verification helpers
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+try:
+    import bcrypt
+except ImportError:  # pragma: no cover
+    bcrypt = None
+else:
+    import encrypt_password
+    from encrypt_password import hash_passwords, verify_passwords
+
+
+class CostTestCase(unittest.TestCase):
+    """ Runs each test with cheap hashes and no cached cost """
+
+    def setUp(self):
+        """ Sets BCRYPT_COST=4, inherited by pool processes too """
+        for patcher in (mock.patch.dict(os.environ, {"BCRYPT_COST": "4"}),
+                        mock.patch.object(encrypt_password, "_cost", None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+@unittest.skipIf(bcrypt is None, "bcrypt is missing")
+class TestBatches(CostTestCase):
+    """ hash_passwords and verify_passwords over several chunks """
+
+    PASSWORDS = [f"pwd-{i}" for i in range(11)]
+
+    def test_input_order_kept(self):
+        """ Results come back in input order, in both pool modes """
+        for mode in ("process", "thread"):
+            with self.subTest(mode=mode):
+                hashes = list(hash_passwords(self.PASSWORDS, workers=2,
+                                             mode=mode, chunksize=3))
+                self.assertEqual(len(hashes), len(self.PASSWORDS))
+                for password, hashed in zip(self.PASSWORDS, hashes):
+                    self.assertTrue(bcrypt.checkpw(password.encode(),
+                                                   hashed))
+                    self.assertEqual(encrypt_password.hash_cost(hashed), 4)
+                # Every third pair is given a wrong password
+                pairs = [(hashed, p if i % 3 else "wrong")
+                         for i, (p, hashed) in enumerate(
+                             zip(self.PASSWORDS, hashes))]
+                self.assertEqual(
+                    list(verify_passwords(pairs, workers=2, mode=mode,
+                                          chunksize=3)),
+                    [i % 3 != 0 for i in range(len(pairs))])
+
+    def test_progress_counts(self):
+        """ on_progress gets the running total after each chunk """
+        calls = []
+        hashes = list(hash_passwords(
+            iter(self.PASSWORDS), workers=2, mode="thread", chunksize=4,
+            on_progress=lambda done, rate: calls.append((done, rate))))
+        self.assertEqual(len(hashes), 11)
+        self.assertEqual([done for done, _ in calls], [4, 8, 11])
+        self.assertTrue(all(rate >= 0 for _, rate in calls))
+
+    def test_unknown_mode(self):
+        """ A mode other than process or thread is refused """
+        with self.assertRaises(ValueError):
+            list(hash_passwords(self.PASSWORDS, mode="fiber"))
+        with self.assertRaises(ValueError):
+            list(verify_passwords([], mode="fiber"))
+
+    def test_empty_input(self):
+        """ No input gives no result and no progress call """
+        on_progress = mock.Mock()
+        for mode in ("process", "thread"):
+            with self.subTest(mode=mode):
+                self.assertEqual(list(hash_passwords(
+                    [], workers=2, mode=mode, on_progress=on_progress)), [])
+                self.assertEqual(list(verify_passwords(
+                    iter(()), workers=2, mode=mode,
+                    on_progress=on_progress)), [])
+        on_progress.assert_not_called()
+
+
+@unittest.skipIf(bcrypt is None, "bcrypt is missing")
+class TestCost(CostTestCase):
+    """ Calibration and configuration of the bcrypt cost """
+
+    def setUp(self):
+        """ Points the cost file into a temporary directory """
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cost_file = os.path.join(tmp.name, ".bcrypt_cost")
+        patcher = mock.patch.object(encrypt_password, "COST_FILE",
+                                    self.cost_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_cost(self, env=None):
+        """ get_cost with BCRYPT_COST set to env (unset if None) """
+        encrypt_password._cost = None
+        os.environ.pop("BCRYPT_COST", None)
+        if env is not None:
+            os.environ["BCRYPT_COST"] = env
+        return encrypt_password.get_cost()
+
+    def test_cost_precedence(self):
+        """ BCRYPT_COST beats the cost file, which beats DEFAULT_COST """
+        self.assertEqual(self.get_cost(), encrypt_password.DEFAULT_COST)
+        with open(self.cost_file, "w") as f:
+            f.write("9\n")
+        self.assertEqual(self.get_cost(), 9)
+        self.assertEqual(self.get_cost("5"), 5)
+
+    def test_needs_rehash_after_save(self):
+        """ Hashes of the previous cost need a rehash once it changes """
+        self.assertEqual(self.get_cost(), encrypt_password.DEFAULT_COST)
+        encrypt_password.save_cost(4)
+        hashed = encrypt_password.hash_password("pwd")
+        self.assertFalse(encrypt_password.needs_rehash(hashed))
+        encrypt_password.save_cost(5)
+        self.assertTrue(encrypt_password.needs_rehash(hashed))
+        self.assertTrue(encrypt_password.needs_rehash(hashed.decode()))
+        with open(self.cost_file) as f:
+            self.assertEqual(f.read(), "5\n")
+        # A fresh process reads the saved cost back
+        self.assertEqual(self.get_cost(), 5)
+
+    def test_calibrate_cost(self):
+        """ The highest cost under target is picked, within the bounds """
+        clock = [0.0]
+
+        def checkpw(password, hashed):
+            """ Takes 1 ms at cost 4, twice as long per extra round """
+            clock[0] += 2 ** (encrypt_password.hash_cost(hashed) - 4) / 1000
+
+        with mock.patch.object(encrypt_password.bcrypt, "checkpw",
+                               checkpw), \
+                mock.patch.object(encrypt_password.time, "perf_counter",
+                                  lambda: clock[0]):
+            # 4:1ms 5:2ms 6:4ms 7:8ms
+            self.assertEqual(encrypt_password.calibrate_cost(
+                target_ms=5, min_cost=4, max_cost=8), 6)
+            self.assertEqual(encrypt_password.calibrate_cost(
+                target_ms=0.5, min_cost=4, max_cost=8), 4)
+            self.assertEqual(encrypt_password.calibrate_cost(
+                target_ms=1000, min_cost=4, max_cost=7), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,7 @@ Main Flask application
 """
 from flask import Flask, jsonify, abort, request
 from api.v1.views import app_views
+from api.v1.auth.auth import Auth
 import os
 
 app = Flask(__name__)
@@ -22,9 +23,15 @@ if AUTH_TYPE == 'basic_auth':  # Check for basic_auth first
     from api.v1.auth.basic_auth import BasicAuth
     auth = BasicAuth()
 elif AUTH_TYPE == 'auth':  # Fallback to general Auth if not basic_auth
-    from api.v1.auth.auth import Auth
     auth = Auth()
 
+# Paths open without authentication, compiled once at startup
+EXCLUDED_PATHS = Auth.compile_excluded_paths([
+    '/api/v1/status/',
+    '/api/v1/unauthorized/',
+    '/api/v1/forbidden/'
+])
+
 
 # --- Error handlers ---
 
@@ -66,13 +73,7 @@ def handle_before_request():
     if auth is None:
         return
 
-    excluded_paths = [
-        '/api/v1/status/',
-        '/api/v1/unauthorized/',
-        '/api/v1/forbidden/'
-    ]
-
-    if auth.require_auth(request.path, excluded_paths):
+    if auth.require_auth(request.path, EXCLUDED_PATHS):
         if auth.authorization_header(request) is None:
             abort(401)
         if auth.current_user(request) is None:
@@ -3,7 +3,62 @@
 Auth class to manage API authentication.
 """
 from flask import request
-from typing import List, TypeVar
+from functools import lru_cache
+from typing import List, Tuple, TypeVar
+import re
+
+
+def _normalize(path: str) -> str:
+    """
+    Returns path with exactly one trailing slash ("/" stays "/").
+    """
+    if path == "/":
+        return "/"
+    return path.rstrip('/') + '/'
+
+
+class PathMatcher:
+    """
+    Excluded paths compiled once into a single regular expression.
+
+    Paths are compared exactly, each with exactly one trailing slash.
+    Decisions are memoized per path.
+    """
+
+    def __init__(self, excluded_paths: List[str], cache_size: int = 1024):
+        """
+        Builds the matcher; non-string entries are ignored.
+        """
+        self.excluded_paths = tuple(p for p in excluded_paths
+                                    if isinstance(p, str))
+        alternatives = [re.escape(_normalize(excluded_path))
+                        for excluded_path in self.excluded_paths]
+        self._regex = None
+        if alternatives:
+            self._regex = re.compile('|'.join(alternatives))
+        self.is_excluded = lru_cache(maxsize=cache_size)(self._is_excluded)
+
+    def __len__(self) -> int:
+        """
+        Number of excluded paths.
+        """
+        return len(self.excluded_paths)
+
+    def _is_excluded(self, path: str) -> bool:
+        """
+        True if path equals one of the excluded paths.
+        """
+        if self._regex is None:
+            return False
+        return self._regex.fullmatch(_normalize(path)) is not None
+
+
+@lru_cache(maxsize=64)
+def _compile_excluded_paths(excluded_paths: Tuple[str]) -> PathMatcher:
+    """
+    Shared PathMatcher of a tuple of excluded paths.
+    """
+    return PathMatcher(list(excluded_paths))
 
 
 class Auth:
@@ -11,10 +66,19 @@ class Auth:
     Auth class definition.
     """
 
+    @staticmethod
+    def compile_excluded_paths(excluded_paths: List[str]) -> PathMatcher:
+        """
+        Compiles excluded paths once, typically at application startup.
+        The result can be passed to require_auth as excluded_paths.
+        """
+        return PathMatcher(excluded_paths)
+
     def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
         """
         Checks if a given path requires authentication.
-        Returns True if the path is not in the list of excluded_paths.
+        Returns True if the path is not in the list of excluded_paths,
+        which may also be a PathMatcher compiled from such a list.
         """
         if path is None:
             return True
@@ -22,31 +86,12 @@ class Auth:
         if excluded_paths is None or not excluded_paths:
             return True
 
-        # Normalize path: ensure it has exactly one trailing slash
-        if path == "/":
-            normalized_path = "/"
-        else:
-            # Strip all trailing slashes, then add one back
-            normalized_path = path.rstrip('/') + '/'
-
-        for excluded_path_candidate in excluded_paths:
-            # Defensive check for non-string or None elements
-            if not isinstance(excluded_path_candidate, str) or \
-                    excluded_path_candidate is None:
-                continue
-
-            # Normalize the excluded path candidate for consistent comparison
-            if excluded_path_candidate == "/":
-                normalized_excluded_path = "/"
-            else:
-                # THIS LINE IS NOW BROKEN INTO TWO FOR PEP8 COMPLIANCE
-                normalized_excluded_path = \
-                    excluded_path_candidate.rstrip('/') + '/'
-
-            if normalized_path == normalized_excluded_path:
-                return False
-
-        return True
+        if not isinstance(excluded_paths, PathMatcher):
+            # Only strings can be excluded paths; dropping the rest also
+            # keeps the cache key hashable
+            excluded_paths = _compile_excluded_paths(tuple(
+                p for p in excluded_paths if isinstance(p, str)))
+        return not excluded_paths.is_excluded(path)
 
     def authorization_header(self, request=None) -> str:
         """
@@ -2,7 +2,7 @@
 """
 Module of Index views.
 """
-from flask import jsonify, abort  # Required Flask imports for views
+from flask import jsonify, abort, request  # Required Flask imports for views
 from api.v1.views import app_views
 
 
@@ -20,12 +20,17 @@ def status() -> str:
 def stats() -> str:
     """
     GET /api/v1/stats
+    Query parameter (optional):
+      - extra=1: add users_created_24h
     Returns:
-      - The number of each object.
+      - The number of each object, from counters kept by the models.
     """
     from models.user import User
     stats = {}
-    stats['users'] = User.count()  # Assuming User.count() is implemented
+    user_stats = User.stats()
+    stats['users'] = user_stats['count']
+    if request.args.get('extra'):
+        stats['users_created_24h'] = user_stats['created_recently']
     return jsonify(stats)
 
 
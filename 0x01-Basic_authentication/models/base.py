@@ -1,21 +1,85 @@
 #!/usr/bin/env python3
 """ Base module
 """
-from datetime import datetime
-from typing import TypeVar, List, Iterable
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import FrozenSet, TypeVar, List, Iterable, Iterator
 from os import path
+from models.journal import Compactor, Journal, write_snapshot
+import bisect
+import itertools
 import json
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+JOURNALS = {}
+INDEXES = {}
+# Versions, per class, of each object by id and of the whole collection
+VERSIONS = {}
+COLLECTION_VERSIONS = {}
+# Versions come from one process-wide counter; ETags are prefixed with
+# the process epoch so that two processes never issue the same ETag
+_NEXT_VERSION = itertools.count(1)
+EPOCH = uuid.uuid4().hex[:8]
+
+
+def _sorted_remove(values: list, value) -> None:
+    """ Remove one occurrence of value from a sorted list, if present
+    """
+    i = bisect.bisect_left(values, value)
+    if i < len(values) and values[i] == value:
+        del values[i]
+
+
+class _SerializerPlan(dict):
+    """ Keys to_json returns for the objects of one class
+
+    Maps each attribute name met so far to whether it is returned:
+    private attributes are dropped unless for_serialization. When
+    fields are given, keys lists the ones to return, so that only
+    those are looked up on each object.
+    """
+
+    def __init__(self, for_serialization: bool,
+                 fields: FrozenSet[str] = None):
+        """ Plan for the given options
+        """
+        super().__init__()
+        self.for_serialization = for_serialization
+        self.keys = None
+        if fields is not None:
+            self.keys = tuple(key for key in sorted(fields) if self[key])
+
+    def __missing__(self, key: str) -> bool:
+        """ Decide once whether key is returned
+        """
+        keep = self.for_serialization or not key.startswith('_')
+        self[key] = keep
+        return keep
+
+
+@lru_cache(maxsize=256)
+def _serializer_plan(cls, for_serialization: bool,
+                     fields: FrozenSet[str] = None) -> _SerializerPlan:
+    """ Shared plan of a class for the given to_json options
+    """
+    return _SerializerPlan(for_serialization, fields)
 
 
 class Base():
     """ Base class
+
+    Subclasses declare secondary indexes on attributes with
+    UNIQUE_INDEXES (one object per value) and INDEXES (any number);
+    search uses them for the attributes it is queried on. Ids are also
+    kept sorted, for cursor pagination with page.
     """
 
+    UNIQUE_INDEXES = ()
+    INDEXES = ()
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
@@ -44,62 +108,200 @@ class Base():
             return False
         return (self.id == other.id)
 
-    def to_json(self, for_serialization: bool = False) -> dict:
+    def to_json(self, for_serialization: bool = False,
+                fields: FrozenSet[str] = None) -> dict:
         """ Convert the object a JSON dictionary
+
+        fields, if given, is the set of keys to return. Which keys are
+        returned is decided once per class by _serializer_plan; every
+        datetime value is formatted with TIMESTAMP_FORMAT.
         """
-        result = {}
-        for key, value in self.__dict__.items():
-            if not for_serialization and key[0] == '_':
-                continue
-            if type(value) is datetime:
-                result[key] = value.strftime(TIMESTAMP_FORMAT)
-            else:
-                result[key] = value
-        return result
+        attrs = self.__dict__
+        plan = _serializer_plan(type(self), for_serialization, fields)
+        if plan.keys is None:
+            items = ((key, value) for key, value in attrs.items()
+                     if plan[key])
+        else:
+            items = ((key, attrs[key]) for key in plan.keys if key in attrs)
+        return {key: value.strftime(TIMESTAMP_FORMAT)
+                if type(value) is datetime else value
+                for key, value in items}
+
+    @classmethod
+    def _journal(cls) -> Journal:
+        """ Journal of changes since the last snapshot of this class
+        """
+        s_class = cls.__name__
+        journal = JOURNALS.get(s_class)
+        if journal is None:
+            journal = Journal(".db_{}.journal".format(s_class))
+            JOURNALS[s_class] = journal
+            Compactor(cls.save_to_file, journal).start()
+        return journal
 
     @classmethod
     def load_from_file(cls):
-        """ Load all objects from file
+        """ Load all objects from file, then replay the journal
         """
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
         DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
+        INDEXES.pop(s_class, None)
+        VERSIONS[s_class] = {}
+        COLLECTION_VERSIONS[s_class] = next(_NEXT_VERSION)
+        if path.exists(file_path):
+            with open(file_path, 'r') as f:
+                objs_json = json.load(f)
+                for obj_id, obj_json in objs_json.items():
+                    DATA[s_class][obj_id] = cls(**obj_json)
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+        for entry in cls._journal().replay():
+            if entry["op"] == "delete":
+                DATA[s_class].pop(entry["id"], None)
+            else:
+                DATA[s_class][entry["id"]] = cls(**entry["obj"])
+
+        cls._indexes()
 
     @classmethod
     def save_to_file(cls):
-        """ Save all objects to file
+        """ Save all objects to file (snapshot)
+
+        The journal is set aside first, so every change it holds is
+        already in DATA when the snapshot is taken.
         """
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
+        journal = cls._journal()
+        journal.rotate()
         objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
+        for obj_id, obj in list(DATA[s_class].items()):
             objs_json[obj_id] = obj.to_json(True)
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+        write_snapshot(file_path, objs_json)
+        journal.discard_rotated()
 
     def save(self):
         """ Save current object
         """
+        self.__class__._check_unique(self)
+        self.__class__._journal().append([self._apply_save()])
+
+    def remove(self):
+        """ Remove object
+        """
+        entry = self._apply_remove()
+        if entry is not None:
+            self.__class__._journal().append([entry])
+
+    @classmethod
+    def save_many(cls, objs: Iterable[TypeVar('Base')]):
+        """ Save a batch of objects with a single journal write
+
+        Unique indexes are checked for the whole batch, against stored
+        objects and between batch members, before anything changes:
+        on ValueError, nothing is saved.
+        """
+        objs = list(objs)
+        s_class = cls.__name__
+        cls._indexes()  # built before DATA gets the new objects
+        seen = {attr: {} for attr in cls.UNIQUE_INDEXES}
+        for obj in objs:
+            cls._check_unique(obj)
+            for attr in cls.UNIQUE_INDEXES:
+                value = getattr(obj, attr, None)
+                if value is None:
+                    continue
+                if seen[attr].setdefault(value, obj.id) != obj.id:
+                    raise ValueError(
+                        "{} {} appears twice".format(attr, value))
+        new = {obj.id: obj for obj in objs if obj.id not in DATA[s_class]}
+        entries = [obj._apply_save(ordered=False) for obj in objs]
+        cls._add_to_order(list(new.values()))
+        if entries:
+            cls._journal().append(entries)
+
+    @classmethod
+    def remove_many(cls, objs: Iterable[TypeVar('Base')]):
+        """ Remove a batch of objects with a single journal write
+        """
+        entries = [obj._apply_remove() for obj in objs]
+        entries = [entry for entry in entries if entry is not None]
+        if entries:
+            cls._journal().append(entries)
+
+    def _apply_save(self, ordered: bool = True) -> dict:
+        """ Store the object in memory and return its journal entry
+
+        A new object is added to the sorted lists unless ordered is
+        False, in which case the caller does it with _add_to_order.
+        """
         s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
+        if ordered and self.id not in DATA[s_class]:
+            self.__class__._add_to_order([self])
         DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        self.__class__._index(self)
+        version = next(_NEXT_VERSION)
+        VERSIONS.setdefault(s_class, {})[self.id] = version
+        COLLECTION_VERSIONS[s_class] = version
+        return {"op": "upsert", "id": self.id, "obj": self.to_json(True)}
 
-    def remove(self):
-        """ Remove object
+    def _apply_remove(self) -> dict:
+        """ Drop the object from memory and return its journal entry,
+        None if it was not stored
         """
         s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        if DATA[s_class].get(self.id) is None:
+            return None
+        del DATA[s_class][self.id]
+        self.__class__._unindex(self.id)
+        indexes = self.__class__._indexes()
+        _sorted_remove(indexes["__order__"], self.id)
+        _sorted_remove(indexes["__created__"], self.created_at)
+        VERSIONS.get(s_class, {}).pop(self.id, None)
+        COLLECTION_VERSIONS[s_class] = next(_NEXT_VERSION)
+        return {"op": "delete", "id": self.id}
+
+    @classmethod
+    def _add_to_order(cls, objs: List[TypeVar('Base')]):
+        """ Add new objects to the sorted id and creation lists
+
+        A large batch is appended then sorted once, instead of being
+        inserted one object at a time.
+        """
+        indexes = cls._indexes()
+        if len(objs) == 1:
+            bisect.insort(indexes["__order__"], objs[0].id)
+            bisect.insort(indexes["__created__"], objs[0].created_at)
+        elif objs:
+            indexes["__order__"].extend(obj.id for obj in objs)
+            indexes["__order__"].sort()
+            indexes["__created__"].extend(obj.created_at for obj in objs)
+            indexes["__created__"].sort()
+
+    def etag(self) -> str:
+        """ Strong entity tag of the object, changed by every save
+
+        Objects loaded from file get their version on first use.
+        """
+        versions = VERSIONS.setdefault(self.__class__.__name__, {})
+        version = versions.get(self.id)
+        if version is None:
+            version = versions.setdefault(self.id, next(_NEXT_VERSION))
+        return "{}-{}".format(EPOCH, version)
+
+    @classmethod
+    def collection_etag(cls) -> str:
+        """ Strong entity tag of the class, changed by every save, remove
+        and load
+        """
+        s_class = cls.__name__
+        version = COLLECTION_VERSIONS.get(s_class)
+        if version is None:
+            version = COLLECTION_VERSIONS.setdefault(
+                s_class, next(_NEXT_VERSION))
+        return "{}-c{}".format(EPOCH, version)
 
     @classmethod
     def count(cls) -> int:
@@ -114,6 +316,21 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def stats(cls, window: float = 86400) -> dict:
+        """ Counters of this class, kept up to date by save and remove
+
+        Returns the number of objects and, as created_recently, how
+        many were created during the last window seconds.
+        """
+        created = cls._indexes()["__created__"]
+        since = datetime.utcnow() - timedelta(seconds=window)
+        return {
+            "count": len(DATA.get(cls.__name__, {})),
+            "created_recently": len(created) -
+            bisect.bisect_left(created, since),
+        }
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
@@ -121,11 +338,105 @@ class Base():
         s_class = cls.__name__
         return DATA[s_class].get(id)
 
+    @classmethod
+    def _indexes(cls) -> dict:
+        """ Index structures of this class, created on first use
+
+        Maps each indexed attribute to {value: id} for unique indexes
+        or {value: set of ids}, plus "__values__" mapping each id to the
+        attribute values it is currently indexed under, "__order__",
+        the sorted list of ids, and "__created__", the sorted list of
+        creation datetimes.
+        """
+        s_class = cls.__name__
+        indexes = INDEXES.get(s_class)
+        if not indexes:
+            indexes = {attr: {} for attr in cls.UNIQUE_INDEXES + cls.INDEXES}
+            indexes["__values__"] = {}
+            indexes["__order__"] = sorted(DATA.get(s_class, {}))
+            indexes["__created__"] = sorted(
+                obj.created_at for obj in DATA.get(s_class, {}).values())
+            INDEXES[s_class] = indexes
+            for obj in DATA.get(s_class, {}).values():
+                cls._index(obj)
+        return indexes
+
+    @classmethod
+    def _check_unique(cls, obj: TypeVar('Base')):
+        """ Raise ValueError if obj collides on a unique index
+        """
+        indexes = cls._indexes()
+        for attr in cls.UNIQUE_INDEXES:
+            value = getattr(obj, attr, None)
+            if value is None:
+                continue
+            owner = indexes[attr].get(value)
+            if owner is not None and owner != obj.id:
+                raise ValueError("{} {} already exists".format(attr, value))
+
+    @classmethod
+    def _index(cls, obj: TypeVar('Base')):
+        """ (Re)index an object under its current attribute values
+        """
+        indexes = cls._indexes()
+        cls._unindex(obj.id)
+        values = {}
+        for attr in cls.UNIQUE_INDEXES + cls.INDEXES:
+            value = getattr(obj, attr, None)
+            if value is None:
+                continue
+            if attr in cls.UNIQUE_INDEXES:
+                indexes[attr].setdefault(value, obj.id)
+            else:
+                indexes[attr].setdefault(value, set()).add(obj.id)
+            values[attr] = value
+        indexes["__values__"][obj.id] = values
+
+    @classmethod
+    def _unindex(cls, obj_id: str):
+        """ Remove an object from the indexes
+        """
+        indexes = cls._indexes()
+        for attr, value in indexes["__values__"].pop(obj_id, {}).items():
+            if attr in cls.UNIQUE_INDEXES:
+                if indexes[attr].get(value) == obj_id:
+                    del indexes[attr][value]
+                continue
+            ids = indexes[attr].get(value)
+            if ids is not None:
+                ids.discard(obj_id)
+                if not ids:
+                    del indexes[attr][value]
+
+    @classmethod
+    def _candidates(cls, attributes: dict) -> Iterable[TypeVar('Base')]:
+        """ Objects possibly matching attributes, narrowed by an index
+        """
+        s_class = cls.__name__
+        indexes = cls._indexes()
+        best = None
+        for k, v in attributes.items():
+            if v is None or \
+                    k not in cls.UNIQUE_INDEXES + cls.INDEXES:
+                continue
+            if k in cls.UNIQUE_INDEXES:
+                obj_id = indexes[k].get(v)
+                ids = () if obj_id is None else (obj_id,)
+            else:
+                ids = indexes[k].get(v, ())
+            if best is None or len(ids) < len(best):
+                best = ids
+        if best is None:
+            return DATA[s_class].values()
+        return [DATA[s_class][obj_id] for obj_id in best]
+
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
+
+        Indexed attributes are looked up directly, the others are
+        compared on the remaining candidates.
         """
-        s_class = cls.__name__
         def _search(obj):
             if len(attributes) == 0:
                 return True
@@ -133,6 +444,34 @@ class Base():
                 if (getattr(obj, k) != v):
                     return False
             return True
-        
-        return list(filter(_search, DATA[s_class].values()))
 
+        return list(filter(_search, cls._candidates(attributes)))
+
+    @classmethod
+    def page(cls, after: str = None,
+             limit: int = None) -> List[TypeVar('Base')]:
+        """ Objects in id order, starting right after the id `after`
+
+        Only the ids of the page are looked up, so the cost depends on
+        limit rather than on the number of objects.
+        """
+        s_class = cls.__name__
+        order = cls._indexes()["__order__"]
+        start = 0 if after is None else bisect.bisect_right(order, after)
+        end = None if limit is None else start + limit
+        return [DATA[s_class][obj_id] for obj_id in order[start:end]]
+
+    @classmethod
+    def iter_page(cls, after: str = None,
+                  batch_size: int = 100) -> Iterator[TypeVar('Base')]:
+        """ Lazily yield objects in id order, starting after `after`
+
+        Objects are fetched batch_size at a time; each batch resumes
+        from the last id yielded, so concurrent changes are tolerated.
+        """
+        while True:
+            batch = cls.page(after, batch_size)
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            after = batch[-1].id
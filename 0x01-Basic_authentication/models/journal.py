@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+""" Journal module
+"""
+from typing import Callable, Iterator, List
+import atexit
+import json
+import os
+import threading
+import time
+
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+def write_snapshot(file_path: str, data, indent: int = None) -> None:
+    """ Atomically replace file_path by the JSON dump of data
+    """
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+class Journal:
+    """ Append-only log of changes made since the last snapshot
+
+    Each entry is one JSON line: {"op": "upsert", "id": ..., "obj": {...}}
+    or {"op": "delete", "id": ...}. fsync is "always" (every append),
+    "interval" (at most every fsync_interval seconds) or "never" (left to
+    the OS); defaults come from JOURNAL_FSYNC and JOURNAL_FSYNC_INTERVAL.
+    """
+    def __init__(self, path: str, fsync: str = None,
+                 fsync_interval: float = None):
+        """ Init
+        """
+        fsync = fsync or os.getenv("JOURNAL_FSYNC", "interval")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError("unknown fsync policy: {}".format(fsync))
+        if fsync_interval is None:
+            fsync_interval = float(os.getenv("JOURNAL_FSYNC_INTERVAL", 1))
+        self.path = path
+        self.rotated_path = path + ".compacting"
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.entries = 0
+        self._file = None
+        self._dirty = False
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _open(self):
+        """ Journal file opened for appending
+        """
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, 'a')
+            if self._file.tell() > 0:
+                with open(self.path, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+                if torn:
+                    # Keep new entries off a line torn by a crash
+                    self._file.write("\n")
+        return self._file
+
+    def _sync(self, force: bool = False) -> None:
+        """ fsync the journal according to the policy, lock held
+        """
+        if self._file is None or not self._dirty:
+            return
+        now = time.monotonic()
+        if force or self.fsync == "always" or (
+                self.fsync == "interval" and
+                now - self._last_sync >= self.fsync_interval):
+            os.fsync(self._file.fileno())
+            self._dirty = False
+            self._last_sync = now
+
+    def append(self, entries: List[dict]) -> None:
+        """ Write entries with a single write call
+        """
+        data = "".join(json.dumps(entry, separators=(",", ":")) + "\n"
+                       for entry in entries)
+        with self._lock:
+            f = self._open()
+            f.write(data)
+            f.flush()
+            self._dirty = True
+            self._sync()
+            self.entries += len(entries)
+
+    def sync(self) -> None:
+        """ fsync pending writes whatever the policy
+        """
+        with self._lock:
+            self._sync(force=self.fsync != "never")
+
+    def replay(self) -> Iterator[dict]:
+        """ Entries of the rotated then current journal, in write order
+
+        A torn line, left by a crash in the middle of a write, is
+        skipped; the entries written after it are still replayed.
+        """
+        count = 0
+        for file_path in (self.rotated_path, self.path):
+            if not os.path.exists(file_path):
+                continue
+            with open(file_path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    count += 1
+                    yield entry
+        self.entries = count
+
+    def rotate(self) -> None:
+        """ Set the current journal aside before a snapshot is written
+        """
+        with self._lock:
+            self._sync(force=True)
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if not os.path.exists(self.path):
+                pass
+            elif os.path.exists(self.rotated_path):
+                # A failed compaction left entries that no snapshot
+                # holds yet: keep them, followed by the current ones
+                self._merge_into_rotated()
+            else:
+                os.replace(self.path, self.rotated_path)
+            self.entries = 0
+
+    def _merge_into_rotated(self) -> None:
+        """ Append the current journal to the rotated one, lock held
+        """
+        with open(self.rotated_path, 'rb+') as rotated:
+            rotated.seek(0, os.SEEK_END)
+            if rotated.tell() > 0:
+                rotated.seek(-1, os.SEEK_END)
+                if rotated.read(1) != b"\n":
+                    # Isolate a torn last line from what follows
+                    rotated.write(b"\n")
+            with open(self.path, 'rb') as current:
+                while True:
+                    chunk = current.read(1 << 20)
+                    if not chunk:
+                        break
+                    rotated.write(chunk)
+            rotated.flush()
+            os.fsync(rotated.fileno())
+        os.remove(self.path)
+
+    def discard_rotated(self) -> None:
+        """ Drop the rotated journal once the snapshot holds its changes
+        """
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    def close(self) -> None:
+        """ Sync and close the journal file
+        """
+        with self._lock:
+            self._sync(force=self.fsync != "never")
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class Compactor(threading.Thread):
+    """ Background thread folding the journal into a new snapshot
+
+    Every interval seconds (JOURNAL_COMPACT_INTERVAL), pending writes
+    are synced and compact() is called once the journal holds at least
+    min_entries entries (JOURNAL_COMPACT_MIN_ENTRIES).
+    """
+    def __init__(self, compact: Callable[[], None], journal: Journal,
+                 interval: float = None, min_entries: int = None):
+        """ Init
+        """
+        super().__init__(daemon=True)
+        if interval is None:
+            interval = float(os.getenv("JOURNAL_COMPACT_INTERVAL", 60))
+        if min_entries is None:
+            min_entries = int(os.getenv("JOURNAL_COMPACT_MIN_ENTRIES", 1000))
+        self.compact = compact
+        self.journal = journal
+        self.interval = interval
+        self.min_entries = min_entries
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        """ Compaction loop
+        """
+        while not self._stopped.wait(self.interval):
+            try:
+                self.journal.sync()
+                if self.journal.entries >= self.min_entries:
+                    self.compact()
+            except Exception:
+                pass
+
+    def stop(self) -> None:
+        """ Ask the loop to exit
+        """
+        self._stopped.set()
@@ -9,6 +9,8 @@ class User(Base):
     """ User class
     """
 
+    UNIQUE_INDEXES = ("email",)
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
         """
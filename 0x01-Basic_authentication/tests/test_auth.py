@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+""" Tests of Auth.require_auth against the original linear scan
+"""
+import itertools
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+try:
+    import flask
+except ImportError:  # pragma: no cover
+    flask = None
+else:
+    from api.v1.auth.auth import Auth
+
+
+def linear_require_auth(path, excluded_paths) -> bool:
+    """ The original require_auth: normalized paths compared one by one
+    """
+    if path is None or not excluded_paths:
+        return True
+    normalized_path = "/" if path == "/" else path.rstrip('/') + '/'
+    for excluded_path in excluded_paths:
+        if not isinstance(excluded_path, str):
+            continue
+        if excluded_path == "/":
+            normalized_excluded_path = "/"
+        else:
+            normalized_excluded_path = excluded_path.rstrip('/') + '/'
+        if normalized_path == normalized_excluded_path:
+            return False
+    return True
+
+
+PATHS = [None, "", "/", "//", "/api/v1/status", "/api/v1/status/",
+         "/api/v1/status//", "/api/v1/stat", "/api/v1/statuses",
+         "/api/v1/status/x", "/api/v1/users", "/api/v1/users/me",
+         "/api/v1/unauthorized/", "/api/v1", "/API/v1/status",
+         "/api/v1/status.json", "/api/v1/s.atus"]
+
+EXCLUDED = [None, [], ["/"], ["/api/v1/status/"], ["/api/v1/status"],
+            ["/api/v1/status//"], ["/api/v1/stat"],
+            ["/api/v1/s.atus/"], ["/api/v1/status/", "/api/v1/stat/"],
+            ["/api/v1/status/", "/api/v1/unauthorized/",
+             "/api/v1/forbidden/"],
+            ["/api/v1/", None, 3, "/api/v1/users"], [""], ["/api/v1/*"]]
+
+
+@unittest.skipIf(flask is None, "flask is not installed")
+class TestRequireAuth(unittest.TestCase):
+    """ The compiled matcher gives the linear scan's decisions
+    """
+    def test_same_decisions(self):
+        """ Every path against every list, raw and precompiled
+        """
+        auth = Auth()
+        for path, excluded in itertools.product(PATHS, EXCLUDED):
+            expected = linear_require_auth(path, excluded)
+            with self.subTest(path=path, excluded=excluded):
+                self.assertEqual(auth.require_auth(path, excluded),
+                                 expected)
+                if excluded is not None:
+                    matcher = Auth.compile_excluded_paths(excluded)
+                    self.assertEqual(auth.require_auth(path, matcher),
+                                     expected)
+
+    def test_examples(self):
+        """ Trailing slashes match, shared prefixes do not
+        """
+        auth = Auth()
+        excluded = ["/api/v1/status/"]
+        self.assertFalse(auth.require_auth("/api/v1/status", excluded))
+        self.assertFalse(auth.require_auth("/api/v1/status/", excluded))
+        self.assertTrue(auth.require_auth("/api/v1/stat", excluded))
+        self.assertTrue(auth.require_auth("/api/v1/statuses", excluded))
+        self.assertTrue(auth.require_auth("/api/v1/status/x", excluded))
+        self.assertTrue(auth.require_auth(None, excluded))
+        self.assertTrue(auth.require_auth("/api/v1/status", None))
+        self.assertTrue(auth.require_auth("/api/v1/status", []))
+        self.assertTrue(auth.require_auth(
+            "/api/v1/status", Auth.compile_excluded_paths([])))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+""" Tests of the journal and of compaction failures
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from models.journal import Journal  # noqa: E402
+
+
+def entry(n: int) -> dict:
+    """ Journal entry numbered n
+    """
+    return {"op": "upsert", "id": str(n), "obj": {"id": str(n)}}
+
+
+class TestJournalRotate(unittest.TestCase):
+    """ Journal.rotate keeps entries no snapshot holds yet
+    """
+    def setUp(self):
+        """ Journal in a temporary directory
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal = Journal(os.path.join(self.tmp.name, "x.journal"),
+                               fsync="never")
+
+    def tearDown(self):
+        """ Close and clean up
+        """
+        self.journal.close()
+        self.tmp.cleanup()
+
+    def ids(self) -> list:
+        """ Ids replayed from disk
+        """
+        return [e["id"] for e in self.journal.replay()]
+
+    def test_rotate_after_failed_compaction(self):
+        """ A second rotate appends to the leftover rotated journal
+        """
+        self.journal.append([entry(1)])
+        self.journal.rotate()
+        # the snapshot failed: discard_rotated is never called
+        self.journal.append([entry(2)])
+        self.journal.rotate()
+        self.assertEqual(self.ids(), ["1", "2"])
+        self.journal.append([entry(3)])
+        self.assertEqual(self.ids(), ["1", "2", "3"])
+        self.journal.discard_rotated()
+        self.assertEqual(self.ids(), ["3"])
+
+    def test_torn_line_does_not_hide_later_entries(self):
+        """ Entries appended after a torn line are replayed
+        """
+        self.journal.append([entry(1)])
+        self.journal.close()
+        with open(self.journal.path, 'a') as f:
+            f.write('{"op": "ups')
+        self.journal.append([entry(2)])
+        self.assertEqual(self.ids(), ["1", "2"])
+        self.journal.rotate()
+        self.journal.append([entry(3)])
+        self.journal.close()
+        with open(self.journal.path, 'a') as f:
+            f.write('{"op"')
+        self.journal.rotate()
+        self.assertEqual(self.ids(), ["1", "2", "3"])
+
+
+class TestSaveToFileFailure(unittest.TestCase):
+    """ Base.save_to_file loses nothing when the snapshot fails
+    """
+    def setUp(self):
+        """ Work in a temporary directory
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        from models import base
+        self.base = base
+        base.DATA.clear()
+        base.JOURNALS.clear()
+        base.INDEXES.clear()
+
+    def tearDown(self):
+        """ Back to the previous directory
+        """
+        for journal in self.base.JOURNALS.values():
+            journal.close()
+        self.base.JOURNALS.clear()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_failed_then_successful_compaction(self):
+        """ Users saved around a failed snapshot survive a reload
+        """
+        from models.user import User
+        User.load_from_file()
+        first = User(email="a@a.com")
+        first.save()
+        with mock.patch("models.base.write_snapshot",
+                        side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                User.save_to_file()
+        second = User(email="b@b.com")
+        second.save()
+        with mock.patch("models.base.write_snapshot",
+                        side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                User.save_to_file()
+        User.load_from_file()
+        self.assertEqual(sorted(u.email for u in User.all()),
+                         ["a@a.com", "b@b.com"])
+        User.save_to_file()
+        User.load_from_file()
+        self.assertEqual(User.count(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+""" Tests of the counters served by Base.stats and GET /api/v1/stats
+"""
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from models import base  # noqa: E402
+from models.user import User  # noqa: E402
+
+try:
+    import flask
+except ImportError:  # pragma: no cover
+    flask = None
+
+OLD = "2020-01-01T00:00:00"
+
+
+class StatsTestCase(unittest.TestCase):
+    """ Works on empty models in a temporary directory
+    """
+    def setUp(self):
+        """ Empty in-memory state, files in a temporary directory
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.clear()
+        User.load_from_file()
+
+    def tearDown(self):
+        """ Back to the previous directory
+        """
+        self.clear()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def clear(self):
+        """ Drop the in-memory state, as a process exit would
+        """
+        for journal in base.JOURNALS.values():
+            journal.close()
+        base.DATA.clear()
+        base.JOURNALS.clear()
+        base.INDEXES.clear()
+
+    def restart(self):
+        """ Reload User from its snapshot and journal
+        """
+        self.clear()
+        User.load_from_file()
+
+    def assertStatsConsistent(self, count: int, recent: int):
+        """ Counters equal both the expected values and a full scan
+        """
+        since = datetime.utcnow() - timedelta(days=1)
+        users = User.all()
+        self.assertEqual(User.stats(), {"count": count,
+                                        "created_recently": recent})
+        self.assertEqual(len(users), count)
+        self.assertEqual(sum(u.created_at >= since for u in users), recent)
+
+
+class TestStats(StatsTestCase):
+    """ Base.stats after each kind of change
+    """
+    def test_save_and_remove(self):
+        """ save and remove move both counters, updates do not
+        """
+        self.assertStatsConsistent(0, 0)
+        bob = User(email="bob@hbtn.io")
+        bob.save()
+        old = User(email="old@hbtn.io", created_at=OLD)
+        old.save()
+        self.assertStatsConsistent(2, 1)
+        bob.first_name = "Bob"
+        bob.save()
+        old.save()
+        self.assertStatsConsistent(2, 1)
+        bob.remove()
+        bob.remove()
+        self.assertStatsConsistent(1, 0)
+        User(email="never@hbtn.io").remove()
+        self.assertStatsConsistent(1, 0)
+        old.remove()
+        self.assertStatsConsistent(0, 0)
+
+    def test_save_many_and_remove_many(self):
+        """ Batches move the counters like one call per object
+        """
+        users = [User(email=f"u{i}@hbtn.io",
+                      created_at=OLD if i % 3 == 0 else None)
+                 for i in range(9)]
+        User.save_many(users[:6])
+        self.assertStatsConsistent(6, 4)
+        User.save_many(users)  # 6 updates, 3 new
+        self.assertStatsConsistent(9, 6)
+        with self.assertRaises(ValueError):
+            User.save_many([User(email="new@hbtn.io"),
+                            User(email="u1@hbtn.io")])
+        self.assertStatsConsistent(9, 6)
+        User.remove_many([users[0], users[1], users[1],
+                          User(email="never@hbtn.io")])
+        self.assertStatsConsistent(7, 5)
+        User.remove_many([])
+        self.assertStatsConsistent(7, 5)
+
+    def test_journal_replay(self):
+        """ Counters rebuilt on restart match those before it, with or
+        without a snapshot
+        """
+        users = [User(email=f"u{i}@hbtn.io",
+                      created_at=OLD if i % 2 else None)
+                 for i in range(6)]
+        User.save_many(users)
+        users[0].remove()
+        self.restart()
+        self.assertStatsConsistent(5, 2)
+
+        User.save_to_file()
+        User.get(users[1].id).remove()  # an old one
+        User(email="new@hbtn.io").save()
+        self.restart()
+        self.assertStatsConsistent(5, 3)
+
+        User.remove_many(User.all())
+        self.restart()
+        self.assertStatsConsistent(0, 0)
+
+
+@unittest.skipIf(flask is None, "flask is not installed")
+class TestStatsView(StatsTestCase):
+    """ GET /api/v1/stats
+    """
+    def setUp(self):
+        """ App with the views
+        """
+        super().setUp()
+        from api.v1.views import app_views
+        app = flask.Flask(__name__)
+        app.register_blueprint(app_views)
+        self.client = app.test_client()
+
+    def test_stats(self):
+        """ The view serves the model counters
+        """
+        User(email="bob@hbtn.io").save()
+        User(email="old@hbtn.io", created_at=OLD).save()
+        self.assertEqual(self.client.get("/api/v1/stats").get_json(),
+                         {"users": 2})
+        self.assertEqual(
+            self.client.get("/api/v1/stats?extra=1").get_json(),
+            {"users": 2, "users_created_24h": 1})
+        User.remove_many(User.all())
+        self.assertEqual(self.client.get("/api/v1/stats/").get_json(),
+                         {"users": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
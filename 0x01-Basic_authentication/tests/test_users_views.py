@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+""" Tests of the conditional and paginated User listing
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+try:
+    import flask
+except ImportError:  # pragma: no cover
+    flask = None
+
+
+@unittest.skipIf(flask is None, "flask is not installed")
+class TestListUsersConditional(unittest.TestCase):
+    """ GET /api/v1/users with If-None-Match
+    """
+    def setUp(self):
+        """ App with the views, on an empty store in a temporary directory
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        from api.v1.views import app_views
+        from models.user import User
+        app = flask.Flask(__name__)
+        app.register_blueprint(app_views)
+        self.client = app.test_client()
+        for name, value in (("collection_etag", "v1"), ("all", []),
+                            ("page", [])):
+            patcher = mock.patch.object(User, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """ Back to the previous directory
+        """
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def get(self, query: str = "", etag: str = None):
+        """ GET the listing, with If-None-Match if etag is given
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get("/api/v1/users" + query, headers=headers)
+
+    def test_strong_and_weak_match(self):
+        """ Both the strong and the weak form of the ETag give a 304
+        """
+        self.assertEqual(self.get(etag='"v1"').status_code, 304)
+        self.assertEqual(self.get(etag='W/"v1"').status_code, 304)
+        self.assertEqual(self.get(etag='"v0"').status_code, 200)
+
+    def test_invalid_limit_before_etag(self):
+        """ An invalid limit is a 400 even with a matching ETag
+        """
+        for query in ("?limit=0", "?limit=x", "?limit=1001"):
+            with self.subTest(query=query):
+                self.assertEqual(self.get(query, '"v1"').status_code, 400)
+        self.assertEqual(self.get("?limit=1", '"v1"').status_code, 304)
+
+    def test_etag_header(self):
+        """ Full listings and pages carry the same quoted ETag
+        """
+        self.assertEqual(self.get().headers["ETag"], '"v1"')
+        self.assertEqual(self.get("?limit=5").headers["ETag"], '"v1"')
+        ndjson = self.get("?limit=5&format=ndjson")
+        self.assertEqual(ndjson.headers["ETag"], '"v1-ndjson"')
+        self.assertEqual(ndjson.mimetype, "application/x-ndjson")
+
+
+@unittest.skipIf(flask is None, "flask is not installed")
+class TestBulkUpdate(unittest.TestCase):
+    """ PUT /api/v1/users/bulk
+    """
+    def setUp(self):
+        """ App with the views and one known user
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        from api.v1.views import app_views
+        from models.user import User
+        app = flask.Flask(__name__)
+        app.register_blueprint(app_views)
+        self.client = app.test_client()
+        self.user = User(email="bob@example.com")
+        users = {self.user.id: self.user}
+        self.get = mock.patch.object(User, "get",
+                                     side_effect=users.get).start()
+        self.save_many = mock.patch.object(User, "save_many").start()
+        self.addCleanup(mock.patch.stopall)
+
+    def tearDown(self):
+        """ Back to the previous directory
+        """
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def put(self, items: list):
+        """ PUT a bulk update
+        """
+        return self.client.put("/api/v1/users/bulk", json=items)
+
+    def test_user_looked_up_once(self):
+        """ Each item's user is fetched once, then updated
+        """
+        response = self.put([{"id": self.user.id, "first_name": "Bob"}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get.call_count, 1)
+        self.assertEqual(self.user.first_name, "Bob")
+
+    def test_protected_attributes_rejected(self):
+        """ Keys other than id, first_name and last_name are refused
+        """
+        for name in ("_password", "email", "password", "created_at"):
+            with self.subTest(name=name):
+                response = self.put([{"id": self.user.id, name: "x"}])
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.get_json()["errors"], [
+                    {"index": 0, "error": "{} can't be updated".format(name)}])
+                self.assertNotEqual(getattr(self.user, name, None), "x")
+        self.save_many.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
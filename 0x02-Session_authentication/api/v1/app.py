@@ -4,6 +4,7 @@ Route module for the API
 """
 from os import getenv
 from api.v1.views import app_views
+from api.v1.auth.auth import Auth
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
 import os
@@ -16,13 +17,18 @@ auth = None
 AUTH_TYPE = getenv("AUTH_TYPE")
 
 if AUTH_TYPE == "auth":
-    from api.v1.auth.auth import Auth
     auth = Auth()
 elif AUTH_TYPE == "basic_auth":
     from api.v1.auth.basic_auth import BasicAuth
     auth = BasicAuth()
 # Add other auth types as needed for future tasks
 
+EXCLUDED_PATHS = Auth.compile_excluded_paths([
+    '/api/v1/status/',
+    '/api/v1/unauthorized/',
+    '/api/v1/forbidden/'
+])
+
 
 @app.errorhandler(404)
 def not_found(error) -> str:
@@ -53,13 +59,7 @@ def before_request_func() -> None:
     if auth is None:
         return
 
-    excluded_paths = [
-        '/api/v1/status/',
-        '/api/v1/unauthorized/',
-        '/api/v1/forbidden/'
-    ]
-
-    if auth.require_auth(request.path, excluded_paths):
+    if auth.require_auth(request.path, EXCLUDED_PATHS):
         if auth.authorization_header(request) is None:
             abort(401)
         # Assign the result of auth.current_user(request) to request.current_user
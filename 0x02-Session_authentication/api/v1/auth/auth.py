@@ -3,8 +3,57 @@
 Module for basic authentication.
 """
 from flask import request
-from typing import List, TypeVar, Union
+from functools import lru_cache
+from typing import List, Tuple, TypeVar, Union
 from models.user import User
+import re
+
+
+class PathMatcher:
+    """
+    Excluded paths compiled once into a single regular expression.
+
+    A pattern ending with '*' excludes every path starting with what
+    precedes it; any other pattern must equal the path (with a trailing
+    slash added). Decisions are memoized per path.
+    """
+
+    def __init__(self, excluded_paths: List[str], cache_size: int = 1024):
+        """
+        Args:
+            excluded_paths (List[str]): Paths not requiring authentication.
+            cache_size (int): Number of memoized path decisions.
+        """
+        self.excluded_paths = tuple(p for p in excluded_paths
+                                    if isinstance(p, str))
+        alternatives = []
+        for excluded_path in self.excluded_paths:
+            if excluded_path.endswith('*'):
+                alternatives.append(re.escape(excluded_path[:-1]) + '.*')
+            else:
+                alternatives.append(re.escape(excluded_path))
+        self._regex = None
+        if alternatives:
+            self._regex = re.compile('|'.join(alternatives), re.DOTALL)
+        self.is_excluded = lru_cache(maxsize=cache_size)(self._is_excluded)
+
+    def __len__(self) -> int:
+        """ Number of excluded path patterns """
+        return len(self.excluded_paths)
+
+    def _is_excluded(self, path: str) -> bool:
+        """ True if path matches one of the excluded patterns """
+        if self._regex is None:
+            return False
+        if not path.endswith('/'):
+            path += '/'
+        return self._regex.fullmatch(path) is not None
+
+
+@lru_cache(maxsize=64)
+def _compile_excluded_paths(excluded_paths: Tuple[str]) -> PathMatcher:
+    """ Shared PathMatcher of a tuple of excluded paths """
+    return PathMatcher(list(excluded_paths))
 
 
 class Auth:
@@ -12,6 +61,19 @@ class Auth:
     Auth class for managing authentication.
     """
 
+    @staticmethod
+    def compile_excluded_paths(excluded_paths: List[str]) -> PathMatcher:
+        """
+        Compiles excluded paths once, typically at application startup.
+
+        Args:
+            excluded_paths (List[str]): Paths not requiring authentication.
+
+        Returns:
+            PathMatcher: Matcher to pass to require_auth.
+        """
+        return PathMatcher(excluded_paths)
+
     def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
         """
         Checks if authentication is required for a given path.
@@ -19,7 +81,8 @@ class Auth:
         Args:
             path (str): The request path.
             excluded_paths (List[str]): A list of paths that do not
-                                        require authentication.
+                                        require authentication, or a
+                                        PathMatcher compiled from one.
 
         Returns:
             bool: True if authentication is required, False otherwise.
@@ -29,19 +92,12 @@ class Auth:
         if excluded_paths is None or not excluded_paths:
             return True
 
-        # Ensure path ends with a slash for consistent comparison
-        if not path.endswith('/'):
-            path += '/'
-
-        for excluded_path in excluded_paths:
-            if excluded_path.endswith('*'):
-                # Wildcard match (e.g., /admin/* matches /admin/dashboard)
-                if path.startswith(excluded_path[:-1]):
-                    return False
-            elif path == excluded_path:
-                # Exact match
-                return False
-        return True
+        if not isinstance(excluded_paths, PathMatcher):
+            # Only strings can be excluded paths; dropping the rest also
+            # keeps the cache key hashable
+            excluded_paths = _compile_excluded_paths(tuple(
+                p for p in excluded_paths if isinstance(p, str)))
+        return not excluded_paths.is_excluded(path)
 
     def authorization_header(self, request=None) -> Union[str, None]:
         """
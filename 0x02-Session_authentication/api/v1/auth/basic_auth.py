@@ -3,18 +3,101 @@
 Module for basic authentication.
 """
 import base64 # Make sure this is imported if it wasn't
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
 from api.v1.auth.auth import Auth
 from models.user import User
 # From typing import List, TypeVar, Union are already there for Auth class
 from typing import Union, Tuple # <--- ADD 'Tuple' HERE
 
 
+class CredentialCache:
+    """
+    Bounded, TTL-based cache of successfully verified credentials.
+
+    Entries are keyed by an HMAC of the raw Authorization header under a
+    per-process random key, so neither the header nor the password is
+    kept in memory. Each entry remembers the user id and the password
+    hash the credentials were checked against.
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None):
+        """
+        Args:
+            max_size (int): Maximum number of entries, least recently
+                            used ones are evicted first
+                            (BASIC_AUTH_CACHE_SIZE, 1024 by default).
+            ttl (float): Lifetime of an entry in seconds
+                         (BASIC_AUTH_CACHE_TTL, 300 by default).
+        """
+        if max_size is None:
+            max_size = int(os.getenv("BASIC_AUTH_CACHE_SIZE", 1024))
+        if ttl is None:
+            ttl = float(os.getenv("BASIC_AUTH_CACHE_TTL", 300))
+        self.max_size = max_size
+        self.ttl = ttl
+        self._key = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, authorization_header: str) -> bytes:
+        """ Keyed hash of an Authorization header """
+        return hmac.new(self._key, authorization_header.encode('utf-8'),
+                        hashlib.sha256).digest()
+
+    def get(self, authorization_header: str) -> Union[Tuple, None]:
+        """
+        Looks a header up.
+
+        Returns:
+            Union[Tuple, None]: (user_id, password_hash) if the header
+                                was verified less than ttl ago.
+        """
+        digest = self._digest(authorization_header)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if entry[2] < time.monotonic():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return entry[0], entry[1]
+
+    def put(self, authorization_header: str, user_id: str,
+            password_hash) -> None:
+        """ Remembers a header verified against password_hash """
+        if self.max_size <= 0:
+            return
+        digest = self._digest(authorization_header)
+        with self._lock:
+            self._entries[digest] = (user_id, password_hash,
+                                     time.monotonic() + self.ttl)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, authorization_header: str) -> None:
+        """ Forgets a header """
+        with self._lock:
+            self._entries.pop(self._digest(authorization_header), None)
+
+
 class BasicAuth(Auth):
     """
     BasicAuth class for basic authentication.
     Inherits from Auth.
     """
 
+    def __init__(self):
+        """ Sets up the cache of verified credentials """
+        super().__init__()
+        self.credential_cache = CredentialCache()
+
     def extract_base64_authorization_header(self,
                                             authorization_header: str
                                             ) -> Union[str, None]:
@@ -111,6 +194,10 @@ class BasicAuth(Auth):
         """
         Retrieves the current user based on the Authorization header.
 
+        Credentials verified less than the cache TTL ago are not checked
+        with bcrypt again, unless the user was removed or its password
+        changed since.
+
         Args:
             request: The Flask request object.
 
@@ -122,6 +209,15 @@ class BasicAuth(Auth):
         if authorization_header is None:
             return None
 
+        cached = self.credential_cache.get(authorization_header)
+        if cached is not None:
+            user_id, password_hash = cached
+            user = User.get(user_id)
+            if user is not None and \
+                    getattr(user, '_hashed_password', None) == password_hash:
+                return user
+            self.credential_cache.discard(authorization_header)
+
         base64_header = self.extract_base64_authorization_header(
             authorization_header
         )
@@ -138,4 +234,8 @@ class BasicAuth(Auth):
         if email is None or password is None:
             return None
 
-        return self.user_object_from_credentials(email, password)
+        user = self.user_object_from_credentials(email, password)
+        if user is not None:
+            self.credential_cache.put(authorization_header, user.id,
+                                      user._hashed_password)
+        return user
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """ Module of Index views
 """
-from flask import jsonify # <--- REMOVE 'web_server' from here
+from flask import jsonify, request  # <--- REMOVE 'web_server' from here
 from api.v1.views import app_views
 
 
@@ -16,9 +16,14 @@ def status() -> str:
 @app_views.route('/stats', methods=['GET'], strict_slashes=False)
 def stats() -> str:
     """ GET /api/v1/stats
-    Return the number of each objects
+    Return the number of each objects, from counters kept by the
+    models; with ?extra=1, also users_created_24h and sessions_active
     """
     from models.user import User
     stats = {}
-    stats['users'] = User.count()
+    user_stats = User.stats()
+    stats['users'] = user_stats['count']
+    if request.args.get('extra'):
+        stats['users_created_24h'] = user_stats['created_recently']
+        stats['sessions_active'] = user_stats['indexed']['session_id']
     return jsonify(stats)
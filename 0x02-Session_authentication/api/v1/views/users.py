@@ -3,23 +3,220 @@
 User views module
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import Response, abort, jsonify, request, stream_with_context
 from models.user import User
+from typing import FrozenSet, Iterable, Iterator, Optional
+import json
+
+
+MAX_PAGE_SIZE = 1000
+
+
+def _page_args():
+    """ (after, limit) query parameters of a paginated listing
+
+    Raises ValueError if limit is not an integer between 1 and
+    MAX_PAGE_SIZE.
+    """
+    after = request.args.get("after")
+    limit = request.args.get("limit")
+    if limit is not None:
+        limit = int(limit)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(limit)
+    return after, limit
+
+
+MAX_BULK_SIZE = 10000
+# Only login and logout change the session of a user
+SESSION_ATTRIBUTES = ("session_id",)
+
+
+def _bulk_items() -> list:
+    """ JSON list body of a bulk request
+
+    Raises ValueError, with the message to report, if the body is not
+    a list of at most MAX_BULK_SIZE items.
+    """
+    try:
+        items = request.get_json()
+    except Exception:
+        items = None
+    if not isinstance(items, list):
+        raise ValueError("Wrong format")
+    if len(items) > MAX_BULK_SIZE:
+        raise ValueError(
+            "at most {} items per request".format(MAX_BULK_SIZE))
+    return items
+
+
+def _updatable(name: str) -> bool:
+    """ Whether a bulk update may set the attribute name
+    """
+    return not name.startswith("_") and name not in SESSION_ATTRIBUTES
+
+
+def _bulk_updates(items: list) -> tuple:
+    """ (users, errors) of a bulk update body
+
+    Each item must be an object holding the id of an existing User,
+    at most once per batch, and no private attribute or session
+    attribute.
+    """
+    users, errors, ids = [], [], set()
+    for index, item in enumerate(items):
+        user, error = None, None
+        if not isinstance(item, dict):
+            error = "Wrong format"
+        else:
+            if isinstance(item.get("id"), str):
+                user = User.get(item["id"])
+            forbidden = [name for name in item if not _updatable(name)]
+            if user is None:
+                error = "User not found"
+            elif item["id"] in ids:
+                error = "User appears twice"
+            elif forbidden:
+                error = "{} can't be updated".format(forbidden[0])
+        if error is not None:
+            errors.append({"index": index, "error": error})
+            continue
+        ids.add(item["id"])
+        users.append(user)
+    return users, errors
+
+
+def _bulk_creations(items: list) -> list:
+    """ Per-item errors of a bulk creation body, empty if all are valid
+    """
+    errors, emails = [], set()
+    for index, item in enumerate(items):
+        error = None
+        if not isinstance(item, dict):
+            error = "Wrong format"
+        elif not isinstance(item.get("email"), str) or \
+                item["email"] == "":
+            error = "email missing"
+        elif not isinstance(item.get("password"), str) or \
+                item["password"] == "":
+            error = "password missing"
+        elif item["email"] in emails or User.search({"email": item["email"]}):
+            error = "email already exists"
+        if error is not None:
+            errors.append({"index": index, "error": error})
+            continue
+        emails.add(item["email"])
+    return errors
+
+
+def _not_modified(etag: str) -> Optional[Response]:
+    """ 304 response if If-None-Match already holds etag, else None
+    """
+    # If-None-Match uses the weak comparison (RFC 9110, 13.1.2)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def _with_etag(response: Response, etag: str) -> Response:
+    """ Set the ETag header of a response
+    """
+    response.set_etag(etag)
+    return response
+
+
+def _fields() -> Optional[FrozenSet[str]]:
+    """ Keys requested with ?fields=a,b (None to return them all)
+    """
+    fields = request.args.get("fields")
+    if not fields:
+        return None
+    return frozenset(f.strip() for f in fields.split(",") if f.strip())
+
+
+def _ndjson(users: Iterable[User],
+            fields: FrozenSet[str] = None) -> Iterator[str]:
+    """ One JSON document per line, built as users are consumed
+    """
+    for user in users:
+        yield json.dumps(user.to_json(fields=fields)) + "\n"
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def get_all_users() -> str:
     """ GET /api/v1/users
-    Return all users
+    Query parameters (all optional):
+      - limit: page size, up to MAX_PAGE_SIZE
+      - after: id of the last user of the previous page
+      - format=ndjson (or Accept: application/x-ndjson): stream one
+        User JSON per line
+      - fields: comma-separated keys to return, e.g. email,first_name
+    Return:
+      - without parameters, list of all User objects JSON represented
+      - otherwise users in id order after `after`, limit at most; the
+        X-Next-Cursor header holds the `after` of the next page
+      - 304 if If-None-Match holds the current ETag of the users
+      - 400 if limit is invalid
     """
-    users = [user.to_json() for user in User.all()]
-    return jsonify(users)
+    NDJSON = "application/x-ndjson"
+    stream = request.args.get("format") == "ndjson" or \
+        request.accept_mimetypes.best == NDJSON
+    # Invalid parameters are reported even to a client holding the ETag
+    try:
+        after, limit = _page_args()
+    except ValueError:
+        return jsonify({"error": "limit must be between 1 and {}"
+                        .format(MAX_PAGE_SIZE)}), 400
+    # Each representation gets its own strong ETag
+    etag = User.collection_etag() + ("-ndjson" if stream else "")
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    fields = _fields()
+    if "limit" not in request.args and "after" not in request.args \
+            and not stream:
+        return _with_etag(jsonify([user.to_json(fields=fields)
+                                   for user in User.all()]), etag)
+
+    headers = {}
+    if limit is None:
+        # Unbounded stream: users are read a batch at a time
+        users = User.iter_page(after)
+    else:
+        # One extra user tells whether a next page exists
+        users = User.page(after, limit + 1)
+        if len(users) > limit:
+            users = users[:limit]
+            headers["X-Next-Cursor"] = users[-1].id
+    if stream:
+        response = Response(stream_with_context(_ndjson(users, fields)),
+                            mimetype=NDJSON, headers=headers)
+    else:
+        response = jsonify([user.to_json(fields=fields) for user in users])
+        response.headers.update(headers)
+    if limit is None:
+        # Unbounded streams are read lazily, only pages are tagged
+        return response
+    return _with_etag(response, etag)
+
+
+def _user_response(user: User) -> Response:
+    """ JSON of one user with its ETag, or 304 if the client has it
+    """
+    etag = user.etag()
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    return _with_etag(jsonify(user.to_json(fields=_fields())), etag)
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
 def get_user(user_id: str) -> str:
     """ GET /api/v1/users/<user_id>
-    Return one user
+    Return one user, restricted to ?fields=a,b if given, or 304 if
+    If-None-Match holds its current ETag
     """
     # New logic for /users/me
     if user_id == "me":
@@ -28,14 +225,14 @@ def get_user(user_id: str) -> str:
             abort(404)  # 404 as if the specific user ID doesn't exist
         else:
             # If current_user is authenticated, return their JSON
-            return jsonify(request.current_user.to_json())
+            return _user_response(request.current_user)
 
     # Existing logic for normal user_id (UUID)
     try:
         user = User.get(user_id)
         if user is None:
             abort(404)
-        return jsonify(user.to_json())
+        return _user_response(user)
     except Exception:
         # Catch potential errors if user_id is not a valid UUID format
         abort(404)
@@ -99,3 +296,94 @@ def update_user(user_id: str) -> str:
             setattr(user, name, value)
     user.save()
     return jsonify(user.to_json()), 200
+
+
+@app_views.route('/users/bulk', methods=['POST'], strict_slashes=False)
+def create_users_bulk() -> str:
+    """ POST /api/v1/users/bulk
+    JSON body:
+      - list of {email, password, last_name (optional),
+        first_name (optional)}
+    Return:
+      - list of the created User objects JSON represented, in order
+      - 400 with {"errors": [{"index": i, "error": message}]} if an
+        item is invalid; nothing is created then
+    """
+    try:
+        items = _bulk_items()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    errors = _bulk_creations(items)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    users = []
+    for item in items:
+        user = User()
+        user.email = item["email"]
+        user.first_name = item.get("first_name")
+        user.last_name = item.get("last_name")
+        users.append(user)
+    User.set_passwords([(user, item["password"])
+                        for user, item in zip(users, items)])
+    try:
+        User.save_many(users)
+    except ValueError as e:
+        return jsonify({'error': "Can't create Users: {}".format(e)}), 400
+    return jsonify([user.to_json() for user in users]), 201
+
+
+@app_views.route('/users/bulk', methods=['PUT'], strict_slashes=False)
+def update_users_bulk() -> str:
+    """ PUT /api/v1/users/bulk
+    JSON body:
+      - list of {id, other attributes to update}
+    Return:
+      - list of the updated User objects JSON represented, in order
+      - 400 with {"errors": [{"index": i, "error": message}]} if an
+        item is invalid; nothing is updated then
+    """
+    try:
+        items = _bulk_items()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    users, errors = _bulk_updates(items)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    passwords = []
+    for user, item in zip(users, items):
+        for name, value in item.items():
+            if name == "password":
+                passwords.append((user, value))
+            elif name not in ["id", "email", "created_at", "updated_at"]:
+                setattr(user, name, value)
+    # New passwords are hashed in parallel rather than by the setter
+    User.set_passwords([(user, pwd) for user, pwd in passwords
+                        if isinstance(pwd, str)])
+    for user, pwd in passwords:
+        if not isinstance(pwd, str):
+            user.password = pwd
+    User.save_many(users)
+    return jsonify([user.to_json() for user in users]), 200
+
+
+@app_views.route('/users/bulk', methods=['DELETE'], strict_slashes=False)
+def delete_users_bulk() -> str:
+    """ DELETE /api/v1/users/bulk
+    JSON body:
+      - list of User IDs
+    Return:
+      - empty JSON if all the Users have been deleted
+      - 400 with {"errors": [{"index": i, "error": message}]} if an
+        ID is unknown; nothing is deleted then
+    """
+    try:
+        items = _bulk_items()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    users, errors = _bulk_updates([{"id": item} for item in items])
+    if errors:
+        return jsonify({'errors': errors}), 400
+    User.remove_many(users)
+    return jsonify({}), 200
@@ -1,147 +1,223 @@
 #!/usr/bin/env python3
 """ Base module
 """
-from datetime import datetime
-import os
+from datetime import datetime, timedelta
+from functools import lru_cache
+from models.store import get_store
+from typing import FrozenSet, Iterator
 import uuid
-import json # <--- ADD THIS LINE
+
+
+def _format_datetime(value):
+    """ ISO format of a datetime, other values as is
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _decode_bytes(value):
+    """ UTF-8 text of bytes, other values as is
+    """
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
+
+
+class _SerializerPlan(dict):
+    """ What to_json does with each key of the objects of one class
+
+    Maps each attribute name met so far to its formatter, or to None
+    when it is dropped: EXCLUDED_FIELDS always, private attributes
+    unless for_serialization (bytes are then decoded), and keys outside
+    fields if given. Other values go through _format_datetime, so any
+    datetime serializes. keys lists the keys to return when fields are
+    given, the id and timestamps first.
+    """
+
+    FIRST = ("id", "created_at", "updated_at")
+
+    def __init__(self, cls, for_serialization: bool,
+                 fields: FrozenSet[str] = None):
+        """ Plan of cls for the given options
+        """
+        super().__init__()
+        self.excluded = frozenset(cls.EXCLUDED_FIELDS)
+        self.for_serialization = for_serialization
+        self.fields = fields
+        self.keys = None
+        if fields is not None:
+            rest = tuple(sorted(fields.difference(self.FIRST)))
+            self.keys = tuple(key for key in self.FIRST + rest
+                              if self[key] is not None)
+
+    def __missing__(self, key: str):
+        """ Decide once what to do with key
+        """
+        if key in self.excluded or \
+                (self.fields is not None and key not in self.fields):
+            formatter = None
+        elif key.startswith("_"):
+            formatter = _decode_bytes if self.for_serialization else None
+        else:
+            formatter = _format_datetime
+        self[key] = formatter
+        return formatter
+
+
+@lru_cache(maxsize=256)
+def _serializer_plan(cls, for_serialization: bool,
+                     fields: FrozenSet[str] = None) -> _SerializerPlan:
+    """ Shared plan of a class for the given to_json options
+    """
+    return _SerializerPlan(cls, for_serialization, fields)
+
 
 class Base:
     """ Base class
     """
-    def __init__(self):
+    INDEXES = ()
+    EXCLUDED_FIELDS = ("_db", "_salt")
+
+    def __init__(self, *args: list, **kwargs: dict):
         """ Init
         """
-        self.id = str(uuid.uuid4())
-        self.created_at = datetime.now()
-        self.updated_at = datetime.now()
+        self.id = kwargs.get("id", str(uuid.uuid4()))
+        self.created_at = self._parse_datetime(kwargs.get("created_at"))
+        self.updated_at = self._parse_datetime(kwargs.get("updated_at"))
 
-    def to_json(self) -> dict:
+    @staticmethod
+    def _parse_datetime(value) -> datetime:
+        """ Datetime from its ISO format, now if missing
+        """
+        if value is None:
+            return datetime.now()
+        if isinstance(value, str):
+            return datetime.fromisoformat(value)
+        return value
+
+    def to_json(self, for_serialization: bool = False,
+                fields: FrozenSet[str] = None) -> dict:
         """ To JSON
+
+        Private attributes are only kept for_serialization, bytes
+        being decoded so that the result can be dumped to the file.
+        fields, if given, is the set of keys to return. The work done
+        per key is planned once per class by _serializer_plan.
         """
-        obj_json = {
-            "id": self.id,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-        }
-        for key, value in self.__dict__.items():
-            if key not in [
-                "id", "created_at", "updated_at", "_db", "_salt", "_hashed_password"
-            ]:
-                obj_json[key] = value
-        return obj_json
+        attrs = self.__dict__
+        plan = _serializer_plan(type(self), for_serialization, fields)
+        if plan.keys is not None:
+            return {key: plan[key](attrs[key])
+                    for key in plan.keys if key in attrs}
+        first = plan.FIRST
+        result = {key: _format_datetime(attrs[key])
+                  for key in first if key in attrs}
+        for key, value in attrs.items():
+            formatter = plan[key]
+            if formatter is not None and key not in first:
+                result[key] = formatter(value)
+        return result
+
+    @classmethod
+    def _store(cls):
+        """ Shared store of this class
+        """
+        return get_store(cls)
 
     @classmethod
     def load_from_file(cls):
         """ Load from file
         """
-        file_path = f"db/{cls.__name__}.json"
-        if not os.path.exists(file_path):
-            return []
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        return [cls(**item) for item in data]
+        store = cls._store()
+        store.refresh()
+        return store.all()
 
     def save(self):
         """ Save
         """
-        # from models.user import User # This import is not needed here
-        obj_json = self.to_json()
-        file_path = f"db/{type(self).__name__}.json"
-        all_data = []
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as f:
-                try: # Add a try-except block here for empty/malformed JSON
-                    all_data = json.load(f)
-                except json.JSONDecodeError:
-                    all_data = [] # If file is empty or malformed, start fresh
-
-        # Update existing or add new
-        found = False
-        for i, item in enumerate(all_data):
-            if item.get('id') == self.id:
-                all_data[i] = obj_json
-                found = True
-                break
-        if not found:
-            all_data.append(obj_json)
-
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, 'w') as f:
-            json.dump(all_data, f, indent=2)
+        self._store().put(self)
 
     def remove(self):
         """ Remove
         """
-        file_path = f"db/{type(self).__name__}.json"
-        if not os.path.exists(file_path):
-            return
+        self._store().delete(self)
 
-        all_data = []
-        with open(file_path, 'r') as f:
-            try: # Add a try-except block here for empty/malformed JSON
-                all_data = json.load(f)
-            except json.JSONDecodeError:
-                all_data = [] # If file is empty or malformed, treat as empty
+    @classmethod
+    def save_many(cls, objs: list):
+        """ Save a batch of objects with a single journal write
+        """
+        cls._store().put_many(list(objs))
 
-        all_data = [item for item in all_data if item.get('id') != self.id]
+    @classmethod
+    def remove_many(cls, objs: list) -> int:
+        """ Remove a batch of objects with a single journal write
+        """
+        return cls._store().delete_many(list(objs))
 
-        with open(file_path, 'w') as f:
-            json.dump(all_data, f, indent=2)
+    def etag(self) -> str:
+        """ Strong entity tag, changed by every save
+        """
+        return self._store().etag(self.id)
 
+    @classmethod
+    def collection_etag(cls) -> str:
+        """ Strong entity tag of all objects of the class
+        """
+        return cls._store().collection_etag()
 
     @classmethod
     def count(cls) -> int:
         """ Count
         """
-        users = cls.all()
-        return len(users)
+        return cls._store().count()
+
+    @classmethod
+    def stats(cls, window: float = 86400) -> dict:
+        """ Counters of this class, served without reading the files
 
+        Returns the number of objects, as created_recently how many
+        were created during the last window seconds, and for each
+        attribute in INDEXES how many objects have a value for it.
+        """
+        since = (datetime.now() - timedelta(seconds=window)).timestamp()
+        stats = cls._store().stats(since)
+        return {"count": stats["count"],
+                "created_recently": stats["created_since"],
+                "indexed": stats["indexed"]}
 
     @classmethod
     def all(cls) -> list:
         """ All
         """
-        # from models.user import User # This import is not strictly needed here if User is imported at top level
-        list_objs = []
-        file_path = f"db/{cls.__name__}.json"
-        if not os.path.exists(file_path):
-            return []
-        with open(file_path, 'r') as f:
-            try: # Add a try-except block here for empty/malformed JSON
-                data = json.load(f)
-            except json.JSONDecodeError:
-                return [] # If file is empty or malformed, return empty list
-
-        for obj in data:
-            if cls.__name__ == "User":
-                # Assuming User constructor can handle dict unpacking
-                # if user.py is properly set up with kwargs
-                from models.user import User # Ensure User is available
-                list_objs.append(User(**obj))
-            else:
-                # Generic case, if you add other models later
-                # This needs to be able to reconstruct the object correctly
-                instance = cls()
-                for k, v in obj.items():
-                    if k in ['created_at', 'updated_at'] and isinstance(v, str):
-                        setattr(instance, k, datetime.fromisoformat(v))
-                    elif k == 'id': # Ensure id is set correctly
-                        instance.id = v
-                    elif k == '_hashed_password': # Handle private attributes from saved data
-                        instance._hashed_password = v.encode('utf-8') if isinstance(v, str) else v
-                    elif k == '_salt':
-                        instance._salt = v.encode('utf-8') if isinstance(v, str) else v
-                    else:
-                        setattr(instance, k, v)
-                list_objs.append(instance)
-        return list_objs
+        return cls._store().all()
 
     @classmethod
     def get(cls, id) -> any:
         """ Get
         """
-        for obj in cls.all():
-            if obj.id == id:
-                return obj
-        return None
+        return cls._store().get(id)
+
+    @classmethod
+    def page(cls, after: str = None, limit: int = None) -> list:
+        """ Objects in id order, starting right after the id `after`
+        """
+        return cls._store().page(after, limit)
+
+    @classmethod
+    def iter_page(cls, after: str = None,
+                  batch_size: int = 100) -> Iterator["Base"]:
+        """ Lazily yield objects in id order, batch_size at a time
+        """
+        while True:
+            batch = cls.page(after, batch_size)
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            after = batch[-1].id
+
+    @classmethod
+    def search(cls, attributes: dict = {}) -> list:
+        """ Search
+        """
+        return cls._store().search(attributes)
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+""" Store module
+"""
+from models.journal import Compactor, Journal, write_snapshot
+import bisect
+import itertools
+import json
+import os
+import threading
+import uuid
+
+
+# Versions come from one process-wide counter; ETags are prefixed with
+# the process epoch so that two processes never issue the same ETag
+_NEXT_VERSION = itertools.count(1)
+EPOCH = uuid.uuid4().hex[:8]
+
+
+def _sorted_remove(values: list, value) -> None:
+    """ Remove one occurrence of value from a sorted list, if present
+    """
+    i = bisect.bisect_left(values, value)
+    if i < len(values) and values[i] == value:
+        del values[i]
+
+
+def _created(obj) -> float:
+    """ Creation time of an object, as a timestamp
+    """
+    return obj.created_at.timestamp()
+
+
+def _file_signature(file_path: str) -> tuple:
+    """ (mtime, size) of a file, None if it does not exist
+    """
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ObjectStore:
+    """ Process-wide, indexed in-memory copy of one model's JSON file
+
+    The file is parsed once; objects are then kept by id, with hash
+    indexes on the attributes listed in the model's INDEXES, a sorted
+    list of ids for cursor pagination, the counters served by stats
+    and versions of each object and of the collection. Changes
+    are appended to a journal next to the file, and a background
+    compactor periodically folds the journal into a new snapshot. The
+    store reloads whenever the snapshot or journal changes behind its
+    back; it assumes a single writing process.
+    """
+    def __init__(self, cls, file_path: str, journal: Journal = None):
+        """ Init
+        """
+        self.cls = cls
+        self.file_path = file_path
+        self.journal = journal or Journal(
+            os.path.splitext(file_path)[0] + ".journal")
+        self.indexed = tuple(getattr(cls, "INDEXES", ()))
+        self._lock = threading.RLock()
+        self._objects = {}
+        self._serialized = {}
+        self._indexes = {attr: {} for attr in self.indexed}
+        self._indexed_values = {}
+        self._indexed_counts = {attr: 0 for attr in self.indexed}
+        self._order = []
+        self._created = []
+        self._versions = {}
+        self._version = next(_NEXT_VERSION)
+        self._signature = None
+        self._loaded = False
+        self._compacting = False
+        self._compactor = None
+
+    def _stat(self) -> tuple:
+        """ Signature of the snapshot and journal files
+        """
+        return (_file_signature(self.file_path),
+                _file_signature(self.journal.path))
+
+    def _read(self) -> list:
+        """ Parsed content of the file
+        """
+        if not os.path.exists(self.file_path):
+            return []
+        with open(self.file_path, 'r') as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                return []
+
+    def _build(self, obj_json: dict):
+        """ Model instance from its serialized dictionary
+        """
+        obj = self.cls(**obj_json)
+        # Attributes the constructor does not know (e.g. session_id)
+        for key, value in obj_json.items():
+            if key not in obj.__dict__:
+                setattr(obj, key, value)
+        return obj
+
+    def _index(self, obj) -> None:
+        """ Add obj to the indexes, replacing its previous entries
+        """
+        self._unindex(obj.id)
+        values = {}
+        for attr in self.indexed:
+            value = getattr(obj, attr, None)
+            if value is None:
+                continue
+            try:
+                self._indexes[attr].setdefault(value, set()).add(obj.id)
+            except TypeError:
+                continue
+            values[attr] = value
+            self._indexed_counts[attr] += 1
+        self._indexed_values[obj.id] = values
+
+    def _unindex(self, obj_id: str) -> None:
+        """ Drop the index entries of an object
+        """
+        for attr, value in self._indexed_values.pop(obj_id, {}).items():
+            self._indexed_counts[attr] -= 1
+            ids = self._indexes[attr].get(value)
+            if ids is not None:
+                ids.discard(obj_id)
+                if not ids:
+                    del self._indexes[attr][value]
+
+    def _load(self) -> None:
+        """ Replace the in-memory objects by the snapshot and journal
+        """
+        signature = self._stat()
+        serialized = {}
+        for obj_json in self._read():
+            serialized[obj_json["id"]] = obj_json
+        for entry in self.journal.replay():
+            if entry["op"] == "delete":
+                serialized.pop(entry["id"], None)
+            else:
+                serialized[entry["id"]] = entry["obj"]
+
+        self._objects = {}
+        self._serialized = serialized
+        self._indexes = {attr: {} for attr in self.indexed}
+        self._indexed_values = {}
+        self._indexed_counts = {attr: 0 for attr in self.indexed}
+        self._order = sorted(serialized)
+        for obj_json in serialized.values():
+            obj = self._build(obj_json)
+            self._objects[obj.id] = obj
+            self._index(obj)
+        self._created = sorted(map(_created, self._objects.values()))
+        self._versions = {}
+        self._version = next(_NEXT_VERSION)
+        self._signature = signature
+        self._loaded = True
+        if self._compactor is None:
+            self._compactor = Compactor(self.compact, self.journal)
+            self._compactor.start()
+
+    def refresh(self) -> None:
+        """ Load the files if never loaded or changed on disk
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            elif not self._compacting and self._stat() != self._signature:
+                self._load()
+
+    def _append(self, entries: list) -> None:
+        """ Journal entries and remember the resulting file signature
+        """
+        self.journal.append(entries)
+        self._signature = self._stat()
+
+    def compact(self) -> None:
+        """ Write a new snapshot and drop the journal it supersedes
+
+        The journal is set aside under the lock; the snapshot itself
+        is written without holding it, so writers are not blocked.
+        """
+        with self._lock:
+            self.refresh()
+            self._compacting = True
+            self.journal.rotate()
+            all_data = list(self._serialized.values())
+        try:
+            write_snapshot(self.file_path, all_data, indent=2)
+            self.journal.discard_rotated()
+        finally:
+            with self._lock:
+                self._compacting = False
+                self._signature = self._stat()
+
+    def _apply_put(self, obj, ordered: bool = True) -> dict:
+        """ Store obj in memory and return its journal entry, lock held
+
+        A new object is added to the sorted id list unless ordered is
+        False, in which case the caller adds it.
+        """
+        obj_json = obj.to_json(True)
+        previous = self._objects.get(obj.id)
+        if previous is None and ordered:
+            bisect.insort(self._order, obj.id)
+        elif previous is not None and previous is not obj:
+            _sorted_remove(self._created, _created(previous))
+        if previous is not obj:
+            bisect.insort(self._created, _created(obj))
+        self._objects[obj.id] = obj
+        self._serialized[obj.id] = obj_json
+        self._index(obj)
+        self._version = next(_NEXT_VERSION)
+        self._versions[obj.id] = self._version
+        return {"op": "upsert", "id": obj.id, "obj": obj_json}
+
+    def _apply_delete(self, obj) -> dict:
+        """ Drop obj from memory and return its journal entry, None if
+        it was not stored; lock held
+        """
+        stored = self._objects.pop(obj.id, None)
+        if stored is None:
+            return None
+        self._serialized.pop(obj.id, None)
+        self._unindex(obj.id)
+        _sorted_remove(self._order, obj.id)
+        _sorted_remove(self._created, _created(stored))
+        self._versions.pop(obj.id, None)
+        self._version = next(_NEXT_VERSION)
+        return {"op": "delete", "id": obj.id}
+
+    def put(self, obj) -> None:
+        """ Insert or update an object and persist it
+        """
+        with self._lock:
+            self.refresh()
+            self._append([self._apply_put(obj)])
+
+    def put_many(self, objs: list) -> None:
+        """ Insert or update objects, persisted with one journal write
+
+        New ids are appended then sorted once.
+        """
+        with self._lock:
+            self.refresh()
+            new = [obj.id for obj in objs if obj.id not in self._objects]
+            entries = [self._apply_put(obj, ordered=False) for obj in objs]
+            if new:
+                self._order.extend(set(new))
+                self._order.sort()
+            if entries:
+                self._append(entries)
+
+    def delete(self, obj) -> bool:
+        """ Remove an object, returns False if it was not stored
+        """
+        with self._lock:
+            self.refresh()
+            entry = self._apply_delete(obj)
+            if entry is None:
+                return False
+            self._append([entry])
+            return True
+
+    def delete_many(self, objs: list) -> int:
+        """ Remove objects with one journal write, returns how many
+        were stored
+        """
+        with self._lock:
+            self.refresh()
+            entries = [self._apply_delete(obj) for obj in objs]
+            entries = [entry for entry in entries if entry is not None]
+            if entries:
+                self._append(entries)
+            return len(entries)
+
+    def get(self, obj_id: str):
+        """ Object by id, None if unknown
+        """
+        with self._lock:
+            self.refresh()
+            return self._objects.get(obj_id)
+
+    def all(self) -> list:
+        """ All objects
+        """
+        with self._lock:
+            self.refresh()
+            return list(self._objects.values())
+
+    def count(self) -> int:
+        """ Number of objects
+        """
+        with self._lock:
+            self.refresh()
+            return len(self._objects)
+
+    def stats(self, since: float = None) -> dict:
+        """ Counters kept up to date by put, delete and load
+
+        Unlike the other reads, the files are not checked for changes
+        once loaded, so polling costs no system call. Returns the
+        number of objects, the number of objects having a value for
+        each indexed attribute and, if since (a timestamp) is given,
+        the number created since then.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            stats = {"count": len(self._objects),
+                     "indexed": dict(self._indexed_counts)}
+            if since is not None:
+                stats["created_since"] = len(self._created) - \
+                    bisect.bisect_left(self._created, since)
+            return stats
+
+    def etag(self, obj_id: str) -> str:
+        """ Strong entity tag of an object, changed by every put
+
+        Objects loaded from the files get their version on first use.
+        """
+        with self._lock:
+            self.refresh()
+            version = self._versions.get(obj_id)
+            if version is None:
+                version = next(_NEXT_VERSION)
+                self._versions[obj_id] = version
+            return "{}-{}".format(EPOCH, version)
+
+    def collection_etag(self) -> str:
+        """ Strong entity tag of the whole collection, changed by every
+        put, delete and load
+        """
+        with self._lock:
+            self.refresh()
+            return "{}-c{}".format(EPOCH, self._version)
+
+    def page(self, after: str = None, limit: int = None) -> list:
+        """ Objects in id order, starting right after the id `after`
+        """
+        with self._lock:
+            self.refresh()
+            start = 0
+            if after is not None:
+                start = bisect.bisect_right(self._order, after)
+            end = None if limit is None else start + limit
+            return [self._objects[i] for i in self._order[start:end]]
+
+    def search(self, attributes: dict) -> list:
+        """ Objects whose attributes all equal the given values
+
+        The smallest matching index narrows the candidates; attributes
+        without an index are checked on those candidates only.
+        """
+        with self._lock:
+            self.refresh()
+            candidates = None
+            for key, value in attributes.items():
+                if key not in self._indexes or value is None:
+                    continue
+                try:
+                    ids = self._indexes[key].get(value, set())
+                except TypeError:
+                    continue
+                if candidates is None or len(ids) < len(candidates):
+                    candidates = ids
+            if candidates is None:
+                objs = list(self._objects.values())
+            else:
+                objs = [self._objects[i] for i in candidates]
+
+        return [obj for obj in objs
+                if all(hasattr(obj, k) and getattr(obj, k) == v
+                       for k, v in attributes.items())]
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_store(cls) -> ObjectStore:
+    """ The shared ObjectStore of a model class
+    """
+    with _STORES_LOCK:
+        store = _STORES.get(cls.__name__)
+        if store is None:
+            store = ObjectStore(cls, f"db/{cls.__name__}.json")
+            _STORES[cls.__name__] = store
+        return store
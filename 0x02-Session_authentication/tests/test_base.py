@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+""" Tests of Base.to_json
+"""
+import json
+import os
+import sys
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from models.base import Base  # noqa: E402
+
+
+class Item(Base):
+    """ Model whose objects do not all have the same attributes
+    """
+
+
+class TestToJson(unittest.TestCase):
+    """ Serialization planned per class
+    """
+    def test_attributes_differ_between_objects(self):
+        """ Objects of one class with other attributes serialize fully
+        """
+        first, second = Item(), Item()
+        first.name = "a"
+        second.size, second._secret = 3, b"s"
+        self.assertEqual(list(first.to_json())[:3],
+                         ["id", "created_at", "updated_at"])
+        self.assertEqual(first.to_json()["name"], "a")
+        self.assertNotIn("size", first.to_json())
+        self.assertEqual(second.to_json()["size"], 3)
+        self.assertNotIn("_secret", second.to_json())
+        self.assertEqual(second.to_json(True)["_secret"], "s")
+
+    def test_every_datetime_formatted(self):
+        """ Datetimes outside created_at/updated_at still dump to JSON
+        """
+        item = Item()
+        item.seen_at = datetime(2024, 5, 6, 7, 8, 9)
+        self.assertEqual(item.to_json()["seen_at"], "2024-05-06T07:08:09")
+        json.dumps(item.to_json(True))
+
+    def test_fields_and_exclusions(self):
+        """ fields restricts the keys; excluded ones never show
+        """
+        item = Item()
+        item.name, item._db, item._secret = "a", "db", "s"
+        self.assertEqual(item.to_json(fields=frozenset({"name", "_secret",
+                                                        "missing"})),
+                         {"name": "a"})
+        self.assertNotIn("_db", item.to_json(True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+""" Tests of the verified credentials cache of BasicAuth
+"""
+import base64
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+try:
+    import bcrypt  # noqa: F401
+    import flask
+except ImportError:  # pragma: no cover
+    flask = None
+else:
+    from api.v1.auth.basic_auth import BasicAuth, CredentialCache
+    from models.user import User
+
+
+def basic(email: str, password: str) -> str:
+    """ Authorization header for email and password
+    """
+    token = base64.b64encode(f"{email}:{password}".encode()).decode()
+    return "Basic " + token
+
+
+def request(header: str):
+    """ Stand-in request carrying an Authorization header
+    """
+    return mock.Mock(headers={"Authorization": header})
+
+
+@unittest.skipIf(flask is None, "flask or bcrypt is not installed")
+class TestCredentialCache(unittest.TestCase):
+    """ CredentialCache alone
+    """
+    def test_ttl_expiry(self):
+        """ An entry is served until its TTL runs out
+        """
+        cache = CredentialCache(max_size=4, ttl=10)
+        with mock.patch("time.monotonic", return_value=100.0):
+            cache.put("Basic a", "1", "h")
+        with mock.patch("time.monotonic", return_value=109.0):
+            self.assertEqual(cache.get("Basic a"), ("1", "h"))
+        with mock.patch("time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("Basic a"))
+        self.assertEqual(len(cache._entries), 0)
+
+    def test_lru_eviction(self):
+        """ The least recently used entry goes first when full
+        """
+        cache = CredentialCache(max_size=2, ttl=60)
+        cache.put("Basic a", "1", "h1")
+        cache.put("Basic b", "2", "h2")
+        self.assertIsNotNone(cache.get("Basic a"))  # b is now the oldest
+        cache.put("Basic c", "3", "h3")
+        self.assertIsNone(cache.get("Basic b"))
+        self.assertEqual(cache.get("Basic a"), ("1", "h1"))
+        self.assertEqual(cache.get("Basic c"), ("3", "h3"))
+
+    def test_disabled_and_discard(self):
+        """ A zero size keeps nothing; discard forgets a header
+        """
+        cache = CredentialCache(max_size=0, ttl=60)
+        cache.put("Basic a", "1", "h")
+        self.assertIsNone(cache.get("Basic a"))
+        cache = CredentialCache(max_size=2, ttl=60)
+        cache.put("Basic a", "1", "h")
+        cache.discard("Basic a")
+        self.assertIsNone(cache.get("Basic a"))
+
+    def test_header_not_kept(self):
+        """ Entries are keyed by a digest, not by the header itself
+        """
+        cache = CredentialCache(max_size=2, ttl=60)
+        header = basic("bob@hbtn.io", "secret")
+        cache.put(header, "1", "h")
+        self.assertNotIn(header, cache._entries)
+        self.assertNotIn(header.encode(), cache._entries)
+
+
+@unittest.skipIf(flask is None, "flask or bcrypt is not installed")
+class TestCurrentUser(unittest.TestCase):
+    """ BasicAuth.current_user through the cache, on in-memory users
+    """
+    def setUp(self):
+        """ One user, found by User.search and User.get without files
+        """
+        patcher = mock.patch.dict(os.environ, {"BCRYPT_COST": "4"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User(id="1", email="bob@hbtn.io")
+        self.user.password = "secret"
+        self.users = {self.user.id: self.user}
+        for name, fake in (
+                ("get", lambda user_id: self.users.get(user_id)),
+                ("search", lambda attributes: [
+                    u for u in self.users.values()
+                    if u.email == attributes["email"]])):
+            patcher = mock.patch.object(User, name, side_effect=fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(User, "is_valid_password",
+                                    autospec=True,
+                                    side_effect=User.is_valid_password)
+        self.is_valid_password = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.auth = BasicAuth()
+
+    def current_user(self, password: str = "secret"):
+        """ current_user for bob with the given password
+        """
+        return self.auth.current_user(request(basic("bob@hbtn.io",
+                                                    password)))
+
+    def test_cached_hit(self):
+        """ Verified credentials are not checked again
+        """
+        self.assertIs(self.current_user(), self.user)
+        self.assertIs(self.current_user(), self.user)
+        self.assertEqual(self.is_valid_password.call_count, 1)
+        self.assertIsNone(self.current_user("wrong"))
+        self.assertIsNone(self.current_user("wrong"))
+        self.assertEqual(self.is_valid_password.call_count, 3)
+
+    def test_password_change(self):
+        """ Cached credentials stop working once the password changes
+        """
+        self.assertIs(self.current_user(), self.user)
+        self.user.password = "new secret"
+        self.assertIsNone(self.current_user())
+        self.assertIs(self.current_user("new secret"), self.user)
+
+    def test_user_removed(self):
+        """ Cached credentials of a removed user are refused
+        """
+        self.assertIs(self.current_user(), self.user)
+        del self.users[self.user.id]
+        self.assertIsNone(self.current_user())
+        self.assertEqual(len(self.auth.credential_cache._entries), 0)
+
+    def test_ttl_expiry(self):
+        """ Credentials are checked again once their entry expired
+        """
+        with mock.patch("time.monotonic", return_value=100.0):
+            self.assertIs(self.current_user(), self.user)
+        ttl = self.auth.credential_cache.ttl
+        with mock.patch("time.monotonic", return_value=100.0 + ttl + 1):
+            self.assertIs(self.current_user(), self.user)
+        self.assertEqual(self.is_valid_password.call_count, 2)
+
+    def test_lru_eviction(self):
+        """ Evicted credentials are checked again
+        """
+        self.auth.credential_cache = CredentialCache(max_size=1, ttl=60)
+        self.assertIs(self.current_user(), self.user)
+        self.assertIsNone(self.current_user("wrong"))  # not cached
+        self.assertIs(self.current_user(), self.user)
+        self.assertEqual(self.is_valid_password.call_count, 2)
+        other = User(id="2", email="eve@hbtn.io")
+        other.password = "pwd"
+        self.users[other.id] = other
+        self.assertIs(self.auth.current_user(
+            request(basic("eve@hbtn.io", "pwd"))), other)
+        self.assertIs(self.current_user(), self.user)
+        self.assertEqual(self.is_valid_password.call_count, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+""" Tests of the journal and of compaction failures
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from models.journal import Journal  # noqa: E402
+from models.store import ObjectStore  # noqa: E402
+
+
+def entry(n: int) -> dict:
+    """ Journal entry numbered n
+    """
+    return {"op": "upsert", "id": str(n), "obj": {"id": str(n)}}
+
+
+class Item:
+    """ Minimal model stored by the tests
+    """
+    INDEXES = ("name",)
+
+    def __init__(self, **kwargs):
+        """ Init
+        """
+        self.id = kwargs["id"]
+        self.name = kwargs.get("name")
+
+    @property
+    def created_at(self):
+        """ Fixed creation time
+        """
+        from datetime import datetime
+        return datetime(2024, 1, 1)
+
+    def to_json(self, for_serialization: bool = False) -> dict:
+        """ To JSON
+        """
+        return {"id": self.id, "name": self.name}
+
+
+class TestJournalRotate(unittest.TestCase):
+    """ Journal.rotate keeps entries no snapshot holds yet
+    """
+    def setUp(self):
+        """ Journal in a temporary directory
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal = Journal(os.path.join(self.tmp.name, "x.journal"),
+                               fsync="never")
+
+    def tearDown(self):
+        """ Close and clean up
+        """
+        self.journal.close()
+        self.tmp.cleanup()
+
+    def ids(self) -> list:
+        """ Ids replayed from disk
+        """
+        return [e["id"] for e in self.journal.replay()]
+
+    def test_rotate_after_failed_compaction(self):
+        """ A second rotate appends to the leftover rotated journal
+        """
+        self.journal.append([entry(1)])
+        self.journal.rotate()
+        # the snapshot failed: discard_rotated is never called
+        self.journal.append([entry(2)])
+        self.journal.rotate()
+        self.assertEqual(self.ids(), ["1", "2"])
+        self.journal.discard_rotated()
+        self.assertEqual(self.ids(), [])
+
+    def test_torn_line_does_not_hide_later_entries(self):
+        """ Entries appended after a torn line are replayed
+        """
+        self.journal.append([entry(1)])
+        self.journal.close()
+        with open(self.journal.path, 'a') as f:
+            f.write('{"op": "ups')
+        self.journal.append([entry(2)])
+        self.assertEqual(self.ids(), ["1", "2"])
+
+
+class TestCompactFailure(unittest.TestCase):
+    """ ObjectStore.compact loses nothing when the snapshot fails
+    """
+    def setUp(self):
+        """ Store in a temporary directory
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp.name, "Item.json")
+
+    def tearDown(self):
+        """ Clean up
+        """
+        self.tmp.cleanup()
+
+    def store(self) -> ObjectStore:
+        """ Fresh store on the temporary files
+        """
+        journal = Journal(os.path.splitext(self.file_path)[0] + ".journal",
+                          fsync="never")
+        store = ObjectStore(Item, self.file_path, journal)
+        store._compactor = mock.Mock()  # no background thread
+        return store
+
+    def test_failed_then_successful_compaction(self):
+        """ Objects put around a failed snapshot survive a reload
+        """
+        store = self.store()
+        store.refresh()
+        store.put(Item(id="1", name="a"))
+        with mock.patch("models.store.write_snapshot",
+                        side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                store.compact()
+        store.put(Item(id="2", name="b"))
+        with mock.patch("models.store.write_snapshot",
+                        side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                store.compact()
+        store.journal.close()
+
+        reloaded = self.store()
+        self.assertEqual(sorted(i.id for i in reloaded.all()), ["1", "2"])
+        reloaded.compact()
+        reloaded.journal.close()
+        self.assertEqual(self.store().count(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
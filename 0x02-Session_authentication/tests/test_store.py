@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+""" Tests of ObjectStore reloading, indexes and search
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from models.journal import Journal  # noqa: E402
+from models.store import ObjectStore  # noqa: E402
+
+
+class Item:
+    """ Model with an indexed (name) and a plain (colour) attribute
+    """
+    INDEXES = ("name",)
+
+    def __init__(self, **kwargs):
+        """ Init
+        """
+        self.id = kwargs["id"]
+        self.name = kwargs.get("name")
+        self.colour = kwargs.get("colour")
+        self.created_at = datetime(2024, 1, 1)
+
+    def to_json(self, for_serialization: bool = False) -> dict:
+        """ To JSON
+        """
+        return {"id": self.id, "name": self.name, "colour": self.colour}
+
+
+class TestObjectStore(unittest.TestCase):
+    """ ObjectStore against files in a temporary directory
+    """
+    def setUp(self):
+        """ Paths of the store files
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp.name, "Item.json")
+        self.stores = []
+
+    def tearDown(self):
+        """ Close the journals and clean up
+        """
+        for store in self.stores:
+            store.journal.close()
+        self.tmp.cleanup()
+
+    def store(self) -> ObjectStore:
+        """ Fresh store on the temporary files, as another process
+        would open it
+        """
+        journal = Journal(os.path.splitext(self.file_path)[0] + ".journal",
+                          fsync="never")
+        store = ObjectStore(Item, self.file_path, journal)
+        store._compactor = mock.Mock()  # no background thread
+        self.stores.append(store)
+        return store
+
+    def assertIndexConsistent(self, store: ObjectStore):
+        """ The name index matches a scan of the stored objects
+        """
+        expected = {}
+        for obj in store.all():
+            if obj.name is not None:
+                expected.setdefault(obj.name, set()).add(obj.id)
+        self.assertEqual(store._indexes["name"], expected)
+        self.assertEqual(store.stats()["indexed"]["name"],
+                         sum(len(ids) for ids in expected.values()))
+        self.assertEqual(
+            {i: v["name"] for i, v in store._indexed_values.items() if v},
+            {obj.id: obj.name for obj in store.all()
+             if obj.name is not None})
+
+    def test_refresh_picks_up_external_journal(self):
+        """ Entries journaled by another writer are seen on next read
+        """
+        reader = self.store()
+        self.assertEqual(reader.count(), 0)
+        writer = self.store()
+        writer.put(Item(id="1", name="a"))
+        writer.journal.close()  # flushes to the file
+        self.assertEqual(reader.get("1").name, "a")
+        self.assertEqual([o.id for o in reader.search({"name": "a"})],
+                         ["1"])
+        self.assertIndexConsistent(reader)
+
+    def test_refresh_picks_up_external_snapshot(self):
+        """ A snapshot replaced behind the store's back is reloaded
+        """
+        store = self.store()
+        store.put(Item(id="1", name="a"))
+        store.journal.close()
+        self.assertEqual(store.count(), 1)
+        os.remove(store.journal.path)
+        with open(self.file_path, "w") as f:
+            json.dump([{"id": "2", "name": "b", "colour": "red"},
+                       {"id": "3", "name": "b", "colour": "blue"}], f)
+        self.assertIsNone(store.get("1"))
+        self.assertEqual(sorted(o.id for o in store.search({"name": "b"})),
+                         ["2", "3"])
+        self.assertEqual(store.search({"name": "a"}), [])
+        self.assertIndexConsistent(store)
+
+    def test_indexes_after_update_and_delete(self):
+        """ Updates move ids between index entries, deletes drop them
+        """
+        store = self.store()
+        items = [Item(id=str(i), name="even" if i % 2 else "odd",
+                      colour="red") for i in range(6)]
+        store.put_many(items)
+        self.assertIndexConsistent(store)
+
+        items[0].name = "even"
+        store.put(items[0])
+        items[1].name = None
+        store.put(items[1])
+        store.put(Item(id="2", name="new"))  # replaces the stored object
+        self.assertIndexConsistent(store)
+        self.assertEqual(
+            sorted(o.id for o in store.search({"name": "even"})),
+            ["0", "3", "5"])
+        self.assertEqual([o.id for o in store.search({"name": "odd"})],
+                         ["4"])
+
+        store.delete(items[3])
+        self.assertEqual(store.delete_many([items[4], items[5], items[4]]),
+                         2)
+        self.assertIndexConsistent(store)
+        self.assertNotIn("odd", store._indexes["name"])
+        self.assertEqual(store.search({"name": "odd"}), [])
+        self.assertFalse(store.delete(items[4]))
+
+        reloaded = self.store()
+        self.assertEqual(sorted(o.id for o in reloaded.all()),
+                         ["0", "1", "2"])
+        self.assertIndexConsistent(reloaded)
+
+    def test_search(self):
+        """ Indexed, plain and mixed criteria give the same answers as a
+        scan
+        """
+        store = self.store()
+        store.put_many([Item(id="1", name="a", colour="red"),
+                        Item(id="2", name="a", colour="blue"),
+                        Item(id="3", name="b", colour="red"),
+                        Item(id="4", colour="red")])
+
+        def ids(attributes: dict) -> list:
+            return sorted(o.id for o in store.search(attributes))
+
+        self.assertEqual(ids({"name": "a"}), ["1", "2"])
+        self.assertEqual(ids({"colour": "red"}), ["1", "3", "4"])
+        self.assertEqual(ids({"name": "a", "colour": "red"}), ["1"])
+        self.assertEqual(ids({"name": None}), ["4"])
+        self.assertEqual(ids({"name": "z"}), [])
+        self.assertEqual(ids({"name": ["a"]}), [])  # unhashable value
+        self.assertEqual(ids({"size": 1}), [])
+        self.assertEqual(ids({}), ["1", "2", "3", "4"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,9 +8,40 @@ password reset/update functionalities.
 """
 from flask import Flask, jsonify, request, abort, make_response, redirect
 from auth import Auth
+from bcrypt_executor import BcryptSaturated
 
 app = Flask(__name__)
 AUTH = Auth()
+AUTH.start_expiry_sweeper()
+
+
+@app.teardown_appcontext
+def release_db_session(exception: BaseException = None) -> None:
+    """
+    Releases the request's database session once it is over.
+    """
+    AUTH.release_db_session()
+
+
+@app.errorhandler(BcryptSaturated)
+def bcrypt_saturated(error: BcryptSaturated) -> tuple:
+    """
+    Fails fast with 503 Service Unavailable when the bcrypt pool is
+    full, instead of queueing more password work.
+    """
+    response = jsonify({"message": "server busy, retry later"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+
+@app.route("/metrics/bcrypt", methods=["GET"])
+def bcrypt_metrics() -> tuple:
+    """
+    GET /metrics/bcrypt
+
+    Returns the size and queue depth of the bcrypt pool.
+    """
+    return jsonify(AUTH.bcrypt_metrics()), 200
 
 
 @app.route("/", methods=["GET"])
@@ -81,7 +112,7 @@ def destroy_session_route() -> tuple:
     if user is None:
         abort(403)
     else:
-        AUTH.destroy_session(user.id)
+        AUTH.destroy_session(user.id, session_id)
         return redirect("/")
 
 
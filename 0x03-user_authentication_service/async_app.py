@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Async Quart app module.
+
+ASGI variant of app.py, serving the same routes with the same
+responses on top of AsyncAuth. Run it with an ASGI server, e.g.:
+
+    hypercorn async_app:app --bind 0.0.0.0:5000
+"""
+import asyncio
+import os
+
+from quart import Quart, jsonify, request, abort, make_response, redirect
+
+from async_auth import AsyncAuth
+from bcrypt_executor import BcryptSaturated
+
+app = Quart(__name__)
+AUTH = AsyncAuth()
+_sweeper = None
+
+
+async def sweep_expired() -> None:
+    """
+    Deletes expired sessions and reset tokens every AUTH_SWEEP_INTERVAL
+    seconds, AUTH_SWEEP_BATCH_SIZE rows per transaction.
+    """
+    interval = float(os.getenv("AUTH_SWEEP_INTERVAL", 60))
+    batch_size = int(os.getenv("AUTH_SWEEP_BATCH_SIZE", 500))
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await AUTH.sweep_expired(batch_size)
+        except Exception:
+            pass
+
+
+@app.before_serving
+async def start_sweeper() -> None:
+    """
+    Starts the expiry sweeper along with the server.
+    """
+    global _sweeper
+    _sweeper = asyncio.ensure_future(sweep_expired())
+
+
+@app.after_serving
+async def close_auth() -> None:
+    """
+    Stops the sweeper and releases the database connections when the
+    server stops.
+    """
+    if _sweeper is not None:
+        _sweeper.cancel()
+    await AUTH.close()
+
+
+@app.errorhandler(BcryptSaturated)
+async def bcrypt_saturated(error: BcryptSaturated) -> tuple:
+    """
+    Fails fast with 503 Service Unavailable when the bcrypt pool is
+    full, instead of queueing more password work.
+    """
+    response = jsonify({"message": "server busy, retry later"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+
+@app.route("/metrics/bcrypt", methods=["GET"])
+async def bcrypt_metrics() -> tuple:
+    """
+    GET /metrics/bcrypt
+
+    Returns the size and queue depth of the bcrypt pool.
+    """
+    return jsonify(AUTH.bcrypt_metrics()), 200
+
+
+@app.route("/", methods=["GET"])
+async def index() -> dict:
+    """
+    GET /
+
+    Returns a JSON payload with a welcome message.
+    """
+    return jsonify({"message": "Bienvenue"})
+
+
+@app.route("/users", methods=["POST"])
+async def users() -> tuple:
+    """
+    POST /users
+
+    Registers a new user based on 'email' and 'password' form data.
+    """
+    form = await request.form
+    email = form.get("email")
+    password = form.get("password")
+
+    try:
+        user = await AUTH.register_user(email, password)
+        return jsonify({"email": user.email, "message": "user created"}), 200
+    except ValueError:
+        return jsonify({"message": "email already registered"}), 400
+
+
+@app.route("/sessions", methods=["POST"])
+async def sessions() -> tuple:
+    """
+    POST /sessions
+
+    Handles user login. Expects 'email' and 'password' form data.
+    If login is incorrect, aborts with 401 Unauthorized.
+    Otherwise, creates a session, sets a 'session_id' cookie,
+    and returns a JSON payload.
+    """
+    form = await request.form
+    email = form.get("email")
+    password = form.get("password")
+
+    if not await AUTH.valid_login(email, password):
+        abort(401)
+
+    session_id = await AUTH.create_session(email)
+
+    response_data = {"email": email, "message": "logged in"}
+    response = await make_response(jsonify(response_data))
+    response.set_cookie("session_id", session_id)
+
+    return response, 200
+
+
+@app.route("/sessions", methods=["DELETE"])
+async def destroy_session_route() -> tuple:
+    """
+    DELETE /sessions
+
+    Handles user logout. Expects 'session_id' in cookies.
+    If user exists, destroys session and redirects to GET /.
+    Otherwise, responds with 403 Forbidden.
+    """
+    session_id = request.cookies.get("session_id")
+
+    user = await AUTH.get_user_from_session_id(session_id)
+
+    if user is None:
+        abort(403)
+    else:
+        await AUTH.destroy_session(user.id, session_id)
+        return redirect("/")
+
+
+@app.route("/profile", methods=["GET"])
+async def profile() -> tuple:
+    """
+    GET /profile
+
+    Retrieves user profile based on session ID cookie.
+    If user exists, returns JSON payload with email (200 OK).
+    If session ID is invalid or user not found, aborts with 403 Forbidden.
+    """
+    session_id = request.cookies.get("session_id")
+
+    user = await AUTH.get_user_from_session_id(session_id)
+
+    if user is None:
+        abort(403)
+    else:
+        return jsonify({"email": user.email}), 200
+
+
+@app.route("/reset_password", methods=["POST"])
+async def get_reset_password_token_route() -> tuple:
+    """
+    POST /reset_password
+
+    Handles password reset token generation. Expects 'email' form data.
+    If email is not registered, responds with 403 Forbidden.
+    Otherwise, generates a token and returns a JSON payload.
+    """
+    form = await request.form
+    email = form.get("email")
+
+    try:
+        reset_token = await AUTH.get_reset_password_token(email)
+        return jsonify({"email": email, "reset_token": reset_token}), 200
+    except ValueError:
+        abort(403)
+
+
+@app.route("/reset_password", methods=["PUT"])
+async def update_password_route() -> tuple:
+    """
+    PUT /reset_password
+
+    Handles updating user password using a reset token.
+    Expects 'email', 'reset_token', and 'new_password' form data.
+    If the token is invalid, responds with 403 Forbidden.
+    Otherwise, updates the password and responds with 200 OK.
+    """
+    form = await request.form
+    email = form.get("email")
+    reset_token = form.get("reset_token")
+    new_password = form.get("new_password")
+
+    try:
+        await AUTH.update_password(reset_token, new_password)
+        return jsonify({"email": email, "message": "Password updated"}), 200
+    except ValueError:
+        abort(403)
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Async authentication module.
+
+AsyncAuth is the asyncio counterpart of Auth, used by the ASGI app. It
+runs the same flows as Auth (see AuthCore), while the database is
+reached through AsyncDB and bcrypt runs on the process-wide
+BcryptExecutor, so the event loop never blocks on either.
+"""
+import asyncio
+import inspect
+from concurrent.futures import Future
+from typing import Any, Union
+
+from async_db import AsyncDB
+from auth import AuthCore, Flow
+from bcrypt_executor import BcryptExecutor
+from session_store import AsyncSQLiteSessionStore
+from user import User
+
+
+async def _run_flow(flow: Flow) -> Any:
+    """
+    Runs an authentication flow, awaiting each of its steps.
+
+    The result of every step, or the exception it raised, is sent back
+    into the flow; a step returning a Future (bcrypt work) or an
+    awaitable (AsyncDB and session store calls) is awaited.
+
+    Args:
+        flow (Flow): The flow to run.
+
+    Returns:
+        The result of the flow.
+    """
+    result, error = None, None
+    while True:
+        try:
+            step = flow.send(result) if error is None else flow.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            result, error = step(), None
+            if isinstance(result, Future):
+                result = await asyncio.wrap_future(result)
+            elif inspect.isawaitable(result):
+                result = await result
+        except Exception as exc:
+            result, error = None, exc
+
+
+class AsyncAuth(AuthCore):
+    """AsyncAuth class for database interaction from asyncio code.
+
+    Exposes the methods of Auth as coroutines.
+    """
+
+    def __init__(self, bcrypt_executor: BcryptExecutor = None) -> None:
+        """
+        Initializes AsyncAuth instance.
+
+        Sets up the async database connection, the session store, the
+        session cache and the pool running bcrypt.
+
+        Args:
+            bcrypt_executor (BcryptExecutor): Pool hashing and checking
+                                              passwords, the process-wide
+                                              one by default.
+        """
+        db = AsyncDB()
+        super().__init__(db, AsyncSQLiteSessionStore(db), bcrypt_executor)
+
+    async def close(self) -> None:
+        """
+        Releases the database connections.
+        """
+        await self._db.dispose()
+
+    async def sweep_expired(self, batch_size: int) -> int:
+        """
+        Deletes expired sessions and reset tokens, in batches.
+
+        Args:
+            batch_size (int): Rows deleted per transaction.
+
+        Returns:
+            int: Number of sessions and tokens removed.
+        """
+        return await _run_flow(self._sweep_expired_flow(batch_size))
+
+    async def register_user(self, email: str, password: str) -> User:
+        """
+        Registers a new user.
+
+        Raises:
+            ValueError: If user email exists.
+            BcryptSaturated: If the bcrypt pool is full.
+        """
+        return await _run_flow(self._register_user_flow(email, password))
+
+    async def valid_login(self, email: str, password: str) -> bool:
+        """
+        Validates user login, rehashing the password on a cost change.
+
+        Raises:
+            BcryptSaturated: If the bcrypt pool is full.
+        """
+        return await _run_flow(self._valid_login_flow(email, password))
+
+    async def create_session(self, email: str) -> Union[str, None]:
+        """
+        Creates a new session for a user.
+
+        Returns:
+            Union[str, None]: The new session ID, None if the user is
+                              not found.
+        """
+        return await _run_flow(self._create_session_flow(email))
+
+    async def get_user_from_session_id(
+            self, session_id: str) -> Union[User, None]:
+        """
+        Retrieves a user based on their session ID, through the cache.
+        """
+        return await _run_flow(
+            self._get_user_from_session_id_flow(session_id))
+
+    async def destroy_session(self, user_id: int,
+                              session_id: str = None) -> None:
+        """
+        Destroys one session of a user, or all of them.
+        """
+        await _run_flow(self._destroy_session_flow(user_id, session_id))
+
+    async def get_reset_password_token(self, email: str) -> str:
+        """
+        Generates a password reset token for a user.
+
+        Raises:
+            ValueError: If the user with the provided email does not exist.
+        """
+        return await _run_flow(self._get_reset_password_token_flow(email))
+
+    async def update_password(self, reset_token: str, password: str) -> None:
+        """
+        Updates a user's password using a reset token.
+
+        Raises:
+            ValueError: If the reset token is unknown or expired.
+            BcryptSaturated: If the bcrypt pool is full.
+        """
+        await _run_flow(self._update_password_flow(reset_token, password))
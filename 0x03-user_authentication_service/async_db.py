@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""Async DB module
+
+This module defines the AsyncDB class, the asyncio counterpart of DB
+used by the ASGI app: the same operations on the same schema, run
+through SQLAlchemy's async engine on top of aiosqlite.
+"""
+import os
+from typing import Union
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, \
+    create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from db import DEFAULT_DB_URL, create_db_engine, migrate, \
+    set_sqlite_pragmas
+from user import User, UserSession
+
+
+def create_async_db_engine(url: str) -> AsyncEngine:
+    """
+    Creates the async engine for a database URL.
+
+    SQLite URLs are switched to the aiosqlite driver and get the same
+    settings as create_db_engine: WAL journal mode, AUTH_DB_BUSY_TIMEOUT
+    and a pool of AUTH_DB_POOL_SIZE plus AUTH_DB_MAX_OVERFLOW
+    connections. The pool class is set explicitly, since older
+    SQLAlchemy 2.0 releases default aiosqlite to a NullPool, which
+    takes no size.
+
+    Args:
+        url (str): SQLAlchemy database URL.
+
+    Returns:
+        AsyncEngine: The configured engine.
+
+    Raises:
+        ValueError: For in-memory SQLite databases, which cannot be
+                    shared with the migration engine.
+    """
+    db_url = make_url(url)
+    if db_url.get_backend_name() != "sqlite":
+        return create_async_engine(url, echo=False)
+    if db_url.database in (None, "", ":memory:"):
+        raise ValueError("AsyncDB needs a SQLite database file")
+
+    busy_timeout = int(os.getenv("AUTH_DB_BUSY_TIMEOUT", 5000))
+    engine = create_async_engine(
+        db_url.set(drivername="sqlite+aiosqlite"), echo=False,
+        connect_args={"timeout": busy_timeout / 1000},
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=int(os.getenv("AUTH_DB_POOL_SIZE", 5)),
+        max_overflow=int(os.getenv("AUTH_DB_MAX_OVERFLOW", 10)))
+    set_sqlite_pragmas(engine.sync_engine, False, busy_timeout)
+    return engine
+
+
+class AsyncDB:
+    """
+    AsyncDB class handles database operations from asyncio code.
+
+    Every operation runs in its own short-lived AsyncSession, so one
+    instance is shared by all the tasks of the event loop. Returned
+    objects stay readable once their session is closed.
+    """
+
+    def __init__(self, reset: bool = False) -> None:
+        """
+        Initialize a new AsyncDB instance.
+
+        Brings the schema of the database at AUTH_DB_URL up to date
+        with the synchronous migrations, then opens the async engine.
+
+        Args:
+            reset (bool): Drop all tables first, starting from an
+                          empty database.
+        """
+        url = os.getenv("AUTH_DB_URL", DEFAULT_DB_URL)
+        sync_engine = create_db_engine(url)
+        try:
+            migrate(sync_engine, reset)
+        finally:
+            sync_engine.dispose()
+        self._engine = create_async_db_engine(url)
+        self._sessionmaker = async_sessionmaker(
+            self._engine, expire_on_commit=False)
+
+    async def dispose(self) -> None:
+        """
+        Closes every pooled connection.
+        """
+        await self._engine.dispose()
+
+    async def add_user(self, email: str, hashed_password: bytes) -> User:
+        """
+        Adds a new user record to the database.
+
+        Args:
+            email (str): The email address of the new user.
+            hashed_password (bytes): The hashed password of the new user.
+
+        Returns:
+            User: The persisted User, with its `id` populated.
+
+        Raises:
+            IntegrityError: If the email is already registered.
+        """
+        new_user = User(email=email, hashed_password=hashed_password)
+        async with self._sessionmaker() as session:
+            session.add(new_user)
+            try:
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                raise
+            await session.refresh(new_user)
+        return new_user
+
+    async def find_user_by(self, **kwargs) -> User:
+        """
+        Finds the first user matching the keyword arguments.
+
+        Args:
+            **kwargs: User attributes and the values to match.
+
+        Returns:
+            User: The matching User.
+
+        Raises:
+            NoResultFound: If no user matches.
+            InvalidRequestError: If invalid attribute in kwargs.
+        """
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                select(User).filter_by(**kwargs))
+            return result.scalars().one()
+
+    async def update_user(self, user_id: int, **kwargs) -> None:
+        """
+        Updates a user's attributes in the database.
+
+        Args:
+            user_id (int): The ID of the user to update.
+            **kwargs: User attributes and their new values.
+
+        Raises:
+            NoResultFound: If the user does not exist.
+            ValueError: If an argument is not a valid User attribute.
+        """
+        valid_attributes = User.__table__.columns.keys()
+        for key in kwargs:
+            if key not in valid_attributes:
+                raise ValueError(f"Invalid user attribute: {key}")
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                select(User).filter_by(id=user_id))
+            user = result.scalars().one()
+            for key, value in kwargs.items():
+                setattr(user, key, value)
+            await session.commit()
+
+    async def add_session(self, session_id: str, user_id: int,
+                          now: float) -> UserSession:
+        """
+        Adds a session record to the database.
+
+        Args:
+            session_id (str): The new session ID.
+            user_id (int): The ID of the user owning the session.
+            now (float): Creation time, as a Unix timestamp.
+
+        Returns:
+            UserSession: The persisted session.
+        """
+        user_session = UserSession(session_id=session_id, user_id=user_id,
+                                   created_at=now, last_seen=now)
+        async with self._sessionmaker() as session:
+            session.add(user_session)
+            await session.commit()
+        return user_session
+
+    async def find_session(self,
+                           session_id: str) -> Union[UserSession, None]:
+        """
+        Finds a session by its ID (primary key lookup).
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            Union[UserSession, None]: The session, None if unknown.
+        """
+        async with self._sessionmaker() as session:
+            return await session.get(UserSession, session_id)
+
+    async def touch_session(self, session_id: str, now: float) -> None:
+        """
+        Records activity on a session.
+
+        Args:
+            session_id (str): The session ID.
+            now (float): Activity time, as a Unix timestamp.
+        """
+        async with self._sessionmaker() as session:
+            await session.execute(
+                update(UserSession)
+                .where(UserSession.session_id == session_id)
+                .values(last_seen=now))
+            await session.commit()
+
+    async def delete_sessions(self, **kwargs) -> int:
+        """
+        Deletes the sessions matching the keyword arguments.
+
+        Args:
+            **kwargs: Filter on session_id and/or user_id.
+
+        Returns:
+            int: Number of deleted sessions.
+        """
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                delete(UserSession).filter_by(**kwargs))
+            await session.commit()
+            return result.rowcount
+
+    async def delete_expired_sessions(self, created_before: float,
+                                      seen_before: float,
+                                      limit: int) -> int:
+        """
+        Deletes up to `limit` sessions past their absolute or idle expiry.
+
+        Args:
+            created_before (float): Sessions created earlier are expired.
+            seen_before (float): Sessions idle since earlier are expired.
+            limit (int): Maximum number of sessions deleted.
+
+        Returns:
+            int: Number of deleted sessions.
+        """
+        expired = select(UserSession.session_id).where(
+            (UserSession.created_at < created_before) |
+            (UserSession.last_seen < seen_before)).limit(limit)
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                delete(UserSession).where(
+                    UserSession.session_id.in_(expired.scalar_subquery())))
+            await session.commit()
+            return result.rowcount
+
+    async def clear_expired_reset_tokens(self, issued_before: float,
+                                         limit: int) -> int:
+        """
+        Clears up to `limit` reset tokens issued before a given time.
+
+        Args:
+            issued_before (float): Tokens issued earlier are expired.
+            limit (int): Maximum number of tokens cleared.
+
+        Returns:
+            int: Number of cleared tokens.
+        """
+        expired = select(User.id).where(
+            User.reset_token.isnot(None),
+            (User.reset_token_issued_at.is_(None)) |
+            (User.reset_token_issued_at < issued_before)).limit(limit)
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                update(User)
+                .where(User.id.in_(expired.scalar_subquery()))
+                .values(reset_token=None, reset_token_issued_at=None))
+            await session.commit()
+            return result.rowcount
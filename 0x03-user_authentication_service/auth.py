@@ -5,11 +5,103 @@ Authentication module.
 Manages user authentication: hashing, registration, login, sessions.
 """
 import bcrypt
+import os
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import partial
+from bcrypt_executor import BcryptExecutor, BcryptSaturated, \
+    get_bcrypt_executor
 from db import DB
+from session_store import SessionStore, get_session_store
 from user import User
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
-from typing import Union
+from typing import Any, Callable, Generator, Union
+
+
+DEFAULT_BCRYPT_COST = 12
+BCRYPT_COST_FILE = os.environ.get("BCRYPT_COST_FILE", ".bcrypt_cost")
+_bcrypt_cost = None
+
+
+def calibrate_bcrypt_cost(target_ms: float = 50.0, min_cost: int = 4,
+                          max_cost: int = 16) -> int:
+    """
+    Finds the bcrypt work factor matching a target verification time.
+
+    Probes increasing costs and stops at the first one whose checkpw
+    exceeds target_ms; each step doubles the work, so calibration takes
+    about twice the target.
+
+    Args:
+        target_ms (float): Wanted verification time in milliseconds.
+        min_cost (int): Lowest cost ever returned.
+        max_cost (int): Highest cost probed.
+
+    Returns:
+        int: Highest cost verifying within target_ms on this machine.
+    """
+    cost = min_cost
+    for rounds in range(min_cost, max_cost + 1):
+        hashed = bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+        started = time.perf_counter()
+        bcrypt.checkpw(b"calibration", hashed)
+        if (time.perf_counter() - started) * 1000 > target_ms:
+            break
+        cost = rounds
+    return cost
+
+
+def save_bcrypt_cost(cost: int, path: str = None) -> None:
+    """
+    Persists the bcrypt cost used for new hashes.
+
+    Args:
+        cost (int): Work factor, typically from calibrate_bcrypt_cost.
+        path (str): File to write, BCRYPT_COST_FILE by default.
+    """
+    global _bcrypt_cost
+    with open(path or BCRYPT_COST_FILE, 'w') as f:
+        f.write(f"{cost}\n")
+    _bcrypt_cost = cost
+
+
+def _get_bcrypt_cost() -> int:
+    """
+    Returns the configured bcrypt cost.
+
+    The BCRYPT_COST environment variable wins over the persisted
+    calibration, which wins over the bcrypt default.
+
+    Returns:
+        int: Work factor for new hashes.
+    """
+    global _bcrypt_cost
+    if _bcrypt_cost is None:
+        cost = os.environ.get("BCRYPT_COST")
+        if cost is None and os.path.exists(BCRYPT_COST_FILE):
+            with open(BCRYPT_COST_FILE, 'r') as f:
+                cost = f.read().strip()
+        _bcrypt_cost = int(cost) if cost else DEFAULT_BCRYPT_COST
+    return _bcrypt_cost
+
+
+def _hash_cost(hashed_password: bytes) -> int:
+    """
+    Reads the work factor out of a bcrypt hash.
+
+    Args:
+        hashed_password (bytes): Hash such as b"$2b$12$...".
+
+    Returns:
+        int: The cost the hash was computed with.
+    """
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode('utf-8')
+    return int(hashed_password.split(b"$")[2])
 
 
 def _hash_password(password: str) -> bytes:
@@ -22,11 +114,55 @@ def _hash_password(password: str) -> bytes:
     Returns:
         bytes: Salted, hashed password.
     """
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(_get_bcrypt_cost())
     hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed_password
 
 
+def _needs_rehash(hashed_password: bytes) -> bool:
+    """
+    Tells if a hash was made with another cost than the configured one.
+
+    Args:
+        hashed_password (bytes): A bcrypt hash.
+
+    Returns:
+        bool: True if the hash should be recomputed.
+    """
+    return _hash_cost(hashed_password) != _get_bcrypt_cost()
+
+
+def _reset_token_expired(issued_at: Union[float, None], ttl: float) -> bool:
+    """
+    Tells if a reset token is past its lifetime.
+
+    Tokens without an issue time predate the expiry and count as
+    expired.
+
+    Args:
+        issued_at (Union[float, None]): Issue time (Unix timestamp).
+        ttl (float): Lifetime of a token in seconds.
+
+    Returns:
+        bool: True if the token must be rejected.
+    """
+    return issued_at is None or issued_at + ttl <= time.time()
+
+
+def _check_password(password: str, hashed_password: bytes) -> bool:
+    """
+    Checks a password against its bcrypt hash.
+
+    Args:
+        password (str): Plain-text password.
+        hashed_password (bytes): Hash to check against.
+
+    Returns:
+        bool: True if the password matches.
+    """
+    return bcrypt.checkpw(password.encode('utf-8'), hashed_password)
+
+
 def _generate_uuid() -> str:
     """
     Generates a new UUID.
@@ -37,19 +173,520 @@ def _generate_uuid() -> str:
     return str(uuid.uuid4())
 
 
-class Auth:
+def _snapshot(user: User) -> User:
+    """
+    Copies a user into a transient object, detached from any session.
+
+    Args:
+        user (User): User loaded from the database.
+
+    Returns:
+        User: Unsaved User holding the same column values.
+    """
+    return User(**{column: getattr(user, column)
+                   for column in User.__table__.columns.keys()})
+
+
+class SessionCache:
+    """
+    Bounded LRU cache, with a TTL, of session IDs to user snapshots.
+
+    Invalidation is local to the process: user rows changed by another
+    process are seen once the entry expires. Each entry records when
+    the session store last confirmed its session; within `recheck`
+    seconds of that a hit is served without asking the store, so a
+    session closed by another process is refused at most `recheck`
+    seconds later. An entry never outlives the session it was cached
+    for.
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None,
+                 recheck: float = None) -> None:
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_size (int): Maximum number of sessions cached
+                            (AUTH_SESSION_CACHE_SIZE, 10000 by default).
+            ttl (float): Lifetime of an entry in seconds
+                         (AUTH_SESSION_CACHE_TTL, 60 by default).
+            recheck (float): Seconds a confirmation by the session
+                             store holds (AUTH_SESSION_RECHECK, 1 by
+                             default).
+        """
+        if max_size is None:
+            max_size = int(os.getenv("AUTH_SESSION_CACHE_SIZE", 10000))
+        if ttl is None:
+            ttl = float(os.getenv("AUTH_SESSION_CACHE_TTL", 60))
+        if recheck is None:
+            recheck = float(os.getenv("AUTH_SESSION_RECHECK", 1))
+        self.max_size = max_size
+        self.ttl = ttl
+        self.recheck = recheck
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self._lock = threading.Lock()
+
+    def _pop(self, session_id: str) -> None:
+        """Drops an entry; the lock must be held."""
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return
+        sessions = self._by_user.get(entry[0].id)
+        if sessions is not None:
+            sessions.discard(session_id)
+            if not sessions:
+                del self._by_user[entry[0].id]
+
+    def get(self, session_id: str,
+            confirmed: bool = False) -> Union[User, None]:
+        """
+        Looks a session up.
+
+        Args:
+            session_id (str): The session ID.
+            confirmed (bool): Only return an entry confirmed by the
+                              session store within `recheck` seconds.
+
+        Returns:
+            Union[User, None]: The cached snapshot, None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                self._pop(session_id)
+                return None
+            if confirmed and entry[2] + self.recheck <= now:
+                return None
+            self._entries.move_to_end(session_id)
+            return entry[0]
+
+    def put(self, session_id: str, user: User,
+            expires_at: float = None) -> None:
+        """
+        Caches a snapshot of the user owning a session.
+
+        Args:
+            session_id (str): The session ID.
+            user (User): The user it belongs to.
+            expires_at (float): Expiry of the session (Unix timestamp),
+                                capping the lifetime of the entry.
+        """
+        if self.max_size <= 0:
+            return
+        snapshot = _snapshot(user)
+        deadline = time.time() + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        with self._lock:
+            self._pop(session_id)
+            self._entries[session_id] = [snapshot, deadline, time.time()]
+            self._by_user.setdefault(user.id, set()).add(session_id)
+            while len(self._entries) > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def confirm(self, session_id: str) -> None:
+        """
+        Records that the session store has just seen a session live.
+
+        Args:
+            session_id (str): The session ID.
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                entry[2] = time.time()
+
+    def discard(self, session_id: str) -> None:
+        """
+        Drops a cached session.
+
+        Args:
+            session_id (str): The session ID.
+        """
+        with self._lock:
+            self._pop(session_id)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """
+        Drops every cached session of a user.
+
+        Args:
+            user_id (int): The ID of the user whose row changed.
+        """
+        with self._lock:
+            for session_id in list(self._by_user.get(user_id, ())):
+                self._pop(session_id)
+
+
+class ExpirySweeper(threading.Thread):
+    """
+    Background thread deleting expired sessions and reset tokens.
+
+    Each pass works in small batches, one short transaction each, so
+    request handling is never blocked for long. Expired values are
+    already rejected at lookup time; the sweeper only reclaims them.
+    """
+
+    def __init__(self, auth: "Auth", interval: float = None,
+                 batch_size: int = None) -> None:
+        """
+        Initializes the sweeper thread.
+
+        Args:
+            auth (Auth): The Auth whose sessions and tokens to sweep.
+            interval (float): Seconds between passes
+                              (AUTH_SWEEP_INTERVAL, 60 by default).
+            batch_size (int): Rows deleted per transaction
+                              (AUTH_SWEEP_BATCH_SIZE, 500 by default).
+        """
+        super().__init__(name="auth-expiry-sweeper", daemon=True)
+        if interval is None:
+            interval = float(os.getenv("AUTH_SWEEP_INTERVAL", 60))
+        if batch_size is None:
+            batch_size = int(os.getenv("AUTH_SWEEP_BATCH_SIZE", 500))
+        self.auth = auth
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stopped = threading.Event()
+
+    def sweep(self) -> int:
+        """
+        Runs one pass over sessions and reset tokens.
+
+        Returns:
+            int: Number of sessions and tokens removed.
+        """
+        return self.auth.sweep_expired(self.batch_size, self._stopped.is_set)
+
+    def run(self) -> None:
+        """
+        Sweeps every `interval` seconds until stopped.
+        """
+        while not self._stopped.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception:
+                pass
+            finally:
+                self.auth.release_db_session()
+
+    def stop(self) -> None:
+        """
+        Asks the thread to exit after the current batch.
+        """
+        self._stopped.set()
+
+
+# An authentication flow: a generator yielding the I/O steps of an
+# operation as callables, receiving back their results, and returning
+# the result of the operation. A sync core wrapped for asyncio would
+# have to run every call on a thread, on the sync engine, holding a
+# thread per request for the whole operation; as flows, the same rules
+# run on AsyncDB and aiosqlite with the event loop only waiting on I/O.
+Flow = Generator[Callable[[], Any], Any, Any]
+
+
+def _run_flow(flow: Flow) -> Any:
+    """
+    Runs an authentication flow, blocking on each of its steps.
+
+    The result of every step, or the exception it raised, is sent back
+    into the flow; a step returning a Future (bcrypt work) is waited for.
+
+    Args:
+        flow (Flow): The flow to run.
+
+    Returns:
+        The result of the flow.
+    """
+    result, error = None, None
+    while True:
+        try:
+            step = flow.send(result) if error is None else flow.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            result, error = step(), None
+            if isinstance(result, Future):
+                result = result.result()
+        except Exception as exc:
+            result, error = None, exc
+
+
+class AuthCore:
+    """Business rules shared by Auth and AsyncAuth.
+
+    Each operation is written once, as a flow yielding its database,
+    session store and bcrypt calls. Auth runs the flows synchronously on
+    DB, AsyncAuth awaits them on AsyncDB, which exposes the same
+    methods, so both apply the same rules: rehash on cost change,
+    reset-token expiry, session cache and session expiry.
+    """
+
+    def __init__(self, db: Any, session_store: Any,
+                 bcrypt_executor: BcryptExecutor = None) -> None:
+        """
+        Initializes the shared state.
+
+        Args:
+            db (Any): DB, or AsyncDB for the async flavour.
+            session_store (Any): SessionStore, or AsyncSessionStore.
+            bcrypt_executor (BcryptExecutor): Pool hashing and checking
+                                              passwords, the process-wide
+                                              one by default.
+        """
+        self._db = db
+        self._sessions = session_store
+        self._session_cache = SessionCache()
+        self._bcrypt = bcrypt_executor or get_bcrypt_executor()
+        self.reset_token_ttl = float(
+            os.getenv("AUTH_RESET_TOKEN_TTL", 900))
+
+    def bcrypt_metrics(self) -> dict:
+        """
+        Returns the queue-depth counters of the bcrypt pool.
+
+        Returns:
+            dict: See BcryptExecutor.metrics.
+        """
+        return self._bcrypt.metrics()
+
+    def _update_user_flow(self, user_id: int, **kwargs) -> Flow:
+        """
+        Updates a user row and drops its cached sessions.
+        """
+        try:
+            yield partial(self._db.update_user, user_id, **kwargs)
+        finally:
+            self._session_cache.invalidate_user(user_id)
+
+    def _sweep_expired_flow(self, batch_size: int,
+                            stopped: Callable[[], bool] = None) -> Flow:
+        """
+        Deletes expired sessions, then clears reset tokens older than
+        reset_token_ttl, `batch_size` rows per transaction.
+        """
+        steps = (
+            partial(self._sessions.purge_expired, batch_size),
+            partial(self._db.clear_expired_reset_tokens,
+                    time.time() - self.reset_token_ttl, batch_size))
+        removed = 0
+        for step in steps:
+            while stopped is None or not stopped():
+                count = yield step
+                removed += count
+                if count < batch_size:
+                    break
+        return removed
+
+    def _register_user_flow(self, email: str, password: str) -> Flow:
+        """
+        Registers a new user, rejecting an email already registered.
+        """
+        try:
+            yield partial(self._db.find_user_by, email=email)
+            raise ValueError(f"User {email} already exists")
+        except NoResultFound:
+            pass
+
+        hashed_password = yield partial(
+            self._bcrypt.submit, _hash_password, password)
+        try:
+            return (yield partial(self._db.add_user, email,
+                                  hashed_password))
+        except IntegrityError:
+            # Registered concurrently, caught by the unique index
+            raise ValueError(f"User {email} already exists")
+
+    def _valid_login_flow(self, email: str, password: str) -> Flow:
+        """
+        Checks a login, rehashing the password on a cost change.
+        """
+        try:
+            user = yield partial(self._db.find_user_by, email=email)
+        except NoResultFound:
+            return False
+
+        if not (yield partial(self._bcrypt.submit, _check_password,
+                              password, user.hashed_password)):
+            return False
+
+        if _needs_rehash(user.hashed_password):
+            try:
+                hashed_password = yield partial(
+                    self._bcrypt.submit, _hash_password, password)
+            except BcryptSaturated:
+                # The login stands; the rehash waits for the next one
+                return True
+            yield from self._update_user_flow(
+                user.id, hashed_password=hashed_password)
+        return True
+
+    def _create_session_flow(self, email: str) -> Flow:
+        """
+        Opens a session for the user with this email, if any.
+        """
+        try:
+            user = yield partial(self._db.find_user_by, email=email)
+        except NoResultFound:
+            return None
+        session_id = yield partial(self._sessions.create, user.id)
+        self._session_cache.put(
+            session_id, user,
+            time.time() + min(self._sessions.absolute_ttl,
+                              self._sessions.idle_ttl))
+        return session_id
+
+    def _get_user_from_session_id_flow(self, session_id: str) -> Flow:
+        """
+        Finds the user owning a live session, through the cache.
+
+        A session confirmed by the store within the cache's recheck
+        window is served from memory; past it, the store is asked again
+        (a primary key lookup), so a logout by another worker takes
+        effect within that window.
+        """
+        if session_id is None:
+            return None
+        user = self._session_cache.get(session_id, confirmed=True)
+        if user is not None:
+            return user
+        session = yield partial(self._sessions.get, session_id)
+        if session is None:
+            # Closed by any worker: drop what this one may have cached
+            self._session_cache.discard(session_id)
+            return None
+        user = self._session_cache.get(session_id)
+        if user is not None and user.id == session.user_id:
+            self._session_cache.confirm(session_id)
+            return user
+        try:
+            user = yield partial(self._db.find_user_by, id=session.user_id)
+        except NoResultFound:
+            return None
+        self._session_cache.put(session_id, user, session.expires_at)
+        return user
+
+    def _destroy_session_flow(self, user_id: int,
+                              session_id: str = None) -> Flow:
+        """
+        Closes one session of a user, or all of them.
+        """
+        if session_id is not None:
+            yield partial(self._sessions.delete, session_id)
+            self._session_cache.discard(session_id)
+        else:
+            yield partial(self._sessions.delete_user, user_id)
+            self._session_cache.invalidate_user(user_id)
+
+    def _get_reset_password_token_flow(self, email: str) -> Flow:
+        """
+        Issues a reset token for the user with this email.
+        """
+        try:
+            user = yield partial(self._db.find_user_by, email=email)
+        except NoResultFound:
+            raise ValueError("Email not found")
+
+        reset_token = _generate_uuid()
+        yield from self._update_user_flow(
+            user.id, reset_token=reset_token,
+            reset_token_issued_at=time.time())
+        return reset_token
+
+    def _update_password_flow(self, reset_token: str,
+                              password: str) -> Flow:
+        """
+        Sets a new password for the owner of a live reset token.
+        """
+        try:
+            user = yield partial(self._db.find_user_by,
+                                 reset_token=reset_token)
+        except NoResultFound:
+            raise ValueError("Invalid reset token")
+
+        if _reset_token_expired(user.reset_token_issued_at,
+                                self.reset_token_ttl):
+            yield from self._update_user_flow(
+                user.id, reset_token=None, reset_token_issued_at=None)
+            raise ValueError("Expired reset token")
+
+        new_hashed_password = yield partial(
+            self._bcrypt.submit, _hash_password, password)
+        yield from self._update_user_flow(
+            user.id,
+            hashed_password=new_hashed_password,
+            reset_token=None,
+            reset_token_issued_at=None
+        )
+
+
+class Auth(AuthCore):
     """Auth class for database interaction.
 
     Handles user registration and login.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, session_store: SessionStore = None,
+                 bcrypt_executor: BcryptExecutor = None) -> None:
         """
         Initializes Auth instance.
 
-        Sets up private database connection.
+        Sets up private database connection, the session store, the
+        session cache and the pool running bcrypt.
+
+        Args:
+            session_store (SessionStore): Where sessions are kept, the
+                                          one selected by
+                                          AUTH_SESSION_STORE by default.
+            bcrypt_executor (BcryptExecutor): Pool hashing and checking
+                                              passwords, the process-wide
+                                              one by default.
+        """
+        db = DB()
+        super().__init__(db, session_store or get_session_store(db),
+                         bcrypt_executor)
+        self._sweeper = None
+
+    def start_expiry_sweeper(self) -> ExpirySweeper:
         """
-        self._db = DB()
+        Starts the background sweeper, once.
+
+        Returns:
+            ExpirySweeper: The running sweeper thread.
+        """
+        if self._sweeper is None:
+            self._sweeper = ExpirySweeper(self)
+            self._sweeper.start()
+        return self._sweeper
+
+    def sweep_expired(self, batch_size: int,
+                      stopped: Callable[[], bool] = None) -> int:
+        """
+        Deletes expired sessions and reset tokens, in batches.
+
+        Args:
+            batch_size (int): Rows deleted per transaction.
+            stopped (Callable[[], bool]): Checked before every batch;
+                                          the pass ends once it is True.
+
+        Returns:
+            int: Number of sessions and tokens removed.
+        """
+        return _run_flow(self._sweep_expired_flow(batch_size, stopped))
+
+    def release_db_session(self) -> None:
+        """
+        Releases the database session of the calling thread.
+
+        Called when a request ends, so each request starts with a fresh
+        session and no connection is held between requests.
+        """
+        self._db.remove_session()
 
     def register_user(self, email: str, password: str) -> User:
         """
@@ -64,22 +701,17 @@ class Auth:
 
         Raises:
             ValueError: If user email exists.
+            BcryptSaturated: If the bcrypt pool is full.
         """
-        try:
-            self._db.find_user_by(email=email)
-            raise ValueError(f"User {email} already exists")
-        except NoResultFound:
-            pass
-
-        hashed_password = _hash_password(password)
-        user = self._db.add_user(email, hashed_password)
-        return user
+        return _run_flow(self._register_user_flow(email, password))
 
     def valid_login(self, email: str, password: str) -> bool:
         """
         Validates user login.
 
-        Checks email existence and password match.
+        Checks email existence and password match. On success, a hash
+        made with another cost than the configured one is replaced by
+        a fresh hash of the same password.
 
         Args:
             email (str): User email.
@@ -87,19 +719,18 @@ class Auth:
 
         Returns:
             bool: True if login is valid, False otherwise.
+
+        Raises:
+            BcryptSaturated: If the bcrypt pool is full.
         """
-        try:
-            user = self._db.find_user_by(email=email)
-            return bcrypt.checkpw(password.encode('utf-8'),
-                                  user.hashed_password)
-        except NoResultFound:
-            return False
+        return _run_flow(self._valid_login_flow(email, password))
 
     def create_session(self, email: str) -> str:
         """
         Creates a new session for a user.
 
-        Finds user by email, generates new UUID (session ID), stores in DB.
+        Finds user by email and opens a session for it in the session
+        store; sessions opened earlier stay valid.
 
         Args:
             email (str): Email of the user for whom to create a session.
@@ -108,43 +739,36 @@ class Auth:
             str: The newly generated session ID if the user is found,
                  otherwise None.
         """
-        try:
-            user = self._db.find_user_by(email=email)
-            session_id = _generate_uuid()
-            self._db.update_user(user.id, session_id=session_id)
-            return session_id
-        except NoResultFound:
-            return None
+        return _run_flow(self._create_session_flow(email))
 
     def get_user_from_session_id(self, session_id: str) -> Union[User, None]:
         """
         Retrieves a user based on their session ID.
 
+        Reads through the session cache: the session store is only
+        queried once the cache's recheck window (AUTH_SESSION_RECHECK)
+        has passed, and the users table for sessions not seen within
+        the cache TTL.
+
         Args:
             session_id (str): The session ID string.
 
         Returns:
-            Union[User, None]: The User object if found, otherwise None.
+            Union[User, None]: The User object if the session is live,
+                               otherwise None.
         """
-        if session_id is None:
-            return None
-        try:
-            user = self._db.find_user_by(session_id=session_id)
-            return user
-        except NoResultFound:
-            return None
+        return _run_flow(self._get_user_from_session_id_flow(session_id))
 
-    def destroy_session(self, user_id: int) -> None:
+    def destroy_session(self, user_id: int, session_id: str = None) -> None:
         """
-        Destroys a user's session by setting their session ID to None.
+        Destroys one session of a user, or all of them.
 
         Args:
             user_id (int): The ID of the user whose session to destroy.
+            session_id (str): The session to close; every session of the
+                              user is closed when omitted.
         """
-        try:
-            self._db.update_user(user_id, session_id=None)
-        except NoResultFound:
-            pass
+        _run_flow(self._destroy_session_flow(user_id, session_id))
 
     def get_reset_password_token(self, email: str) -> str:
         """
@@ -162,14 +786,7 @@ class Auth:
         Raises:
             ValueError: If the user with the provided email does not exist.
         """
-        try:
-            user = self._db.find_user_by(email=email)
-        except NoResultFound:
-            raise ValueError("Email not found")
-
-        reset_token = _generate_uuid()
-        self._db.update_user(user.id, reset_token=reset_token)
-        return reset_token
+        return _run_flow(self._get_reset_password_token_flow(email))
 
     def update_password(self, reset_token: str, password: str) -> None:
         """
@@ -183,20 +800,8 @@ class Auth:
             password (str): The new plain-text password.
 
         Raises:
-            ValueError: If no user is found for the given reset token.
+            ValueError: If no user is found for the given reset token,
+                        or if the token is older than reset_token_ttl.
+            BcryptSaturated: If the bcrypt pool is full.
         """
-        try:
-            user = self._db.find_user_by(reset_token=reset_token)
-        except NoResultFound:
-            # If user not found with the reset token, raise ValueError
-            raise ValueError("Invalid reset token")
-
-        # Hash the new password using the private helper function
-        new_hashed_password = _hash_password(password)
-
-        # Update the user's hashed_password and set reset_token to None
-        self._db.update_user(
-            user.id,
-            hashed_password=new_hashed_password,
-            reset_token=None
-        )
+        _run_flow(self._update_password_flow(reset_token, password))
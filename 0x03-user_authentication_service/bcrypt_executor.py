@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Bcrypt executor module.
+
+Runs password hashing and verification on a bounded pool of workers,
+so request threads only wait for the result and a burst of logins
+cannot take every worker of the web server. Work submitted while the
+pool and its queue are full is rejected at once.
+"""
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, \
+    ThreadPoolExecutor
+from typing import Callable
+
+
+class BcryptSaturated(Exception):
+    """Raised when the bcrypt pool cannot take more work."""
+
+
+def _get_executor(mode: str, workers: int) -> Executor:
+    """
+    Builds the pool running the bcrypt work.
+
+    Args:
+        mode (str): "thread" or "process".
+        workers (int): Number of workers.
+
+    Returns:
+        Executor: The pool.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    if mode == "thread":
+        return ThreadPoolExecutor(max_workers=workers,
+                                  thread_name_prefix="bcrypt")
+    if mode == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    raise ValueError(f"Unknown bcrypt pool mode: {mode}")
+
+
+class BcryptExecutor:
+    """
+    Bounded pool running bcrypt calls.
+
+    At most `workers + max_queue` calls are accepted at a time; the
+    counters returned by metrics() show how close the pool is to that.
+    Thread mode is the default since bcrypt releases the GIL; process
+    mode needs picklable, module-level callables.
+    """
+
+    def __init__(self, workers: int = None, max_queue: int = None,
+                 mode: str = None) -> None:
+        """
+        Initializes the pool.
+
+        Args:
+            workers (int): Number of workers (AUTH_BCRYPT_WORKERS, the
+                           number of CPUs by default).
+            max_queue (int): Calls allowed to wait for a worker
+                             (AUTH_BCRYPT_QUEUE, 4 per worker by
+                             default).
+            mode (str): "thread" or "process" (AUTH_BCRYPT_POOL,
+                        "thread" by default).
+        """
+        if workers is None:
+            workers = int(os.getenv("AUTH_BCRYPT_WORKERS",
+                                    os.cpu_count() or 1))
+        if max_queue is None:
+            max_queue = int(os.getenv("AUTH_BCRYPT_QUEUE", workers * 4))
+        mode = mode or os.getenv("AUTH_BCRYPT_POOL", "thread")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.mode = mode
+        self._executor = _get_executor(mode, workers)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _done(self, future: Future) -> None:
+        """Accounts for a finished call."""
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """
+        Schedules a call on the pool.
+
+        Args:
+            fn (Callable): The function to run.
+            *args: Its arguments.
+
+        Returns:
+            Future: The future of the call.
+
+        Raises:
+            BcryptSaturated: If the pool and its queue are full.
+        """
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise BcryptSaturated("bcrypt pool is saturated")
+            self._in_flight += 1
+            self._submitted += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def run(self, fn: Callable, *args):
+        """
+        Runs a call on the pool and waits for its result.
+
+        Args:
+            fn (Callable): The function to run.
+            *args: Its arguments.
+
+        Returns:
+            The result of the call.
+
+        Raises:
+            BcryptSaturated: If the pool and its queue are full.
+        """
+        return self.submit(fn, *args).result()
+
+    def metrics(self) -> dict:
+        """
+        Returns the pool's size and queue-depth counters.
+
+        Returns:
+            dict: workers, capacity, in_flight, queued, submitted,
+                  completed and rejected.
+        """
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "capacity": self.workers + self.max_queue,
+                "in_flight": self._in_flight,
+                "queued": max(0, self._in_flight - self.workers),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the pool.
+
+        Args:
+            wait (bool): Whether to wait for the pending calls.
+        """
+        self._executor.shutdown(wait=wait)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_bcrypt_executor() -> BcryptExecutor:
+    """
+    Returns the process-wide pool, created on first use.
+
+    Auth and AsyncAuth use it by default, so every app of a process
+    draws on one bounded pool.
+
+    Returns:
+        BcryptExecutor: The shared pool.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = BcryptExecutor()
+        return _shared
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Load-testing benchmark for the user authentication service.
+
+Starts the Flask app in-process against a throwaway SQLite database and
+drives concurrent scenarios through either the Flask test client or a
+real local WSGI server, then prints throughput and p50/p95/p99 latency
+per endpoint as JSON. Nothing leaves the machine, so the results can
+gate releases, e.g.:
+
+    ./benchmark.py --mode server --scenario login --concurrency 16 \\
+        --requests 200 --output baseline.json
+
+main.py remains the functional end-to-end check of a running server.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from typing import Callable, Dict, List, Tuple, Union
+from urllib.parse import urlencode
+
+PASSWORD = "b4l0u"
+NEW_PASSWORD = "t4rt1fl3tt3"
+
+
+class Response:
+    """Status, JSON body and session cookie of a response."""
+
+    def __init__(self, status: int, body: bytes, set_cookies: List[str]):
+        """
+        Parses what the scenarios need out of a raw response.
+
+        Args:
+            status (int): HTTP status code.
+            body (bytes): Response body.
+            set_cookies (List[str]): Values of the Set-Cookie headers.
+        """
+        self.status = status
+        try:
+            self.json = json.loads(body) if body else None
+        except ValueError:
+            self.json = None
+        self.session_id = None
+        for header in set_cookies:
+            cookie = SimpleCookie(header)
+            if "session_id" in cookie:
+                self.session_id = cookie["session_id"].value
+
+
+class TestClientDriver:
+    """Sends requests through the Flask test client, one per worker."""
+
+    def __init__(self, app) -> None:
+        """
+        Args:
+            app (Flask): The application under test.
+        """
+        self._client = app.test_client()
+
+    def call(self, method: str, path: str, form: dict = None,
+             session_id: str = None) -> Response:
+        """
+        Sends one request.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Request path.
+            form (dict): Form fields, if any.
+            session_id (str): Value of the session_id cookie, if any.
+
+        Returns:
+            Response: The parsed response.
+        """
+        headers = {}
+        if session_id is not None:
+            headers["Cookie"] = f"session_id={session_id}"
+        response = self._client.open(path, method=method, data=form,
+                                     headers=headers)
+        return Response(response.status_code, response.get_data(),
+                        response.headers.getlist("Set-Cookie"))
+
+
+class ServerDriver:
+    """Sends requests over a keep-alive HTTP connection, one per worker."""
+
+    def __init__(self, host: str, port: int) -> None:
+        """
+        Args:
+            host (str): Server address.
+            port (int): Server port.
+        """
+        self._host = host
+        self._port = port
+        self._connection = http.client.HTTPConnection(host, port, timeout=60)
+
+    def call(self, method: str, path: str, form: dict = None,
+             session_id: str = None) -> Response:
+        """
+        Sends one request, reconnecting once if the server closed the
+        connection.
+        """
+        body = urlencode(form) if form is not None else None
+        headers = {}
+        if body is not None:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if session_id is not None:
+            headers["Cookie"] = f"session_id={session_id}"
+        for attempt in (1, 2):
+            try:
+                self._connection.request(method, path, body, headers)
+                response = self._connection.getresponse()
+                return Response(response.status, response.read(),
+                                response.headers.get_all("Set-Cookie", []))
+            except (ConnectionError, http.client.HTTPException):
+                self._connection.close()
+                self._connection = http.client.HTTPConnection(
+                    self._host, self._port, timeout=60)
+                if attempt == 2:
+                    raise
+
+
+class Recorder:
+    """Thread-safe collection of (endpoint, latency, status) samples."""
+
+    def __init__(self) -> None:
+        """Initializes an empty recorder."""
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def timed(self, driver, endpoint: str, method: str, path: str,
+              **kwargs) -> Response:
+        """
+        Sends a request through a driver and records its latency.
+
+        Args:
+            driver: TestClientDriver or ServerDriver.
+            endpoint (str): Label the sample is reported under.
+            method (str): HTTP method.
+            path (str): Request path.
+            **kwargs: form and session_id, passed to the driver.
+
+        Returns:
+            Response: The parsed response.
+        """
+        started = time.perf_counter()
+        response = driver.call(method, path, **kwargs)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._samples.setdefault(endpoint, []).append(
+                (elapsed, response.status))
+        return response
+
+    def samples(self) -> Dict[str, List[Tuple[float, int]]]:
+        """Returns the samples recorded so far, by endpoint."""
+        with self._lock:
+            return {k: list(v) for k, v in self._samples.items()}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    Args:
+        sorted_values (List[float]): Values in ascending order.
+        pct (float): Percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile, 0.0 for an empty list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples: List[Tuple[float, int]], wall_time: float) -> dict:
+    """
+    Reduces the samples of one endpoint to the reported statistics.
+
+    Args:
+        samples (List[Tuple[float, int]]): (latency, status) pairs.
+        wall_time (float): Duration of the measured phase, in seconds.
+
+    Returns:
+        dict: count, throughput, status counts and latencies in ms.
+    """
+    latencies = sorted(latency for latency, _ in samples)
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "count": len(samples),
+        "throughput_rps": round(len(samples) / wall_time, 2)
+        if wall_time > 0 else 0.0,
+        "statuses": statuses,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3)
+            if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+def _email(worker: int, index: int, run_id: str) -> str:
+    """Returns a unique email for a benchmark user."""
+    return f"bench-{run_id}-{worker}-{index}@example.com"
+
+
+def _signup(driver, recorder: Recorder, worker: int, index: int,
+            state: dict) -> None:
+    """Signup storm: registers a new user per request."""
+    email = _email(worker, index, state["run_id"])
+    recorder.timed(driver, "POST /users", "POST", "/users",
+                   form={"email": email, "password": PASSWORD})
+
+
+def _setup_login(driver, worker: int, state: dict) -> None:
+    """Registers the user a login worker logs in as."""
+    state["email"] = _email(worker, 0, state["run_id"])
+    driver.call("POST", "/users",
+                form={"email": state["email"], "password": PASSWORD})
+
+
+def _login(driver, recorder: Recorder, worker: int, index: int,
+           state: dict) -> None:
+    """Login storm: opens a new session per request."""
+    recorder.timed(driver, "POST /sessions", "POST", "/sessions",
+                   form={"email": state["email"], "password": PASSWORD})
+
+
+def _setup_profile(driver, worker: int, state: dict) -> None:
+    """Registers and logs in the user a profile worker reads."""
+    _setup_login(driver, worker, state)
+    state["session_id"] = driver.call(
+        "POST", "/sessions",
+        form={"email": state["email"], "password": PASSWORD}).session_id
+
+
+def _profile(driver, recorder: Recorder, worker: int, index: int,
+             state: dict) -> None:
+    """Read-heavy mix: mostly profile reads, a few logins."""
+    if state["random"].random() < state["login_ratio"]:
+        response = recorder.timed(
+            driver, "POST /sessions", "POST", "/sessions",
+            form={"email": state["email"], "password": PASSWORD})
+        if response.session_id is not None:
+            state["session_id"] = response.session_id
+    else:
+        recorder.timed(driver, "GET /profile", "GET", "/profile",
+                       session_id=state["session_id"])
+
+
+def _reset(driver, recorder: Recorder, worker: int, index: int,
+           state: dict) -> None:
+    """Reset flow: requests a reset token, then uses it."""
+    response = recorder.timed(driver, "POST /reset_password", "POST",
+                              "/reset_password",
+                              form={"email": state["email"]})
+    token = (response.json or {}).get("reset_token")
+    if token is None:
+        return
+    recorder.timed(driver, "PUT /reset_password", "PUT", "/reset_password",
+                   form={"email": state["email"], "reset_token": token,
+                         "new_password": NEW_PASSWORD})
+
+
+# name: (per-worker setup, untimed; one measured iteration)
+SCENARIOS = {
+    "signup": (None, _signup),
+    "login": (_setup_login, _login),
+    "profile": (_setup_profile, _profile),
+    "reset": (_setup_login, _reset),
+}
+
+
+def run_scenario(name: str, make_driver: Callable[[], object],
+                 concurrency: int, requests: int, login_ratio: float = 0.05,
+                 seed: int = 0) -> dict:
+    """
+    Runs one scenario with `concurrency` workers of `requests`
+    iterations each.
+
+    Args:
+        name (str): A key of SCENARIOS.
+        make_driver (Callable[[], object]): Builds a worker's driver.
+        concurrency (int): Number of concurrent workers.
+        requests (int): Iterations per worker.
+        login_ratio (float): Share of logins in the profile mix.
+        seed (int): Seed of the profile mix.
+
+    Returns:
+        dict: Scenario settings, wall time and per-endpoint statistics.
+    """
+    setup, iteration = SCENARIOS[name]
+    run_id = uuid.uuid4().hex[:8]
+    recorder = Recorder()
+    ready = threading.Barrier(concurrency + 1)
+
+    def worker(number: int) -> None:
+        """Sets a worker up, waits for the others, then runs."""
+        driver = make_driver()
+        state = {"run_id": run_id, "login_ratio": login_ratio,
+                 "random": random.Random(seed + number)}
+        try:
+            if setup is not None:
+                setup(driver, number, state)
+        finally:
+            ready.wait()
+        for index in range(requests):
+            iteration(driver, recorder, number, index + 1, state)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(worker, n) for n in range(concurrency)]
+        ready.wait()
+        started = time.perf_counter()
+        for future in futures:
+            future.result()
+        wall_time = time.perf_counter() - started
+
+    samples = recorder.samples()
+    total = sum(len(s) for s in samples.values())
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests_per_worker": requests,
+        "wall_time_s": round(wall_time, 3),
+        "throughput_rps": round(total / wall_time, 2)
+        if wall_time > 0 else 0.0,
+        "endpoints": {endpoint: summarize(s, wall_time)
+                      for endpoint, s in sorted(samples.items())},
+    }
+
+
+def start_server(app) -> Tuple[object, int]:
+    """
+    Serves the app with werkzeug's threaded WSGI server on a free port.
+
+    Args:
+        app (Flask): The application to serve.
+
+    Returns:
+        Tuple[object, int]: The server, to shut down, and its port.
+    """
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_port
+
+
+def main(argv: Union[List[str], None] = None) -> int:
+    """
+    Runs the requested scenarios and prints or writes the JSON report.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=("client", "server"),
+                        default="client",
+                        help="Flask test client or local WSGI server")
+    parser.add_argument("--scenario", action="append",
+                        choices=sorted(SCENARIOS),
+                        help="scenario to run, repeatable (default: all)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=50,
+                        help="iterations per worker")
+    parser.add_argument("--login-ratio", type=float, default=0.05,
+                        help="share of logins in the profile mix")
+    parser.add_argument("--bcrypt-cost", type=int, default=None,
+                        help="bcrypt cost (default: configured cost)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Configure before the app module creates its Auth and DB
+        os.environ["AUTH_DB_URL"] = f"sqlite:///{tmp}/benchmark.db"
+        if args.bcrypt_cost is not None:
+            os.environ["BCRYPT_COST"] = str(args.bcrypt_cost)
+        from app import app
+
+        server = None
+        if args.mode == "server":
+            server, port = start_server(app)
+
+            def make_driver():
+                return ServerDriver("127.0.0.1", port)
+        else:
+            def make_driver():
+                return TestClientDriver(app)
+
+        try:
+            report = {
+                "mode": args.mode,
+                "python": sys.version.split()[0],
+                "scenarios": [
+                    run_scenario(name, make_driver, args.concurrency,
+                                 args.requests, args.login_ratio, args.seed)
+                    for name in args.scenario or sorted(SCENARIOS)],
+            }
+        finally:
+            if server is not None:
+                server.shutdown()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
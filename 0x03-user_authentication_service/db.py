@@ -4,14 +4,188 @@
 This module defines the DB class for database operations related to
 user authentication, including creating, finding, and updating users.
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import fcntl
+import os
+from contextlib import contextmanager
+from typing import Iterator, Union
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.orm.session import Session
+from sqlalchemy.pool import QueuePool, StaticPool
 
-from user import Base, User
+from user import Base, User, UserSession
 
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+
+
+DEFAULT_DB_URL = "sqlite:///a.db"
+
+
+def create_db_engine(url: str) -> Engine:
+    """
+    Creates the engine for a database URL, tuned for concurrent use.
+
+    For SQLite, connections may be shared between threads and wait up
+    to AUTH_DB_BUSY_TIMEOUT milliseconds (5000) on a locked database.
+    File databases use a QueuePool of AUTH_DB_POOL_SIZE (5) plus
+    AUTH_DB_MAX_OVERFLOW (10) connections in WAL journal mode, so
+    readers do not block the writer; AUTH_DB_POOL=static shares a single
+    connection instead, as in-memory databases always do.
+
+    Args:
+        url (str): SQLAlchemy database URL.
+
+    Returns:
+        Engine: The configured engine.
+    """
+    db_url = make_url(url)
+    if db_url.get_backend_name() != "sqlite":
+        return create_engine(url, echo=False)
+
+    busy_timeout = int(os.getenv("AUTH_DB_BUSY_TIMEOUT", 5000))
+    in_memory = db_url.database in (None, "", ":memory:")
+    kwargs = {"connect_args": {"check_same_thread": False,
+                               "timeout": busy_timeout / 1000}}
+    if in_memory or os.getenv("AUTH_DB_POOL", "queue") == "static":
+        kwargs["poolclass"] = StaticPool
+    else:
+        kwargs["poolclass"] = QueuePool
+        kwargs["pool_size"] = int(os.getenv("AUTH_DB_POOL_SIZE", 5))
+        kwargs["max_overflow"] = int(os.getenv("AUTH_DB_MAX_OVERFLOW", 10))
+    engine = create_engine(url, echo=False, **kwargs)
+    set_sqlite_pragmas(engine, in_memory, busy_timeout)
+    return engine
+
+
+def set_sqlite_pragmas(engine: Engine, in_memory: bool,
+                       busy_timeout: int) -> None:
+    """
+    Applies the SQLite settings to every new connection of an engine.
+
+    Args:
+        engine (Engine): The engine (the sync_engine of an async one).
+        in_memory (bool): Whether the database is in memory, where WAL
+                          does not apply.
+        busy_timeout (int): Milliseconds to wait on a locked database.
+    """
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        """Applies the per-connection SQLite settings."""
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout = {busy_timeout}")
+        cursor.close()
+
+
+def create_missing_tables(bind: Union[Connection, Engine]) -> None:
+    """
+    Creates the tables declared on Base that do not exist yet.
+
+    Args:
+        bind (Union[Connection, Engine]): Database to migrate.
+    """
+    Base.metadata.create_all(bind, checkfirst=True)
+
+
+def create_missing_indexes(bind: Union[Connection, Engine]) -> None:
+    """
+    Creates the indexes declared on the users table that are missing.
+
+    `create_all` skips tables that already exist, so databases created
+    before an index was declared need this to get it.
+
+    Args:
+        bind (Union[Connection, Engine]): Database to migrate.
+
+    Raises:
+        IntegrityError: If existing rows violate a unique index.
+    """
+    for index in User.__table__.indexes:
+        index.create(bind=bind, checkfirst=True)
+
+
+def add_reset_token_issued_at(bind: Union[Connection, Engine]) -> None:
+    """
+    Adds the users.reset_token_issued_at column if it is missing.
+
+    Tables created by `create_all` after the column was declared
+    already have it.
+
+    Args:
+        bind (Union[Connection, Engine]): Database to migrate.
+    """
+    columns = [row[1] for row in bind.execute(
+        text("PRAGMA table_info(users)"))]
+    if "reset_token_issued_at" not in columns:
+        bind.execute(text(
+            "ALTER TABLE users ADD COLUMN reset_token_issued_at FLOAT"))
+
+
+# Schema migrations, in order: the database is at version N once the
+# first N have been applied. Append new steps, never reorder them.
+MIGRATIONS = [
+    create_missing_tables,
+    create_missing_indexes,
+    create_missing_tables,  # sessions table
+    add_reset_token_issued_at,
+]
+
+
+@contextmanager
+def _migration_lock(engine: Engine) -> Iterator[None]:
+    """
+    Holds an exclusive file lock next to a SQLite database file.
+
+    Serializes migrations between processes (e.g. gunicorn workers
+    starting together); in-memory databases need no lock.
+
+    Args:
+        engine (Engine): Engine of the database being migrated.
+    """
+    database = engine.url.database
+    if not database or database == ":memory:":
+        yield
+        return
+    with open(database + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def migrate(engine: Engine, reset: bool = False) -> int:
+    """
+    Applies the pending migrations, tracked by SQLite's user_version.
+
+    Safe to call from several processes at once: the first one to take
+    the lock migrates, the others then find nothing left to do.
+
+    Args:
+        engine (Engine): Engine of the database to migrate.
+        reset (bool): Drop all tables first, starting from scratch.
+
+    Returns:
+        int: Schema version of the database after migration.
+    """
+    with _migration_lock(engine):
+        if reset:
+            Base.metadata.drop_all(engine)
+            with engine.begin() as connection:
+                connection.execute(text("PRAGMA user_version = 0"))
+        with engine.begin() as connection:
+            version = connection.execute(
+                text("PRAGMA user_version")).scalar()
+            for step in MIGRATIONS[version:]:
+                step(connection)
+            if version < len(MIGRATIONS):
+                connection.execute(
+                    text(f"PRAGMA user_version = {len(MIGRATIONS)}"))
+        return max(version, len(MIGRATIONS))
 
 
 class DB:
@@ -20,33 +194,48 @@ class DB:
 
     It manages the SQLAlchemy engine and session, providing methods
     to interact with the database (add, find, update users).
+    Sessions are scoped to the calling thread, so one DB instance can
+    be shared by every thread of a multi-threaded server.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, reset: bool = False) -> None:
         """
         Initialize a new DB instance.
 
-        Sets up SQLAlchemy engine for a SQLite database file 'a.db'.
-        Drops and creates all tables defined by Base metadata.
-        The session attribute is initialized to None.
+        Sets up SQLAlchemy engine for the database at AUTH_DB_URL,
+        a SQLite database file 'a.db' by default, and brings its schema
+        up to date without touching existing data.
+        Sessions come from a thread-scoped registry; objects stay
+        readable once their session is closed (no expire on commit).
+
+        Args:
+            reset (bool): Drop all tables first, starting from an
+                          empty database.
         """
-        self._engine = create_engine("sqlite:///a.db", echo=False)
-        Base.metadata.drop_all(self._engine)
-        Base.metadata.create_all(self._engine)
-        self.__session = None
+        url = os.getenv("AUTH_DB_URL", DEFAULT_DB_URL)
+        self._engine = create_db_engine(url)
+        migrate(self._engine, reset)
+        self.__session = scoped_session(
+            sessionmaker(bind=self._engine, expire_on_commit=False))
 
     @property
     def _session(self) -> Session:
         """
-        Memoized session object.
+        Session of the calling thread.
+
+        Returns the SQLAlchemy Session bound to the current thread,
+        creating it on first use until remove_session is called.
+        """
+        return self.__session()
+
+    def remove_session(self) -> None:
+        """
+        Closes the calling thread's session, rolling back any pending
+        transaction and returning its connection to the pool.
 
-        Returns a SQLAlchemy Session instance. Creates it if not existing.
-        Ensures only one session is created per DB instance.
+        Meant to run at the end of every request.
         """
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        self.__session.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """
@@ -59,10 +248,17 @@ class DB:
         Returns:
             User: The newly created User object after it is persisted,
                   with its `id` populated.
+
+        Raises:
+            IntegrityError: If the email is already registered.
         """
         new_user = User(email=email, hashed_password=hashed_password)
         self._session.add(new_user)
-        self._session.commit()
+        try:
+            self._session.commit()
+        except IntegrityError:
+            self._session.rollback()
+            raise
         self._session.refresh(new_user)
         return new_user
 
@@ -114,3 +310,109 @@ class DB:
             setattr(user, key, value)
 
         self._session.commit()
+
+    def add_session(self, session_id: str, user_id: int,
+                    now: float) -> UserSession:
+        """
+        Adds a session record to the database.
+
+        Args:
+            session_id (str): The new session ID.
+            user_id (int): The ID of the user owning the session.
+            now (float): Creation time, as a Unix timestamp.
+
+        Returns:
+            UserSession: The persisted session.
+        """
+        user_session = UserSession(session_id=session_id, user_id=user_id,
+                                   created_at=now, last_seen=now)
+        self._session.add(user_session)
+        self._session.commit()
+        return user_session
+
+    def find_session(self, session_id: str) -> Union[UserSession, None]:
+        """
+        Finds a session by its ID (primary key lookup).
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            Union[UserSession, None]: The session, None if unknown.
+        """
+        return self._session.get(UserSession, session_id)
+
+    def touch_session(self, session_id: str, now: float) -> None:
+        """
+        Records activity on a session.
+
+        Args:
+            session_id (str): The session ID.
+            now (float): Activity time, as a Unix timestamp.
+        """
+        self._session.query(UserSession).filter_by(
+            session_id=session_id).update({"last_seen": now})
+        self._session.commit()
+
+    def delete_sessions(self, **kwargs) -> int:
+        """
+        Deletes the sessions matching the keyword arguments.
+
+        Args:
+            **kwargs: Filter on session_id and/or user_id.
+
+        Returns:
+            int: Number of deleted sessions.
+        """
+        deleted = self._session.query(UserSession).filter_by(
+            **kwargs).delete(synchronize_session=False)
+        self._session.commit()
+        return deleted
+
+    def delete_expired_sessions(self, created_before: float,
+                                seen_before: float, limit: int) -> int:
+        """
+        Deletes up to `limit` sessions past their absolute or idle expiry.
+
+        Args:
+            created_before (float): Sessions created earlier are expired.
+            seen_before (float): Sessions idle since earlier are expired.
+            limit (int): Maximum number of sessions deleted.
+
+        Returns:
+            int: Number of deleted sessions.
+        """
+        expired = self._session.query(UserSession.session_id).filter(
+            (UserSession.created_at < created_before) |
+            (UserSession.last_seen < seen_before)).limit(limit)
+        deleted = self._session.query(UserSession).filter(
+            UserSession.session_id.in_(expired.scalar_subquery())
+        ).delete(synchronize_session=False)
+        self._session.commit()
+        return deleted
+
+    def clear_expired_reset_tokens(self, issued_before: float,
+                                   limit: int) -> int:
+        """
+        Clears up to `limit` reset tokens issued before a given time.
+
+        Tokens without an issue time predate their expiry and are
+        cleared as well.
+
+        Args:
+            issued_before (float): Tokens issued earlier are expired.
+            limit (int): Maximum number of tokens cleared.
+
+        Returns:
+            int: Number of cleared tokens.
+        """
+        expired = self._session.query(User.id).filter(
+            User.reset_token.isnot(None),
+            (User.reset_token_issued_at.is_(None)) |
+            (User.reset_token_issued_at < issued_before)).limit(limit)
+        cleared = self._session.query(User).filter(
+            User.id.in_(expired.scalar_subquery())
+        ).update({"reset_token": None, "reset_token_issued_at": None},
+                 synchronize_session=False)
+        self._session.commit()
+        return cleared
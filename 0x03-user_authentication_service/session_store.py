@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Session store module.
+
+Keeps user sessions apart from the users table, with absolute and idle
+expiry and any number of sessions per user. Two backends are provided:
+an in-memory one for single-process deployments and one storing
+sessions in their own SQLite table, shared by every worker process.
+The latter also has an asyncio flavour, used by the ASGI app.
+"""
+import heapq
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import NamedTuple, Union
+
+from db import DB
+
+
+class SessionInfo(NamedTuple):
+    """Owner and expiry time (Unix timestamp) of a live session."""
+    user_id: int
+    expires_at: float
+
+
+class SessionExpiry:
+    """
+    Expiry rules shared by the sync and async session stores.
+
+    A session expires `absolute_ttl` seconds after its creation, or
+    `idle_ttl` seconds after the last activity seen on it. Activity is
+    recorded at most every `idle_ttl / 10` seconds, which bounds the
+    writes caused by lookups.
+    """
+
+    def __init__(self, absolute_ttl: float = None,
+                 idle_ttl: float = None) -> None:
+        """
+        Initializes the expiry settings.
+
+        Args:
+            absolute_ttl (float): Maximum session lifetime in seconds
+                                  (AUTH_SESSION_TTL, 86400 by default).
+            idle_ttl (float): Maximum inactivity in seconds
+                              (AUTH_SESSION_IDLE_TTL, 3600 by default).
+        """
+        if absolute_ttl is None:
+            absolute_ttl = float(os.getenv("AUTH_SESSION_TTL", 86400))
+        if idle_ttl is None:
+            idle_ttl = float(os.getenv("AUTH_SESSION_IDLE_TTL", 3600))
+        self.absolute_ttl = absolute_ttl
+        self.idle_ttl = idle_ttl
+
+    def _expires_at(self, created_at: float, last_seen: float) -> float:
+        """
+        Computes when a session expires.
+
+        Args:
+            created_at (float): Creation time.
+            last_seen (float): Last recorded activity.
+
+        Returns:
+            float: Expiry time, as a Unix timestamp.
+        """
+        return min(created_at + self.absolute_ttl,
+                   last_seen + self.idle_ttl)
+
+    def _needs_touch(self, last_seen: float, now: float) -> bool:
+        """
+        Tells if activity at `now` is worth recording.
+
+        Args:
+            last_seen (float): Last recorded activity.
+            now (float): Current time.
+
+        Returns:
+            bool: True if last_seen is older than a tenth of idle_ttl.
+        """
+        return now - last_seen >= self.idle_ttl / 10
+
+
+class SessionStore(SessionExpiry, ABC):
+    """
+    Interface of the session store backends.
+    """
+
+    @abstractmethod
+    def create(self, user_id: int) -> str:
+        """
+        Opens a new session.
+
+        Args:
+            user_id (int): The ID of the user logging in.
+
+        Returns:
+            str: The new session ID.
+        """
+
+    @abstractmethod
+    def get(self, session_id: str) -> Union[SessionInfo, None]:
+        """
+        Looks a live session up, recording activity on it.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            Union[SessionInfo, None]: The session, None if unknown
+                                      or expired.
+        """
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """
+        Closes a session.
+
+        Args:
+            session_id (str): The session ID.
+        """
+
+    @abstractmethod
+    def delete_user(self, user_id: int) -> None:
+        """
+        Closes every session of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+        """
+
+    @abstractmethod
+    def purge_expired(self, limit: int = 100) -> int:
+        """
+        Deletes up to `limit` expired sessions.
+
+        Args:
+            limit (int): Maximum number of sessions deleted.
+
+        Returns:
+            int: Number of deleted sessions.
+        """
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Session store held in process memory.
+
+    Sessions live in a dict keyed by session ID, with a per-user index
+    and a heap of expiry times used to purge expired sessions in order.
+    """
+
+    def __init__(self, absolute_ttl: float = None,
+                 idle_ttl: float = None) -> None:
+        """
+        Initializes an empty store.
+        """
+        super().__init__(absolute_ttl, idle_ttl)
+        self._sessions = {}
+        self._by_user = {}
+        self._expiries = []
+        self._lock = threading.Lock()
+
+    def _remove(self, session_id: str) -> None:
+        """Drops a session; the lock must be held."""
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return
+        sessions = self._by_user.get(session[0])
+        if sessions is not None:
+            sessions.discard(session_id)
+            if not sessions:
+                del self._by_user[session[0]]
+
+    def create(self, user_id: int) -> str:
+        """
+        Opens a new session.
+        """
+        session_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = [user_id, now, now]
+            self._by_user.setdefault(user_id, set()).add(session_id)
+            heapq.heappush(self._expiries,
+                           (self._expires_at(now, now), session_id))
+        return session_id
+
+    def get(self, session_id: str) -> Union[SessionInfo, None]:
+        """
+        Looks a live session up, recording activity on it.
+        """
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            user_id, created_at, last_seen = session
+            if self._expires_at(created_at, last_seen) <= now:
+                self._remove(session_id)
+                return None
+            if self._needs_touch(last_seen, now):
+                session[2] = last_seen = now
+                heapq.heappush(self._expiries, (
+                    self._expires_at(created_at, now), session_id))
+            return SessionInfo(user_id, self._expires_at(created_at,
+                                                         last_seen))
+
+    def delete(self, session_id: str) -> None:
+        """
+        Closes a session.
+        """
+        with self._lock:
+            self._remove(session_id)
+
+    def delete_user(self, user_id: int) -> None:
+        """
+        Closes every session of a user.
+        """
+        with self._lock:
+            for session_id in list(self._by_user.get(user_id, ())):
+                self._remove(session_id)
+
+    def purge_expired(self, limit: int = 100) -> int:
+        """
+        Deletes up to `limit` expired sessions, earliest expiry first.
+
+        Heap entries made stale by later activity or by a deletion are
+        dropped along the way.
+        """
+        now = time.time()
+        purged = 0
+        with self._lock:
+            while self._expiries and purged < limit:
+                expires_at, session_id = self._expiries[0]
+                if expires_at > now:
+                    break
+                heapq.heappop(self._expiries)
+                session = self._sessions.get(session_id)
+                if session is None:
+                    continue
+                if self._expires_at(session[1], session[2]) <= now:
+                    self._remove(session_id)
+                    purged += 1
+        return purged
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store backed by the 'sessions' table of the database.
+
+    Lookups go through the table's primary key; sessions are shared
+    by every process using the same database.
+    """
+
+    def __init__(self, db: DB, absolute_ttl: float = None,
+                 idle_ttl: float = None) -> None:
+        """
+        Initializes the store on top of a DB instance.
+
+        Args:
+            db (DB): Database holding the sessions table.
+        """
+        super().__init__(absolute_ttl, idle_ttl)
+        self._db = db
+
+    def create(self, user_id: int) -> str:
+        """
+        Opens a new session.
+        """
+        session_id = str(uuid.uuid4())
+        self._db.add_session(session_id, user_id, time.time())
+        return session_id
+
+    def get(self, session_id: str) -> Union[SessionInfo, None]:
+        """
+        Looks a live session up, recording activity on it.
+        """
+        now = time.time()
+        session = self._db.find_session(session_id)
+        if session is None:
+            return None
+        user_id = session.user_id
+        created_at, last_seen = session.created_at, session.last_seen
+        if self._expires_at(created_at, last_seen) <= now:
+            self._db.delete_sessions(session_id=session_id)
+            return None
+        if self._needs_touch(last_seen, now):
+            self._db.touch_session(session_id, now)
+            last_seen = now
+        return SessionInfo(user_id, self._expires_at(created_at, last_seen))
+
+    def delete(self, session_id: str) -> None:
+        """
+        Closes a session.
+        """
+        self._db.delete_sessions(session_id=session_id)
+
+    def delete_user(self, user_id: int) -> None:
+        """
+        Closes every session of a user.
+        """
+        self._db.delete_sessions(user_id=user_id)
+
+    def purge_expired(self, limit: int = 100) -> int:
+        """
+        Deletes up to `limit` expired sessions in one transaction.
+        """
+        now = time.time()
+        return self._db.delete_expired_sessions(
+            created_before=now - self.absolute_ttl,
+            seen_before=now - self.idle_ttl,
+            limit=limit)
+
+
+class AsyncSessionStore(SessionExpiry, ABC):
+    """
+    Interface of the asyncio session store backends.
+
+    Same operations as SessionStore, as coroutines.
+    """
+
+    @abstractmethod
+    async def create(self, user_id: int) -> str:
+        """
+        Opens a new session.
+
+        Args:
+            user_id (int): The ID of the user logging in.
+
+        Returns:
+            str: The new session ID.
+        """
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Union[SessionInfo, None]:
+        """
+        Looks a live session up, recording activity on it.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            Union[SessionInfo, None]: The session, None if unknown
+                                      or expired.
+        """
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        """
+        Closes a session.
+
+        Args:
+            session_id (str): The session ID.
+        """
+
+    @abstractmethod
+    async def delete_user(self, user_id: int) -> None:
+        """
+        Closes every session of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+        """
+
+    @abstractmethod
+    async def purge_expired(self, limit: int = 100) -> int:
+        """
+        Deletes up to `limit` expired sessions.
+
+        Args:
+            limit (int): Maximum number of sessions deleted.
+
+        Returns:
+            int: Number of deleted sessions.
+        """
+
+
+class AsyncSQLiteSessionStore(AsyncSessionStore):
+    """
+    Asyncio counterpart of SQLiteSessionStore, on top of an AsyncDB.
+
+    Same table and expiry rules; every method is a coroutine.
+    """
+
+    def __init__(self, db, absolute_ttl: float = None,
+                 idle_ttl: float = None) -> None:
+        """
+        Initializes the store on top of an AsyncDB instance.
+
+        Args:
+            db (AsyncDB): Database holding the sessions table.
+        """
+        super().__init__(absolute_ttl, idle_ttl)
+        self._db = db
+
+    async def create(self, user_id: int) -> str:
+        """
+        Opens a new session.
+        """
+        session_id = str(uuid.uuid4())
+        await self._db.add_session(session_id, user_id, time.time())
+        return session_id
+
+    async def get(self, session_id: str) -> Union[SessionInfo, None]:
+        """
+        Looks a live session up, recording activity on it.
+        """
+        now = time.time()
+        session = await self._db.find_session(session_id)
+        if session is None:
+            return None
+        user_id = session.user_id
+        created_at, last_seen = session.created_at, session.last_seen
+        if self._expires_at(created_at, last_seen) <= now:
+            await self._db.delete_sessions(session_id=session_id)
+            return None
+        if self._needs_touch(last_seen, now):
+            await self._db.touch_session(session_id, now)
+            last_seen = now
+        return SessionInfo(user_id, self._expires_at(created_at, last_seen))
+
+    async def delete(self, session_id: str) -> None:
+        """
+        Closes a session.
+        """
+        await self._db.delete_sessions(session_id=session_id)
+
+    async def delete_user(self, user_id: int) -> None:
+        """
+        Closes every session of a user.
+        """
+        await self._db.delete_sessions(user_id=user_id)
+
+    async def purge_expired(self, limit: int = 100) -> int:
+        """
+        Deletes up to `limit` expired sessions in one transaction.
+        """
+        now = time.time()
+        return await self._db.delete_expired_sessions(
+            created_before=now - self.absolute_ttl,
+            seen_before=now - self.idle_ttl,
+            limit=limit)
+
+
+def get_session_store(db: DB, backend: str = None) -> SessionStore:
+    """
+    Builds the session store selected by AUTH_SESSION_STORE.
+
+    Args:
+        db (DB): Database used by the SQLite backend.
+        backend (str): "sqlite" (default) or "memory".
+
+    Returns:
+        SessionStore: The session store.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    backend = backend or os.getenv("AUTH_SESSION_STORE", "sqlite")
+    if backend == "sqlite":
+        return SQLiteSessionStore(db)
+    if backend == "memory":
+        return MemorySessionStore()
+    raise ValueError(f"Unknown session store: {backend}")
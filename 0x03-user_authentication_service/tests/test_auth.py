@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Tests of Auth and AsyncAuth, which run the same AuthCore flows.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+try:
+    import bcrypt  # noqa: F401
+    import sqlalchemy  # noqa: F401
+except ImportError:  # pragma: no cover
+    bcrypt = sqlalchemy = None
+else:
+    from auth import Auth
+    from bcrypt_executor import BcryptExecutor, get_bcrypt_executor
+
+try:
+    import aiosqlite  # noqa: F401
+    import greenlet  # noqa: F401
+except ImportError:  # pragma: no cover
+    aiosqlite = None
+else:
+    from async_auth import AsyncAuth
+
+
+class AuthTestCase(unittest.TestCase):
+    """
+    Runs each test on a fresh database file, with cheap bcrypt hashes.
+    """
+
+    def setUp(self) -> None:
+        """
+        Points AUTH_DB_URL at a temporary database.
+        """
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        url = "sqlite:///" + os.path.join(tmp.name, "auth.db")
+        patcher = mock.patch.dict(os.environ, {"AUTH_DB_URL": url})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("auth._bcrypt_cost", 4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.bcrypt = BcryptExecutor(workers=2, max_queue=2)
+        self.addCleanup(self.bcrypt.shutdown)
+
+
+@unittest.skipIf(sqlalchemy is None, "sqlalchemy or bcrypt is missing")
+class TestAuth(AuthTestCase):
+    """
+    The synchronous flavour.
+    """
+
+    def auth(self) -> "Auth":
+        """
+        Returns an Auth on the test database.
+        """
+        auth = Auth(bcrypt_executor=self.bcrypt)
+        self.addCleanup(auth._db._engine.dispose)
+        return auth
+
+    def test_register_and_login(self) -> None:
+        """
+        A registered user logs in with the right password only.
+        """
+        auth = self.auth()
+        auth.register_user("bob@example.com", "pwd")
+        with self.assertRaises(ValueError):
+            auth.register_user("bob@example.com", "other")
+        self.assertTrue(auth.valid_login("bob@example.com", "pwd"))
+        self.assertFalse(auth.valid_login("bob@example.com", "bad"))
+        self.assertFalse(auth.valid_login("eve@example.com", "pwd"))
+
+    def test_session_lifecycle(self) -> None:
+        """
+        A session finds its user until it is destroyed.
+        """
+        auth = self.auth()
+        user = auth.register_user("bob@example.com", "pwd")
+        session_id = auth.create_session("bob@example.com")
+        self.assertEqual(
+            auth.get_user_from_session_id(session_id).email, user.email)
+        auth.destroy_session(user.id, session_id)
+        self.assertIsNone(auth.get_user_from_session_id(session_id))
+        self.assertIsNone(auth.create_session("eve@example.com"))
+
+    def test_logout_seen_by_other_workers(self) -> None:
+        """
+        A session closed by one worker is refused by another that had
+        it cached, once the recheck window has passed.
+        """
+        worker_a, worker_b = self.auth(), self.auth()
+        worker_b._session_cache.recheck = 0.05
+        user = worker_a.register_user("bob@example.com", "pwd")
+        session_id = worker_a.create_session("bob@example.com")
+        self.assertIsNotNone(worker_b.get_user_from_session_id(session_id))
+        worker_a.destroy_session(user.id, session_id)
+        time.sleep(0.1)
+        self.assertIsNone(worker_b.get_user_from_session_id(session_id))
+
+    def test_cache_hit_skips_store(self) -> None:
+        """
+        Within the recheck window a cached session makes no store call;
+        past it, the store is asked again.
+        """
+        auth = self.auth()
+        auth._session_cache.recheck = 0.05
+        auth.register_user("bob@example.com", "pwd")
+        session_id = auth.create_session("bob@example.com")
+        with mock.patch.object(auth._sessions, "get",
+                               wraps=auth._sessions.get) as get:
+            for _ in range(3):
+                self.assertIsNotNone(
+                    auth.get_user_from_session_id(session_id))
+            get.assert_not_called()
+            time.sleep(0.1)
+            self.assertIsNotNone(auth.get_user_from_session_id(session_id))
+            self.assertEqual(get.call_count, 1)
+
+    def test_default_bcrypt_pool_shared(self) -> None:
+        """
+        Auth instances without a pool of their own share one.
+        """
+        first, second = Auth(), Auth()
+        self.addCleanup(first._db._engine.dispose)
+        self.addCleanup(second._db._engine.dispose)
+        self.assertIs(first._bcrypt, second._bcrypt)
+        self.assertIs(first._bcrypt, get_bcrypt_executor())
+
+    def test_reset_password(self) -> None:
+        """
+        A reset token sets a new password once.
+        """
+        auth = self.auth()
+        auth.register_user("bob@example.com", "pwd")
+        token = auth.get_reset_password_token("bob@example.com")
+        auth.update_password(token, "new")
+        self.assertTrue(auth.valid_login("bob@example.com", "new"))
+        with self.assertRaises(ValueError):
+            auth.update_password(token, "again")
+        with self.assertRaises(ValueError):
+            auth.get_reset_password_token("eve@example.com")
+
+    def test_rehash_on_cost_change(self) -> None:
+        """
+        A login with a hash of another cost stores a fresh hash.
+        """
+        auth = self.auth()
+        auth.register_user("bob@example.com", "pwd")
+        with mock.patch("auth._bcrypt_cost", 5):
+            self.assertTrue(auth.valid_login("bob@example.com", "pwd"))
+        user = auth._db.find_user_by(email="bob@example.com")
+        self.assertTrue(user.hashed_password.startswith(b"$2b$05$"))
+
+
+@unittest.skipIf(sqlalchemy is None or aiosqlite is None,
+                 "sqlalchemy, bcrypt, aiosqlite or greenlet is missing")
+class TestAsyncAuth(AuthTestCase):
+    """
+    The asyncio flavour.
+    """
+
+    def run_with_auth(self, scenario) -> None:
+        """
+        Runs a coroutine function taking an AsyncAuth.
+        """
+        async def main() -> None:
+            auth = AsyncAuth(bcrypt_executor=self.bcrypt)
+            try:
+                await scenario(auth)
+            finally:
+                await auth.close()
+        asyncio.run(main())
+
+    def test_register_login_and_sessions(self) -> None:
+        """
+        The async flows follow the same rules as the sync ones.
+        """
+        async def scenario(auth: "AsyncAuth") -> None:
+            user = await auth.register_user("bob@example.com", "pwd")
+            with self.assertRaises(ValueError):
+                await auth.register_user("bob@example.com", "other")
+            self.assertTrue(await auth.valid_login("bob@example.com", "pwd"))
+            self.assertFalse(await auth.valid_login("bob@example.com", "x"))
+            session_id = await auth.create_session("bob@example.com")
+            found = await auth.get_user_from_session_id(session_id)
+            self.assertEqual(found.id, user.id)
+            await auth.destroy_session(user.id, session_id)
+            self.assertIsNone(await auth.get_user_from_session_id(session_id))
+
+        self.run_with_auth(scenario)
+
+    def test_reset_password_and_sweep(self) -> None:
+        """
+        Reset tokens work once; a sweep with nothing expired is a no-op.
+        """
+        async def scenario(auth: "AsyncAuth") -> None:
+            await auth.register_user("bob@example.com", "pwd")
+            token = await auth.get_reset_password_token("bob@example.com")
+            await auth.update_password(token, "new")
+            self.assertTrue(await auth.valid_login("bob@example.com", "new"))
+            with self.assertRaises(ValueError):
+                await auth.update_password(token, "again")
+            self.assertEqual(await auth.sweep_expired(10), 0)
+
+        self.run_with_auth(scenario)
+
+
+if __name__ == "__main__":
+    unittest.main()
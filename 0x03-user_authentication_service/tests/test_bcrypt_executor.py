@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Tests of the bounded bcrypt pool and of the 503 it leads to.
+"""
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from bcrypt_executor import BcryptExecutor, BcryptSaturated  # noqa: E402
+
+try:
+    import bcrypt  # noqa: F401
+    import flask  # noqa: F401
+    import sqlalchemy  # noqa: F401
+except ImportError:  # pragma: no cover
+    flask = None
+
+
+class OneSlotTestCase(unittest.TestCase):
+    """
+    Provides a 1-slot executor and a way to keep its worker busy.
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates a pool of one worker and no queue.
+        """
+        self.executor = BcryptExecutor(workers=1, max_queue=0,
+                                       mode="thread")
+        self.release = threading.Event()
+        self.addCleanup(self.executor.shutdown)
+        self.addCleanup(self.release.set)
+
+    def occupy(self):
+        """
+        Takes the only slot until self.release is set.
+
+        Returns:
+            Future: The future of the blocking call.
+        """
+        return self.executor.submit(self.release.wait, 10)
+
+
+class TestBcryptExecutor(OneSlotTestCase):
+    """
+    Admission control of BcryptExecutor.
+    """
+
+    def test_saturation(self) -> None:
+        """
+        A call beyond workers + max_queue is rejected at once.
+        """
+        busy = self.occupy()
+        with self.assertRaises(BcryptSaturated):
+            self.executor.submit(pow, 2, 3)
+        with self.assertRaises(BcryptSaturated):
+            self.executor.run(pow, 2, 3)
+        metrics = self.executor.metrics()
+        self.assertEqual((metrics["capacity"], metrics["in_flight"],
+                          metrics["rejected"]), (1, 1, 2))
+
+        self.release.set()
+        self.assertTrue(busy.result(5))
+        self.assertEqual(self.executor.run(pow, 2, 3), 8)
+        metrics = self.executor.metrics()
+        self.assertEqual((metrics["in_flight"], metrics["submitted"],
+                          metrics["completed"]), (0, 2, 2))
+
+    def test_failed_submit_frees_slot(self) -> None:
+        """
+        A slot taken by a call the pool refused is given back.
+        """
+        self.executor.shutdown()
+        with self.assertRaises(RuntimeError):
+            self.executor.submit(pow, 2, 3)
+        self.assertEqual(self.executor.metrics()["in_flight"], 0)
+
+    def test_unknown_mode(self) -> None:
+        """
+        Only the thread and process modes exist.
+        """
+        with self.assertRaises(ValueError):
+            BcryptExecutor(workers=1, max_queue=0, mode="fiber")
+
+
+@unittest.skipIf(flask is None, "flask, bcrypt or sqlalchemy is missing")
+class TestAppSaturated(OneSlotTestCase):
+    """
+    The Flask app answers 503 while the bcrypt pool is full.
+    """
+
+    def setUp(self) -> None:
+        """
+        Imports the app on a temporary database, using the 1-slot pool.
+        """
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        url = "sqlite:///" + os.path.join(tmp.name, "auth.db")
+        with mock.patch.dict(os.environ, {"AUTH_DB_URL": url}):
+            sys.modules.pop("app", None)
+            import app
+        self.addCleanup(sys.modules.pop, "app", None)
+        self.addCleanup(app.AUTH._db._engine.dispose)
+        self.addCleanup(app.AUTH._sweeper.stop)
+        app.AUTH._bcrypt = self.executor
+        self.client = app.app.test_client()
+
+    def test_503_when_saturated(self) -> None:
+        """
+        Password work is refused with 503 and Retry-After, then served
+        again once the pool has room.
+        """
+        form = {"email": "bob@example.com", "password": "pwd"}
+        with mock.patch("auth._bcrypt_cost", 4):
+            busy = self.occupy()
+            response = self.client.post("/users", data=form)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers["Retry-After"], "1")
+            self.assertEqual(response.get_json(),
+                             {"message": "server busy, retry later"})
+            self.assertEqual(
+                self.client.get("/metrics/bcrypt").get_json()["rejected"],
+                1)
+
+            self.release.set()
+            busy.result(5)
+            response = self.client.post("/users", data=form)
+            self.assertEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Tests of the DB module: schema migrations and query plans of the
+user lookups.
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+try:
+    import sqlalchemy  # noqa: F401
+except ImportError:  # pragma: no cover
+    sqlalchemy = None
+else:
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm.exc import NoResultFound
+    import db
+    from db import DB, MIGRATIONS, migrate
+    from user import User
+
+
+@unittest.skipIf(sqlalchemy is None, "sqlalchemy is not installed")
+class TestFindUserByPlan(unittest.TestCase):
+    """
+    Every key used with DB.find_user_by is served by an index.
+    """
+
+    def setUp(self) -> None:
+        """
+        Opens a DB on a fresh file in a temporary directory.
+        """
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        url = "sqlite:///" + os.path.join(tmp.name, "plan.db")
+        with mock.patch.dict(os.environ, {"AUTH_DB_URL": url}):
+            self.db = DB()
+        self.addCleanup(self.db._engine.dispose)
+        self.addCleanup(self.db.remove_session)
+        self.db.add_user("bob@example.com", "hashed")
+
+    def query_plan(self, **kwargs) -> str:
+        """
+        Returns the SQLite query plan of find_user_by(**kwargs).
+        """
+        query = self.db._session.query(User).filter_by(**kwargs)
+        sql = query.statement.compile(
+            self.db._engine, compile_kwargs={"literal_binds": True})
+        with self.db._engine.connect() as connection:
+            rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+            return "\n".join(row[-1] for row in rows)
+
+    def test_lookups_use_index(self) -> None:
+        """
+        email, session_id and reset_token lookups search their index.
+        """
+        for key in ("email", "session_id", "reset_token"):
+            with self.subTest(key=key):
+                plan = self.query_plan(**{key: "value"})
+                self.assertIn(f"USING INDEX ix_users_{key}", plan)
+                self.assertNotIn("SCAN", plan)
+
+
+@unittest.skipIf(sqlalchemy is None, "sqlalchemy is not installed")
+class TestMigrate(unittest.TestCase):
+    """
+    Schema migrations keep data and run each step once.
+    """
+
+    def setUp(self) -> None:
+        """
+        Points AUTH_DB_URL at a fresh file in a temporary directory.
+        """
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.url = "sqlite:///" + os.path.join(tmp.name, "auth.db")
+        patcher = mock.patch.dict(os.environ, {"AUTH_DB_URL": self.url})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def open_db(self, reset: bool = False) -> "DB":
+        """
+        Opens the database as a starting process would.
+        """
+        database = DB(reset)
+        self.addCleanup(database._engine.dispose)
+        self.addCleanup(database.remove_session)
+        return database
+
+    def engine(self):
+        """
+        Returns a plain engine on the database file.
+        """
+        engine = create_engine(self.url)
+        self.addCleanup(engine.dispose)
+        return engine
+
+    def user_version(self) -> int:
+        """
+        Returns the schema version recorded in the database file.
+        """
+        with self.engine().connect() as connection:
+            return connection.execute(text("PRAGMA user_version")).scalar()
+
+    def test_users_survive_restart(self) -> None:
+        """
+        Users stay in the table when the service starts again.
+        """
+        first = self.open_db()
+        user = first.add_user("bob@example.com", "hashed")
+        first.update_user(user.id, session_id="abc")
+        first.remove_session()
+        first._engine.dispose()
+
+        second = self.open_db()
+        found = second.find_user_by(email="bob@example.com")
+        self.assertEqual((found.id, found.session_id), (user.id, "abc"))
+        self.assertEqual(self.user_version(), len(MIGRATIONS))
+
+        with self.assertRaises(NoResultFound):
+            self.open_db(reset=True).find_user_by(email="bob@example.com")
+
+    def test_version_advances_from_old_schema(self) -> None:
+        """
+        A database of the original schema is brought up to date and
+        its rows are kept.
+        """
+        engine = self.engine()
+        with engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, "
+                "email VARCHAR(250) NOT NULL, "
+                "hashed_password VARCHAR(250) NOT NULL, "
+                "session_id VARCHAR(250), reset_token VARCHAR(250))"))
+            connection.execute(text(
+                "INSERT INTO users (email, hashed_password) "
+                "VALUES ('bob@example.com', 'hashed')"))
+        self.assertEqual(self.user_version(), 0)
+
+        self.assertEqual(migrate(engine), len(MIGRATIONS))
+        self.assertEqual(self.user_version(), len(MIGRATIONS))
+        with engine.connect() as connection:
+            columns = [row[1] for row in connection.execute(
+                text("PRAGMA table_info(users)"))]
+            tables = [row[0] for row in connection.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"))]
+        self.assertIn("reset_token_issued_at", columns)
+        self.assertIn("sessions", tables)
+        found = self.open_db().find_user_by(email="bob@example.com")
+        self.assertEqual(found.hashed_password, "hashed")
+
+    def test_second_migrate_is_noop(self) -> None:
+        """
+        Migrating an up-to-date database runs no step; only a step
+        appended later is run, once.
+        """
+        engine = self.engine()
+        self.assertEqual(migrate(engine), len(MIGRATIONS))
+        steps = [mock.Mock() for _ in MIGRATIONS]
+        with mock.patch.object(db, "MIGRATIONS", steps):
+            self.assertEqual(migrate(engine), len(steps))
+        for step in steps:
+            step.assert_not_called()
+
+        steps.append(mock.Mock())
+        with mock.patch.object(db, "MIGRATIONS", steps):
+            self.assertEqual(migrate(engine), len(steps))
+            self.assertEqual(migrate(engine), len(steps))
+        steps[-1].assert_called_once()
+        for step in steps[:-1]:
+            step.assert_not_called()
+        self.assertEqual(self.user_version(), len(steps))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,7 @@ This module defines the User class, which maps to the 'users' table
 in the database, specifying its columns and their types.
 """
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Float, ForeignKey, Integer, String
 
 
 Base = declarative_base()
@@ -19,14 +19,20 @@ class User(Base):
     This class defines the schema for the users table with the following
     attributes: id (primary key), email, hashed_password, session_id,
     and reset_token. It uses SQLAlchemy's declarative base for mapping.
+    email, session_id and reset_token carry unique indexes, as every
+    lookup of DB.find_user_by goes through one of them.
     """
     __tablename__ = 'users'
 
     id: Column = Column(Integer, primary_key=True)
-    email: Column = Column(String(250), nullable=False)
+    email: Column = Column(String(250), nullable=False,
+                           unique=True, index=True)
     hashed_password: Column = Column(String(250), nullable=False)
-    session_id: Column = Column(String(250), nullable=True)
-    reset_token: Column = Column(String(250), nullable=True)
+    session_id: Column = Column(String(250), nullable=True,
+                                unique=True, index=True)
+    reset_token: Column = Column(String(250), nullable=True,
+                                 unique=True, index=True)
+    reset_token_issued_at: Column = Column(Float, nullable=True)
 
     # Note on type annotations for attributes:
     # While attributes like 'id', 'email' etc. are defined,
@@ -35,3 +41,20 @@ class User(Base):
     # to methods (functions) defined within the class or module.
     # Since no custom __init__ or other methods are explicitly defined here,
     # no function-level type annotations are necessary for this specific task.
+
+
+class UserSession(Base):
+    """
+    Session model for the 'sessions' database table.
+
+    One row per open session, so a user may hold several sessions at
+    once. created_at and last_seen are Unix timestamps used for the
+    absolute and idle expiry of the session.
+    """
+    __tablename__ = 'sessions'
+
+    session_id: Column = Column(String(250), primary_key=True)
+    user_id: Column = Column(Integer, ForeignKey('users.id'),
+                             nullable=False, index=True)
+    created_at: Column = Column(Float, nullable=False)
+    last_seen: Column = Column(Float, nullable=False)